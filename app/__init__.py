@@ -6,6 +6,10 @@ from flask_login import login_required, current_user
 from werkzeug.security import generate_password_hash
 from extensions import db, login_manager
 from app.models import User, Budget, Expense, Transaction
+from app.db_pool import engine_options_from_env
+from app.identity import load_cached_user, user_cache
+from app.pagination import parse_flag
+from app.request_metrics import init_request_metrics
 from app.routes.auth import auth_bp
 from app.routes.superadmin import superadmin_bp
 from app.routes.admin import admin_bp
@@ -25,11 +29,51 @@ if db_uri and db_uri.startswith("mysql://"):
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-super-secret-key-here-change-this-in-production')
 app.config['SQLALCHEMY_DATABASE_URI'] = db_uri
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Connection pool size, overflow, recycle, pre-ping and timeout (see app/db_pool.py)
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options_from_env(db_uri)
+# Seconds the superadmin overview snapshot is served from cache
+app.config['OVERVIEW_CACHE_TTL'] = int(os.getenv('OVERVIEW_CACHE_TTL', 60))
+# Seconds each /admin/bootstrap section is served from cache
+app.config['ADMIN_SECTION_CACHE_TTL'] = int(os.getenv('ADMIN_SECTION_CACHE_TTL', 30))
+# Seconds / entries of the per-worker cache behind load_user
+app.config['USER_CACHE_TTL'] = int(os.getenv('USER_CACHE_TTL', 30))
+app.config['USER_CACHE_SIZE'] = int(os.getenv('USER_CACHE_SIZE', 1024))
+# Requests slower than this are logged with their slowest SQL statements
+app.config['SLOW_REQUEST_MS'] = int(os.getenv('SLOW_REQUEST_MS', 500))
+# Password hash method and cost; stored hashes using another are upgraded at login
+app.config['PASSWORD_HASH_METHOD'] = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+# Processes used to hash passwords for bulk provisioning
+app.config['PASSWORD_HASH_WORKERS'] = int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+# Processes checking login passwords (0 checks on the request thread), and how many checks may wait
+app.config['LOGIN_HASH_WORKERS'] = int(os.getenv('LOGIN_HASH_WORKERS', 2))
+app.config['LOGIN_HASH_MAX_PENDING'] = int(os.getenv('LOGIN_HASH_MAX_PENDING', 32))
 
 # UPLOAD_FOLDER setup
 UPLOAD_FOLDER = os.path.abspath(os.path.join(os.path.dirname(__file__), 'uploads'))
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB
+app.config['EXPENSE_IMPORT_MAX_ROWS'] = int(os.getenv('EXPENSE_IMPORT_MAX_ROWS', 50000))
+app.config['EXPENSE_REVIEW_MAX_ITEMS'] = int(os.getenv('EXPENSE_REVIEW_MAX_ITEMS', 1000))
+app.config['USER_PROVISION_MAX_ROWS'] = int(os.getenv('USER_PROVISION_MAX_ROWS', 5000))
+app.config['BULK_ALLOCATION_MAX_ITEMS'] = int(os.getenv('BULK_ALLOCATION_MAX_ITEMS', 1000))
+# Let a front proxy stream receipts: '' (serve from Python), 'x-sendfile' or 'x-accel-redirect'
+app.config['DOCUMENT_OFFLOAD'] = os.getenv('DOCUMENT_OFFLOAD', '').lower()
+# nginx `internal` location aliased to UPLOAD_FOLDER, for x-accel-redirect
+app.config['DOCUMENT_ACCEL_PREFIX'] = os.getenv('DOCUMENT_ACCEL_PREFIX', '/protected-uploads/')
+# Receipt previews: longest side in px (the first is the default), format, quality,
+# render processes (0 renders on request, nothing in the background) and seconds a request waits
+app.config['THUMBNAIL_SIZES'] = [int(size) for size in os.getenv('THUMBNAIL_SIZES', '320,1280').split(',')]
+app.config['THUMBNAIL_FORMAT'] = os.getenv('THUMBNAIL_FORMAT', 'webp').lower()
+app.config['THUMBNAIL_QUALITY'] = int(os.getenv('THUMBNAIL_QUALITY', 80))
+app.config['THUMBNAIL_WORKERS'] = int(os.getenv('THUMBNAIL_WORKERS', 1))
+app.config['THUMBNAIL_TIMEOUT'] = int(os.getenv('THUMBNAIL_TIMEOUT', 20))
+# Re-encode large raster uploads: '' stores them byte-for-byte, else 'webp' or 'jpeg' (see app/images.py)
+app.config['RECEIPT_RECOMPRESS_FORMAT'] = os.getenv('RECEIPT_RECOMPRESS_FORMAT', '').lower()
+app.config['RECEIPT_RECOMPRESS_QUALITY'] = int(os.getenv('RECEIPT_RECOMPRESS_QUALITY', 80))
+app.config['RECEIPT_RECOMPRESS_MAX_SIDE'] = int(os.getenv('RECEIPT_RECOMPRESS_MAX_SIDE', 2560))
+app.config['RECEIPT_RECOMPRESS_MIN_BYTES'] = int(os.getenv('RECEIPT_RECOMPRESS_MIN_BYTES', 512 * 1024))
+# Keep the uploaded original of a recompressed receipt under uploads/.originals
+app.config['RECEIPT_KEEP_ORIGINALS'] = parse_flag(os.getenv('RECEIPT_KEEP_ORIGINALS', 'false'))
 
 if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
@@ -49,10 +93,13 @@ db.init_app(app)
 login_manager.init_app(app)
 login_manager.login_view = 'auth.login'
 login_manager.session_protection = "strong"
+init_request_metrics(app)
+
+user_cache.maxsize = app.config['USER_CACHE_SIZE']
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return load_cached_user(int(user_id))
 
 # Blueprints
 app.register_blueprint(auth_bp, url_prefix='/auth')
@@ -0,0 +1,176 @@
+"""Atomic balance updates for admin budgets and employee funds.
+
+Each helper is one ``UPDATE ... SET column = column +/- :amount``. The
+arithmetic therefore happens in the database under the row lock that the
+UPDATE takes. The old read-modify-write in Python lost updates when an
+allocation and an approval for the same row interleaved. Debits also carry
+``WHERE remaining >= :amount`` and return whether a row matched, so the
+balance check and the write cannot be separated. Callers roll back when a
+debit returns False. Nothing here commits.
+
+The statements go through the Core tables, so ORM objects already loaded in
+the session are not refreshed; read the balances again after the commit if
+you need them.
+
+The bulk variants (``credit_funds``, ``credit_budgets``) apply a whole
+``{id: amount}`` mapping. Missing rows are created with one multi-row insert,
+and every balance is then moved by one executemany UPDATE.
+"""
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import bindparam
+from sqlalchemy.exc import IntegrityError
+
+from app.models import Budget, EmployeeFund
+from extensions import db
+
+budgets = Budget.__table__
+funds = EmployeeFund.__table__
+
+
+def _execute(statement):
+    return db.session.execute(statement).rowcount
+
+
+def _insert_or_update(insert, update):
+    """Run ``update``, or ``insert`` when no row exists yet.
+
+    Two requests can both find the row missing; the unique key makes the
+    loser's insert fail, and it then applies its update to the winner's row.
+    """
+    if _execute(update):
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert)
+    except IntegrityError:
+        _execute(update)
+
+
+def _insert_missing(table, rows):
+    """Insert rows keyed on a unique column, skipping any a concurrent request created first."""
+    if not rows:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.execute(table.insert(), rows)
+    except IntegrityError:
+        for row in rows:
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(table.insert(), [row])
+            except IntegrityError:
+                pass
+
+
+def parse_allocations(items, id_key):
+    """Validate ``[{id_key: int, 'amount': number}, ...]`` from a bulk allocation request.
+
+    Returns ``(amounts, errors)``: ``{id: Decimal}`` in request order, and one
+    ``{'index': i, id_key: ..., 'error': ...}`` per bad item.
+    """
+    amounts, errors = {}, []
+    for index, item in enumerate(items):
+        item = item if isinstance(item, dict) else {}
+        target_id = item.get(id_key)
+        error = None
+        try:
+            amount = Decimal(str(item.get('amount')))
+        except InvalidOperation:
+            amount = None
+        if not isinstance(target_id, int) or isinstance(target_id, bool):
+            error = f'Each item needs an integer {id_key}'
+        elif amount is None or not amount.is_finite() or amount <= 0:
+            error = 'Amount must be positive'
+        elif amount.as_tuple().exponent < -2:
+            error = 'Amount must have at most 2 decimal places'
+        elif target_id in amounts:
+            error = f'Duplicate {id_key} in this request'
+        if error:
+            errors.append({'index': index, id_key: target_id, 'error': error})
+        else:
+            amounts[target_id] = amount
+    return amounts, errors
+
+
+def debit_budget(admin_id, amount):
+    """Move ``amount`` from the admin's remaining budget to spent, if it is available."""
+    return _execute(
+        budgets.update()
+        .where(budgets.c.admin_id == admin_id, budgets.c.remaining >= amount)
+        .values(total_spent=budgets.c.total_spent + amount, remaining=budgets.c.remaining - amount,
+                updated_at=datetime.utcnow())
+    ) == 1
+
+
+def credit_budget(admin_id, amount):
+    """Add ``amount`` to the admin's total and remaining budget, creating the budget row if needed."""
+    now = datetime.utcnow()
+    _insert_or_update(
+        budgets.insert().values(admin_id=admin_id, total_budget=amount, total_spent=0, remaining=amount,
+                                created_at=now, updated_at=now),
+        budgets.update()
+        .where(budgets.c.admin_id == admin_id)
+        .values(total_budget=budgets.c.total_budget + amount, remaining=budgets.c.remaining + amount, updated_at=now)
+    )
+
+
+def credit_fund(employee_id, admin_id, amount):
+    """Allocate ``amount`` to the employee's fund under ``admin_id``, creating the fund if needed."""
+    now = datetime.utcnow()
+    _insert_or_update(
+        funds.insert().values(employee_id=employee_id, admin_id=admin_id, amount_allocated=amount, amount_spent=0,
+                              remaining_balance=amount, created_at=now, updated_at=now),
+        funds.update()
+        .where(funds.c.employee_id == employee_id, funds.c.admin_id == admin_id)
+        .values(amount_allocated=funds.c.amount_allocated + amount,
+                remaining_balance=funds.c.remaining_balance + amount, updated_at=now)
+    )
+
+
+def debit_fund(employee_id, admin_id, amount):
+    """Spend ``amount`` from the employee's fund under ``admin_id``, if the balance covers it."""
+    return _execute(
+        funds.update()
+        .where(funds.c.employee_id == employee_id, funds.c.admin_id == admin_id,
+               funds.c.remaining_balance >= amount)
+        .values(amount_spent=funds.c.amount_spent + amount,
+                remaining_balance=funds.c.remaining_balance - amount, updated_at=datetime.utcnow())
+    ) == 1
+
+
+def credit_budgets(amounts):
+    """Add ``{admin_id: amount}`` to each admin's total and remaining budget."""
+    now = datetime.utcnow()
+    existing = {admin_id for (admin_id,) in db.session.query(Budget.admin_id).filter(Budget.admin_id.in_(amounts))}
+    _insert_missing(budgets, [
+        {'admin_id': admin_id, 'total_budget': 0, 'total_spent': 0, 'remaining': 0, 'created_at': now, 'updated_at': now}
+        for admin_id in amounts if admin_id not in existing
+    ])
+    db.session.execute(
+        budgets.update()
+        .where(budgets.c.admin_id == bindparam('target_id'))
+        .values(total_budget=budgets.c.total_budget + bindparam('amount'),
+                remaining=budgets.c.remaining + bindparam('amount'), updated_at=now),
+        [{'target_id': admin_id, 'amount': amount} for admin_id, amount in amounts.items()]
+    )
+
+
+def credit_funds(admin_id, amounts):
+    """Allocate ``{employee_id: amount}`` to the employees' funds under ``admin_id``."""
+    now = datetime.utcnow()
+    existing = {employee_id for (employee_id,) in db.session.query(EmployeeFund.employee_id).filter(
+        EmployeeFund.admin_id == admin_id, EmployeeFund.employee_id.in_(amounts))}
+    _insert_missing(funds, [
+        {'employee_id': employee_id, 'admin_id': admin_id, 'amount_allocated': 0, 'amount_spent': 0,
+         'remaining_balance': 0, 'created_at': now, 'updated_at': now}
+        for employee_id in amounts if employee_id not in existing
+    ])
+    db.session.execute(
+        funds.update()
+        .where(funds.c.employee_id == bindparam('target_id'), funds.c.admin_id == admin_id)
+        .values(amount_allocated=funds.c.amount_allocated + bindparam('amount'),
+                remaining_balance=funds.c.remaining_balance + bindparam('amount'), updated_at=now),
+        [{'target_id': employee_id, 'amount': amount} for employee_id, amount in amounts.items()]
+    )
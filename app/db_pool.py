@@ -0,0 +1,94 @@
+"""Database connection pool settings and live pool statistics.
+
+The pool is configured from the environment:
+
+    DB_POOL_SIZE       connections kept open per worker (default 5)
+    DB_MAX_OVERFLOW    extra connections allowed under load (default 10)
+    DB_POOL_RECYCLE    seconds before a connection is replaced; keep it below
+                       the server's wait_timeout (default 280)
+    DB_POOL_PRE_PING   test each connection on checkout (default true)
+    DB_POOL_TIMEOUT    seconds to wait for a free connection (default 30)
+
+``InstrumentedQueuePool`` counts checkouts, checkout wait, timeouts and
+invalidated connections. ``pool_stats()`` reports them for the current worker.
+"""
+import os
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+from app.pagination import parse_flag
+
+
+class InstrumentedQueuePool(QueuePool):
+    """``QueuePool`` that records how long callers wait for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.invalidated = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        event.listen(self, 'invalidate', self._on_invalidate)
+        event.listen(self, 'soft_invalidate', self._on_invalidate)
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._stats_lock:
+            self.invalidated += 1
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'size': self.size(),
+                'checked_out': self.checkedout(),
+                'idle': self.checkedin(),
+                'overflow_in_use': max(self.overflow(), 0),
+                'max_overflow': self._max_overflow,
+                'checkouts': self.checkouts,
+                'checkout_wait_avg_ms': round(self.wait_total * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+                'checkout_wait_max_ms': round(self.wait_max * 1000, 3),
+                'timeouts': self.timeouts,
+                'invalidated': self.invalidated
+            }
+
+
+def engine_options_from_env(database_uri):
+    """``SQLALCHEMY_ENGINE_OPTIONS`` for ``database_uri`` from the DB_POOL_* variables."""
+    if not database_uri or ':memory:' in database_uri:
+        # In-memory SQLite needs its single shared connection
+        return {}
+    return {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 10)),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 280)),
+        'pool_pre_ping': parse_flag(os.getenv('DB_POOL_PRE_PING', 'true')),
+        'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', 30)),
+    }
+
+
+def pool_stats(engine):
+    pool = engine.pool
+    if isinstance(pool, InstrumentedQueuePool):
+        return pool.stats()
+    return {'status': pool.status()}
@@ -0,0 +1,100 @@
+"""User directory query layer for the superadmin user/admin/employee lists.
+
+Every listing is a single statement: supervisor and budget data are joined in
+only when one of their fields is requested, callers can ask for a sparse set
+of fields, results are ordered (and optionally paged) by id, and the optional
+search is a name/email prefix match so it can use the indexes on both columns.
+"""
+from sqlalchemy import or_
+from sqlalchemy.orm import aliased
+
+from app.models import User, Budget
+from extensions import db
+
+Supervisor = aliased(User, name='supervisor')
+
+# Columns selected for each field a caller may request
+DIRECTORY_COLUMNS = {
+    'id': [User.id.label('id')],
+    'name': [User.name.label('name')],
+    'email': [User.email.label('email')],
+    'phone': [User.phone.label('phone')],
+    'role': [User.role.label('role')],
+    'is_active': [User.is_active.label('is_active')],
+    'created_at': [User.created_at.label('created_at')],
+    'supervisor': [
+        Supervisor.id.label('supervisor_id'),
+        Supervisor.name.label('supervisor_name'),
+        Supervisor.email.label('supervisor_email')
+    ],
+    'total_budget': [Budget.total_budget.label('total_budget')],
+    'total_spent': [Budget.total_spent.label('total_spent')],
+    'remaining': [Budget.remaining.label('remaining')],
+}
+BUDGET_FIELDS = {'total_budget', 'total_spent', 'remaining'}
+
+USER_FIELDS = ['id', 'name', 'email', 'phone', 'role', 'is_active', 'created_at']
+ADMIN_FIELDS = ['id', 'name', 'email', 'phone', 'is_active', 'created_at', 'total_budget', 'total_spent', 'remaining']
+EMPLOYEE_FIELDS = ['id', 'name', 'email', 'phone', 'is_active', 'created_at', 'supervisor']
+
+
+def parse_fields(value, default):
+    """Turn ``?fields=name,email`` into a field list; ``id`` is always included."""
+    if not value:
+        return list(default)
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in DIRECTORY_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return ['id'] + [field for field in fields if field != 'id']
+
+
+def _serialize(row, fields):
+    mapping = row._mapping
+    item = {}
+    for field in fields:
+        if field == 'created_at':
+            item[field] = mapping[field].strftime('%Y-%m-%d %H:%M:%S') if mapping[field] else None
+        elif field == 'supervisor':
+            item[field] = {
+                'id': mapping['supervisor_id'],
+                'name': mapping['supervisor_name'],
+                'email': mapping['supervisor_email']
+            }
+        elif field in BUDGET_FIELDS:
+            item[field] = float(mapping[field]) if mapping[field] is not None else 0.00
+        else:
+            item[field] = mapping[field]
+    return item
+
+
+def list_directory(fields, role=None, search=None, after_id=None, limit=None):
+    """Return ``(users, next_after_id)`` for one directory listing.
+
+    Without ``limit`` the whole matching directory is returned (still in one
+    statement); with it, one page of users with ``id > after_id``.
+    """
+    columns = [column for field in fields for column in DIRECTORY_COLUMNS[field]]
+    query = db.session.query(*columns).select_from(User)
+    if 'supervisor' in fields:
+        query = query.outerjoin(Supervisor, User.supervisor_id == Supervisor.id)
+    if BUDGET_FIELDS.intersection(fields):
+        query = query.outerjoin(Budget, Budget.admin_id == User.id)
+
+    if role:
+        query = query.filter(User.role == role)
+    if search:
+        prefix = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        query = query.filter(or_(User.name.like(prefix, escape='\\'), User.email.like(prefix, escape='\\')))
+    if after_id:
+        query = query.filter(User.id > after_id)
+    query = query.order_by(User.id.asc())
+
+    if not limit:
+        return [_serialize(row, fields) for row in query.all()], None
+
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_after_id = rows[-1].id if rows and has_more else None
+    return [_serialize(row, fields) for row in rows], next_after_id
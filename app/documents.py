@@ -0,0 +1,262 @@
+"""Content-addressed storage for expense receipts.
+
+Each distinct file is stored once, named by the SHA-256 of its bytes. It
+sits two directory levels down, under the first two pairs of hex digits:
+``uploads/3f/a2/3fa2...e9.png``. Every directory therefore stays small,
+even with millions of receipts. A ``documents`` row per file counts the
+expenses linked to it. A duplicate upload only adds a reference, and the
+file is deleted when the last one is released.
+
+``Expense.document_path`` keeps holding a bare filename, now the stored name
+``<sha256><ext>``, so document links and the serve routes are unchanged.
+``document_file`` maps either kind of name to its place on disk. Files from
+before the store (``<name>_<timestamp>.<ext>``) stay flat in the upload
+folder; ``migrate_documents.py`` moves them in.
+
+Reference changes are single conditional UPDATEs in the caller's transaction.
+An upload takes its reference before moving the file into place. A release
+deletes the row in the transaction, and the file only after the commit. The
+file is then left alone if an upload of the same content has recreated the
+row since, as that upload may have found the old file in place and kept it.
+
+``send_document`` serves a receipt. A stored file never changes, so its
+digest is a strong ETag and browsers may cache it for a year. Conditional
+and ``Range`` requests (PDF viewers fetch pages piecemeal) are answered
+from the headers. With ``DOCUMENT_OFFLOAD`` set, the response carries only
+headers, and a front proxy streams the bytes. ``x-sendfile`` hands the
+proxy the absolute path. ``x-accel-redirect`` hands nginx the path under
+``DOCUMENT_ACCEL_PREFIX``, an ``internal`` location aliased to the upload
+folder.
+"""
+import glob
+import hashlib
+import os
+import re
+import tempfile
+from datetime import datetime
+
+from flask import current_app, request
+from sqlalchemy import bindparam
+from sqlalchemy.exc import IntegrityError
+from werkzeug.utils import secure_filename, send_from_directory
+
+from app.images import recompress_upload
+from app.models import Document
+from extensions import db
+
+CHUNK_SIZE = 1024 * 1024
+INCOMING_FOLDER = '.incoming'
+ORIGINALS_FOLDER = '.originals'
+STORED_NAME = re.compile(r'^[0-9a-f]{64}\.[0-9a-z]{1,9}$')
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+documents = Document.__table__
+
+
+def is_stored_name(filename):
+    return bool(filename) and STORED_NAME.match(filename) is not None
+
+
+def document_file(upload_folder, filename):
+    """Absolute path of a document, stored or legacy, from its bare filename."""
+    filename = os.path.basename(filename)
+    if is_stored_name(filename):
+        return os.path.join(upload_folder, filename[:2], filename[2:4], filename)
+    return os.path.join(upload_folder, filename)
+
+
+def original_file(upload_folder, filename, extension):
+    """Where the pre-recompression original of a stored document is kept."""
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    return os.path.join(upload_folder, ORIGINALS_FOLDER, stem[:2], stem[2:4], stem + extension)
+
+
+def send_document(upload_folder, filename):
+    """Response serving a document by bare filename; raises ``NotFound`` if it is missing."""
+    filename = os.path.basename(filename)
+    relative_path = os.path.relpath(document_file(upload_folder, filename), upload_folder)
+    return send_upload(upload_folder, relative_path, filename[:64] if is_stored_name(filename) else None)
+
+
+def send_upload(upload_folder, relative_path, etag=None):
+    """Response serving a file under the upload folder; raises ``NotFound`` if it is missing.
+
+    With an ``etag`` the file is treated as immutable: that strong ETag and
+    a year of private caching. Without one, werkzeug's mtime-based ETag and
+    ``no-cache``.
+    """
+    offload = current_app.config.get('DOCUMENT_OFFLOAD')
+    response = send_from_directory(
+        upload_folder, relative_path, request.environ,
+        etag=etag or True,
+        max_age=IMMUTABLE_MAX_AGE if etag else None,
+        use_x_sendfile=bool(offload),
+        # The proxy answers Range requests itself when it streams the file
+        conditional=not offload,
+        response_class=current_app.response_class,
+    )
+    if etag:
+        # Receipts are only for signed-in users: let browsers keep them, not shared caches
+        response.cache_control.public = None
+        response.cache_control.private = True
+        response.cache_control.immutable = True
+
+    if not offload:
+        # Advertise ranges on full responses too, or PDF viewers never ask for them
+        response.accept_ranges = 'bytes'
+    else:
+        response.make_conditional(request.environ)
+        if response.status_code == 304:
+            response.headers.pop('X-Sendfile', None)
+        elif offload == 'x-accel-redirect':
+            response.headers.pop('X-Sendfile')
+            # nginx takes the length from the file it serves
+            response.content_length = None
+            prefix = current_app.config.get('DOCUMENT_ACCEL_PREFIX', '/protected-uploads/')
+            response.headers['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + relative_path.replace(os.sep, '/')
+    return response
+
+
+def acquire_document(digest, extension, size, count=1):
+    """Add ``count`` references to the document with this digest, creating its row if needed."""
+    now = datetime.utcnow()
+    add = documents.update().where(documents.c.sha256 == digest).values(
+        ref_count=documents.c.ref_count + count, updated_at=now)
+    if not db.session.execute(add).rowcount:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(documents.insert().values(
+                    sha256=digest, extension=extension, size=size, ref_count=count, created_at=now, updated_at=now))
+        except IntegrityError:
+            db.session.execute(add)
+    return Document.query.filter_by(sha256=digest).one()
+
+
+def _place(temp_path, path):
+    # Move a finished temporary file into place unless that content is already there
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(temp_path, path)
+
+
+def store_upload(file, upload_folder):
+    """Hash an uploaded ``FileStorage`` while writing it to disk and take a reference to it.
+
+    Large raster images may be re-encoded first (see ``app/images.py``); the
+    document is then the re-encoded file, and the original is kept under
+    ``.originals`` only if ``RECEIPT_KEEP_ORIGINALS`` is set.
+
+    Returns the ``Document``. Does not commit; the file is in place before
+    this returns, so a rolled-back upload at worst leaves an unreferenced file.
+    """
+    extension = os.path.splitext(secure_filename(file.filename))[1].lower()
+    incoming = os.path.join(upload_folder, INCOMING_FOLDER)
+    os.makedirs(incoming, exist_ok=True)
+    digest, size = hashlib.sha256(), 0
+    with tempfile.NamedTemporaryFile(dir=incoming, delete=False) as temp:
+        stored_path, original_path = temp.name, None
+        try:
+            for chunk in iter(lambda: file.stream.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+                temp.write(chunk)
+                size += len(chunk)
+        except BaseException:
+            os.unlink(temp.name)
+            raise
+
+    try:
+        recompressed = recompress_upload(stored_path, extension, size)
+        if recompressed:
+            data, original_extension = recompressed[0], extension
+            original_path, extension = stored_path, recompressed[1]
+            with tempfile.NamedTemporaryFile(dir=incoming, delete=False) as temp:
+                stored_path = temp.name
+                temp.write(data)
+            digest, size = hashlib.sha256(data), len(data)
+
+        document = acquire_document(digest.hexdigest(), extension, size)
+        _place(stored_path, document_file(upload_folder, document.filename))
+        if original_path and current_app.config.get('RECEIPT_KEEP_ORIGINALS'):
+            _place(original_path, original_file(upload_folder, document.filename, original_extension))
+        return document
+    finally:
+        # Whatever was not moved into place: duplicates, discarded originals, failures
+        for path in (stored_path, original_path):
+            if path and os.path.exists(path):
+                os.unlink(path)
+
+
+def _count(document_ids):
+    counts = {}
+    for document_id in document_ids:
+        if document_id:
+            counts[document_id] = counts.get(document_id, 0) + 1
+    return counts
+
+
+def _adjust_references(counts, sign):
+    db.session.execute(
+        documents.update().where(documents.c.id == bindparam('document_id'))
+        .values(ref_count=documents.c.ref_count + bindparam('delta'), updated_at=datetime.utcnow()),
+        [{'document_id': document_id, 'delta': sign * count} for document_id, count in counts.items()]
+    )
+
+
+def add_document_references(document_ids):
+    """Add one reference per id to existing documents (repeat an id to add several)."""
+    counts = _count(document_ids)
+    if counts:
+        _adjust_references(counts, 1)
+
+
+def release_documents(document_ids):
+    """Drop one reference per id (repeat an id to drop several).
+
+    Returns the filenames whose last reference went; delete them with
+    ``delete_document_files`` once the transaction has committed.
+    """
+    counts = _count(document_ids)
+    if not counts:
+        return []
+    _adjust_references(counts, -1)
+    orphaned = Document.query.filter(Document.id.in_(counts), Document.ref_count <= 0).all()
+    filenames = [document.filename for document in orphaned]
+    if orphaned:
+        db.session.execute(documents.delete().where(
+            documents.c.id.in_([document.id for document in orphaned]), documents.c.ref_count <= 0))
+    return filenames
+
+
+def delete_document_files(upload_folder, filenames, logger=None):
+    """Remove documents, and any kept originals, from disk, logging rather than raising on failure.
+
+    Stored documents whose row exists again (re-uploaded since their release) are kept.
+    """
+    digests = [filename[:64] for filename in filenames if is_stored_name(filename)]
+    live = {digest for (digest,) in db.session.query(Document.sha256).filter(
+        Document.sha256.in_(digests))} if digests else set()
+    for filename in filenames:
+        if is_stored_name(filename) and filename[:64] in live:
+            if logger:
+                logger.info(f"Kept re-uploaded document: {filename}")
+            continue
+        originals = []
+        if is_stored_name(filename):
+            originals = glob.glob(glob.escape(original_file(upload_folder, filename, '')) + '.*')
+        for path in originals:
+            try:
+                os.remove(path)
+            except OSError as e:
+                if logger:
+                    logger.error(f"Error deleting original {path}: {e}")
+        path = document_file(upload_folder, filename)
+        try:
+            os.remove(path)
+            if logger:
+                logger.info(f"Deleted document: {path}")
+        except FileNotFoundError:
+            if logger:
+                logger.warning(f"Document not found for deletion: {path}")
+        except OSError as e:
+            if logger:
+                logger.error(f"Error deleting document {path}: {e}")
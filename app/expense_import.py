@@ -0,0 +1,175 @@
+"""Bulk expense import from the admin transactions CSV.
+
+The accepted columns are those written by
+``/admin/export-employee-transactions-csv``. ``Name (Labour)``,
+``Description`` (the expense title) and ``Amount`` are required. ``Date``,
+``Type``, ``Site Name`` and ``Supporting Document (Invoice/Bill) Link`` are
+optional. Rows typed ``Allocation`` are skipped, so an export can be
+re-imported. A document link is kept only if that file is already stored:
+either a document in the content-addressed store, which gains a reference
+per imported row, or a legacy file in the upload folder.
+
+All rows are validated in one pass, and the labour names are resolved with a
+single ``IN`` query against the admin's own employees. The valid rows are
+inserted as pending expenses with batched executemany in the caller's
+transaction.
+"""
+import csv
+import os
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from app.documents import add_document_references, is_stored_name
+from app.models import User, Document, Expense
+from extensions import db
+
+INSERT_BATCH_SIZE = 1000
+REQUIRED_COLUMNS = ['Name (Labour)', 'Description', 'Amount']
+DATE_FORMATS = ['%Y-%m-%d %H:%M:%S', '%Y-%m-%d']
+MAX_AMOUNT = Decimal('9999999999999.99')
+
+
+class ImportFileError(ValueError):
+    """The upload as a whole is unusable (not CSV, missing columns, too many rows)."""
+
+
+def _parse_date(value):
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            pass
+    raise ValueError(f"Date must be YYYY-MM-DD or YYYY-MM-DD HH:MM:SS, got '{value}'")
+
+
+def _parse_amount(value):
+    try:
+        amount = Decimal(value.replace(',', ''))
+    except InvalidOperation:
+        raise ValueError(f"Amount '{value}' is not a number")
+    if not amount.is_finite() or amount <= 0:
+        raise ValueError('Amount must be positive')
+    if amount > MAX_AMOUNT or amount.as_tuple().exponent < -2:
+        raise ValueError(f"Amount '{value}' must have at most 2 decimal places and 13 digits")
+    return amount
+
+
+def parse_expense_csv(text_stream, admin_id, upload_folder=None, max_rows=None):
+    """Validate an uploaded CSV for ``admin_id``.
+
+    Returns ``(rows, errors, skipped)``. ``rows`` are ready for
+    ``insert_expenses``. ``errors`` and ``skipped`` are
+    ``{'line': n, ...}`` reports, where ``n`` is the CSV line number and the
+    header is line 1.
+    """
+    try:
+        reader = csv.DictReader(text_stream)
+        header = [column.strip() for column in reader.fieldnames or []]
+    except (csv.Error, UnicodeDecodeError) as e:
+        raise ImportFileError(f'Could not read CSV: {e}')
+    missing = [column for column in REQUIRED_COLUMNS if column not in header]
+    if missing:
+        raise ImportFileError(f"Missing columns: {', '.join(missing)}")
+    reader.fieldnames = header
+
+    now = datetime.utcnow()
+    parsed, errors, skipped = [], [], []
+    try:
+        for line_number, record in enumerate(reader, start=2):
+            if max_rows and len(parsed) + len(errors) >= max_rows:
+                raise ImportFileError(f'Too many rows: at most {max_rows} per import')
+            record = {key: (value or '').strip() for key, value in record.items() if key}
+            if not any(record.values()):
+                continue
+            if record.get('Type', '').lower() == 'allocation':
+                skipped.append({'line': line_number, 'reason': 'Allocation rows are not imported'})
+                continue
+
+            row_errors = []
+            name, title = record['Name (Labour)'], record['Description']
+            if not name:
+                row_errors.append('Name (Labour) is required')
+            if not title:
+                row_errors.append('Description is required')
+            elif len(title) > 255:
+                row_errors.append('Description is longer than 255 characters')
+            site_name = record.get('Site Name') or None
+            if site_name and len(site_name) > 255:
+                row_errors.append('Site Name is longer than 255 characters')
+            amount = created_at = None
+            try:
+                amount = _parse_amount(record['Amount'])
+            except ValueError as e:
+                row_errors.append(str(e))
+            try:
+                created_at = _parse_date(record['Date']) if record.get('Date') else now
+            except ValueError as e:
+                row_errors.append(str(e))
+
+            document_path = None
+            link = record.get('Supporting Document (Invoice/Bill) Link')
+            if link:
+                filename = os.path.basename(link)
+                if is_stored_name(filename):
+                    document_path = filename # Resolved against the documents table below
+                elif upload_folder and os.path.isfile(os.path.join(upload_folder, filename)):
+                    document_path = filename
+
+            if row_errors:
+                errors.append({'line': line_number, 'errors': row_errors})
+            else:
+                parsed.append((line_number, name, {
+                    'admin_id': admin_id,
+                    'title': title,
+                    'amount': amount,
+                    'site_name': site_name,
+                    'description': None,
+                    'document_path': document_path,
+                    'document_id': None,
+                    'status': 'pending',
+                    'created_at': created_at,
+                    'updated_at': created_at
+                }))
+    except (csv.Error, UnicodeDecodeError) as e:
+        raise ImportFileError(f'Could not read CSV: {e}')
+
+    # Resolve every labour name with one query against this admin's employees
+    names = {name for _, name, _ in parsed}
+    employee_ids = {}
+    if names:
+        for employee_id, name in db.session.query(User.id, User.name).filter(
+            User.role == 'employee', User.supervisor_id == admin_id, User.name.in_(names)
+        ):
+            employee_ids.setdefault(name, []).append(employee_id)
+
+    # Likewise every stored document link, by digest
+    digests = {row['document_path'][:64] for _, _, row in parsed if is_stored_name(row['document_path'])}
+    document_ids = {}
+    if digests:
+        document_ids = {f'{digest}{extension}': document_id for document_id, digest, extension in
+                        db.session.query(Document.id, Document.sha256, Document.extension)
+                        .filter(Document.sha256.in_(digests))}
+
+    rows = []
+    for line_number, name, row in parsed:
+        if is_stored_name(row['document_path']):
+            row['document_id'] = document_ids.get(row['document_path'])
+            if not row['document_id']:
+                row['document_path'] = None
+        matches = employee_ids.get(name, [])
+        if len(matches) != 1:
+            reason = f"No labour named '{name}' is managed by you" if not matches else \
+                f"More than one labour you manage is named '{name}'"
+            errors.append({'line': line_number, 'errors': [reason]})
+            continue
+        row['employee_id'] = matches[0]
+        rows.append(row)
+    errors.sort(key=lambda error: error['line'])
+    return rows, errors, skipped
+
+
+def insert_expenses(rows):
+    """Insert validated rows with batched executemany; does not commit."""
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        db.session.execute(Expense.__table__.insert(), rows[start:start + INSERT_BATCH_SIZE])
+    add_document_references(row['document_id'] for row in rows)
@@ -0,0 +1,69 @@
+"""Per-worker cache behind Flask-Login's ``user_loader``.
+
+Every authenticated request resolves ``current_user``; on a cache hit that
+costs no SQL. Entries are keyed by ``(user_id, version)``. Write paths that
+change a user's identity (profile, role, status, password) call
+``bump_user_version`` after they commit, which makes the worker's cached entry
+unreachable at once. Other workers keep theirs for at most ``USER_CACHE_TTL``
+seconds.
+
+The password hash is not cached: a cached user is re-attached to the session
+without it, and reading it loads it from the database like any expired column.
+"""
+import threading
+
+from flask import current_app
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.cache import TTLCache
+from app.models import User
+from extensions import db
+
+DEFAULT_USER_CACHE_TTL = 30
+UNCACHED_COLUMNS = {'password'}
+
+user_cache = TTLCache(maxsize=1024, ttl=DEFAULT_USER_CACHE_TTL)
+_versions = {}
+_versions_lock = threading.Lock()
+
+
+def user_version(user_id):
+    return _versions.get(user_id, 0)
+
+
+def bump_user_version(*user_ids):
+    """Invalidate this worker's cached identity of each user."""
+    with _versions_lock:
+        for user_id in user_ids:
+            if user_id:
+                _versions[user_id] = _versions.get(user_id, 0) + 1
+
+
+def _snapshot(user):
+    return {
+        attr.key: getattr(user, attr.key)
+        for attr in inspect(User).column_attrs
+        if attr.key not in UNCACHED_COLUMNS
+    }
+
+
+def _attach(values):
+    """Turn cached column values into a session-bound ``User`` without a query."""
+    user = User(**values)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+
+def load_cached_user(user_id):
+    # Read the version before the query so a bump racing with the load leaves
+    # the stored entry under a stale key instead of serving it.
+    key = (user_id, user_version(user_id))
+    values = user_cache.get(key)
+    if values is not None:
+        return _attach(values)
+
+    user = db.session.get(User, user_id)
+    if user is not None:
+        user_cache.set(key, _snapshot(user), ttl=current_app.config.get('USER_CACHE_TTL', DEFAULT_USER_CACHE_TTL))
+    return user
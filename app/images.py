@@ -0,0 +1,76 @@
+"""Decoding, downscaling and lossy re-encoding of receipt images.
+
+Used for thumbnails (``app/thumbnails.py``), and to recompress large raster
+receipts at upload and in ``recompress_uploads.py``. Receipts are mostly
+lossless PNG phone screenshots of several MB. The same pixels as WebP or
+JPEG, capped at a few thousand pixels, are a fraction of the size.
+
+Upload recompression is off unless ``RECEIPT_RECOMPRESS_FORMAT`` is set
+(``webp`` or ``jpeg``). When it is set, PNG, JPEG and BMP uploads of at
+least ``RECEIPT_RECOMPRESS_MIN_BYTES`` are re-encoded at
+``RECEIPT_RECOMPRESS_QUALITY``, no larger than ``RECEIPT_RECOMPRESS_MAX_SIDE``
+pixels on the longest side. A re-encode that is not smaller is discarded.
+Encoding never copies metadata (EXIF, GPS, colour-profile chunks). The EXIF
+orientation is applied to the pixels first, so nothing turns sideways.
+Whether the original is kept is up to ``store_upload``
+(``RECEIPT_KEEP_ORIGINALS``).
+"""
+import io
+import os
+
+from flask import current_app
+from PIL import Image, ImageOps
+
+FORMAT_EXTENSIONS = {'webp': '.webp', 'jpeg': '.jpg'}
+# Lossless or uncompressed formats worth re-encoding; GIF may be animated
+RASTER_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.bmp'}
+
+
+def open_image(source, max_side):
+    """Decode an image file upright, letting JPEG decode at a reduced scale near ``max_side``."""
+    with Image.open(source) as original:
+        original.draft('RGB', (max_side, max_side))
+        image = ImageOps.exif_transpose(original)
+        image.load()
+    return image
+
+
+def encode_image(image, image_format, quality, max_side):
+    """Bytes of ``image`` at most ``max_side`` px on its longest side, without metadata."""
+    image.thumbnail((max_side, max_side))
+    transparent = 'A' in image.getbands() or 'transparency' in image.info
+    if image_format == 'jpeg':
+        if transparent:
+            # JPEG has no alpha: flatten onto white rather than whatever the hidden pixels hold
+            rgba = image.convert('RGBA')
+            image = Image.new('RGB', rgba.size, 'white')
+            image.paste(rgba, mask=rgba.getchannel('A'))
+        else:
+            image = image.convert('RGB')
+    elif image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if transparent else 'RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format.upper(), quality=quality)
+    return buffer.getvalue()
+
+
+def recompress_file(source, image_format, quality, max_side):
+    """Re-encoded bytes of the image at ``source``, or None when they are not smaller."""
+    data = encode_image(open_image(source, max_side), image_format, quality, max_side)
+    return data if len(data) < os.path.getsize(source) else None
+
+
+def recompress_upload(path, extension, size):
+    """``(bytes, extension)`` to store in place of the upload at ``path``, or None to keep it as is."""
+    config = current_app.config
+    image_format = config.get('RECEIPT_RECOMPRESS_FORMAT')
+    if not image_format or extension not in RASTER_EXTENSIONS or size < config['RECEIPT_RECOMPRESS_MIN_BYTES']:
+        return None
+    try:
+        data = recompress_file(path, image_format, config['RECEIPT_RECOMPRESS_QUALITY'],
+                               config['RECEIPT_RECOMPRESS_MAX_SIDE'])
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        # Not a decodable image after all: store it as uploaded
+        current_app.logger.warning(f"Could not recompress upload ({extension}, {size} bytes): {e}")
+        return None
+    return (data, FORMAT_EXTENSIONS[image_format]) if data else None
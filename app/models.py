@@ -91,6 +91,25 @@ class Budget(db.Model):
     def __repr__(self):
         return f'<Budget for Admin {self.admin_id}>'
 
+# -------------------------
+# 📎 Document Model
+# -------------------------
+class Document(db.Model):
+    """One stored receipt file per distinct content (see app/documents.py)."""
+    __tablename__ = 'documents'
+
+    id = db.Column(db.Integer, primary_key=True)
+    sha256 = db.Column(db.String(64), unique=True, nullable=False)  # hex digest of the file's bytes
+    extension = db.Column(db.String(10), nullable=False)  # '.png', taken from the first upload of this content
+    size = db.Column(db.BigInteger, nullable=False)
+    ref_count = db.Column(db.Integer, default=0, nullable=False)  # expenses linking to this document
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def filename(self):
+        return f'{self.sha256}{self.extension}'
+
 # -------------------------
 # 💰 Expense Model
 # -------------------------
@@ -105,6 +124,7 @@ class Expense(db.Model):
     site_name = db.Column(db.String(255), nullable=True)
     description = db.Column(db.Text, nullable=True)
     document_path = db.Column(db.String(255), nullable=True)
+    document_id = db.Column(db.Integer, db.ForeignKey('documents.id'), nullable=True, index=True)
     status = db.Column(ENUM('pending', 'approved', 'rejected'), default='pending', nullable=False)
     rejection_reason = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
@@ -149,9 +169,66 @@ class EmployeeFund(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+# -------------------------
+# 📈 Monthly Spend Rollup Model
+# -------------------------
+class MonthlySpendRollup(db.Model):
+    """Approved spend per admin, employee, site and month.
+
+    Maintained by ``app.rollups`` when an expense is approved; rebuild it from
+    ``expenses`` with ``python rebuild_rollups.py``.
+    """
+    __tablename__ = 'monthly_spend_rollup'
+
+    id = db.Column(db.Integer, primary_key=True)
+    admin_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    employee_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    site_name = db.Column(db.String(255), nullable=False, default='')  # '' when the expense has no site
+    year_month = db.Column(db.String(7), nullable=False)  # 'YYYY-MM' of Expense.created_at
+    total_amount = db.Column(db.Numeric(15, 2), default=Decimal('0.00'), nullable=False)
+    expense_count = db.Column(db.Integer, default=0, nullable=False)
+    min_amount = db.Column(db.Numeric(15, 2), nullable=True)
+    max_amount = db.Column(db.Numeric(15, 2), nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+# -------------------------
+# 🕒 Approval Hour Histogram Model
+# -------------------------
+class ApprovalHourHistogram(db.Model):
+    """Approved expenses per admin, submission date and hour of day.
+
+    Summed over a date window it gives the 7x24 day-of-week/hour histogram
+    behind /ai/admin/day-patterns. Maintained by ``app.rollups`` alongside
+    ``MonthlySpendRollup``.
+    """
+    __tablename__ = 'approval_hour_histogram'
+
+    id = db.Column(db.Integer, primary_key=True)
+    admin_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    activity_date = db.Column(db.Date, nullable=False)  # date of Expense.created_at
+    day_of_week = db.Column(db.SmallInteger, nullable=False)  # 1 = Sunday ... 7 = Saturday
+    hour = db.Column(db.SmallInteger, nullable=False)
+    approval_count = db.Column(db.Integer, default=0, nullable=False)
+    total_amount = db.Column(db.Numeric(15, 2), default=Decimal('0.00'), nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 # -------------------------
 # 🔍 Indexes (Performance)
 # -------------------------
+# Directory prefix search on name (email already has a unique index)
+Index('idx_user_name', User.name)
 Index('idx_employee_funds_composite', EmployeeFund.employee_id, EmployeeFund.admin_id, unique=True)
 Index('idx_expenses_employee', Expense.employee_id)
-Index('idx_expenses_admin', Expense.admin_id)
\ No newline at end of file
+Index('idx_expenses_admin', Expense.admin_id)
+# Employee request history, paged on (created_at, id)
+Index('idx_expenses_employee_created', Expense.employee_id, Expense.created_at)
+# Receipt download authorisation: an employee's expense by stored filename
+Index('idx_expenses_employee_document', Expense.employee_id, Expense.document_path)
+# Admin ledger branches: allocations by sender, approved expenses by receiver
+Index('idx_transactions_sender_type_ts', Transaction.sender_id, Transaction.type, Transaction.timestamp)
+Index('idx_transactions_receiver_type_ts', Transaction.receiver_id, Transaction.type, Transaction.timestamp)
+Index('uq_monthly_spend_rollup_key', MonthlySpendRollup.admin_id, MonthlySpendRollup.employee_id,
+      MonthlySpendRollup.site_name, MonthlySpendRollup.year_month, unique=True)
+Index('idx_monthly_spend_rollup_admin_month', MonthlySpendRollup.admin_id, MonthlySpendRollup.year_month)
+Index('uq_approval_hour_histogram_key', ApprovalHourHistogram.admin_id, ApprovalHourHistogram.activity_date,
+      ApprovalHourHistogram.hour, unique=True)
\ No newline at end of file
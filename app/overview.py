@@ -0,0 +1,75 @@
+"""Superadmin overview snapshot.
+
+All the overview figures are computed together as one snapshot and cached
+for ``OVERVIEW_CACHE_TTL`` seconds. Write paths that change any of the
+figures call ``invalidate_overview()`` after they commit.
+"""
+from datetime import datetime
+from decimal import Decimal
+
+from flask import current_app
+from sqlalchemy import func
+
+from app.cache import TTLCache
+from app.models import User, Budget, Expense, Transaction
+from extensions import db
+
+DEFAULT_OVERVIEW_CACHE_TTL = 60
+_SNAPSHOT_KEY = 'superadmin-overview'
+_cache = TTLCache(maxsize=1, ttl=DEFAULT_OVERVIEW_CACHE_TTL)
+
+
+def compute_overview():
+    # User counts per role in one grouped query
+    role_counts = dict(db.session.query(User.role, func.count(User.id)).group_by(User.role).all())
+
+    total_budget_allocated, total_budget_spent = db.session.query(
+        func.sum(Budget.total_budget),
+        func.sum(Budget.total_spent)
+    ).one()
+
+    # Calculate total expenses across all employees and admins
+    total_expenses_overall = db.session.query(func.sum(Expense.amount))\
+        .filter(Expense.status == 'approved').scalar() or Decimal('0.00')
+
+    # Get top 5 employees by expense amount
+    top_employees = db.session.query(
+        User.name,
+        func.sum(Expense.amount).label('total_spent')
+    ).join(Expense, User.id == Expense.employee_id)\
+    .filter(Expense.status == 'approved')\
+    .group_by(User.name)\
+    .order_by(func.sum(Expense.amount).desc())\
+    .limit(5).all()
+
+    # Get overall transaction types distribution
+    transaction_type_distribution = db.session.query(
+        Transaction.type,
+        func.count(Transaction.id)
+    ).group_by(Transaction.type).all()
+
+    return {
+        'total_users': sum(role_counts.values()),
+        'total_superadmins': role_counts.get('superadmin', 0),
+        'total_admins': role_counts.get('admin', 0),
+        'total_employees': role_counts.get('employee', 0),
+        'total_budget_allocated': float(total_budget_allocated or Decimal('0.00')),
+        'total_budget_spent': float(total_budget_spent or Decimal('0.00')),
+        'total_expenses_overall': float(total_expenses_overall),
+        'top_employees_by_expense': [{'name': name, 'total_spent': float(total_spent)} for name, total_spent in top_employees],
+        'transaction_type_distribution': {t_type: count for t_type, count in transaction_type_distribution},
+        'generated_at': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+
+def get_overview(fresh=False):
+    """Return the cached snapshot, recomputing it when expired or ``fresh``."""
+    snapshot = None if fresh else _cache.get(_SNAPSHOT_KEY)
+    if snapshot is None:
+        snapshot = compute_overview()
+        _cache.set(_SNAPSHOT_KEY, snapshot, ttl=current_app.config.get('OVERVIEW_CACHE_TTL', DEFAULT_OVERVIEW_CACHE_TTL))
+    return snapshot
+
+
+def invalidate_overview():
+    _cache.invalidate(_SNAPSHOT_KEY)
@@ -0,0 +1,118 @@
+"""Keyset (cursor) pagination helpers shared by the list endpoints.
+
+Pages are ordered newest first on ``(sort_column, id)``. A cursor is an opaque
+token holding the sort value and id of the row at the edge of a page; passing
+it back as ``before`` fetches the next (older) page and as ``after`` the
+previous (newer) one. Unlike OFFSET paging, the cost of a page does not grow
+with how deep into the result set it is.
+"""
+import base64
+import heapq
+import json
+from datetime import datetime
+from itertools import islice
+
+from sqlalchemy import or_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(sort_value, row_id):
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_value, row_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Return ``(datetime, id)`` from a cursor produced by ``encode_cursor``."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except (ValueError, TypeError):
+        raise InvalidCursor(f"Invalid cursor: {token!r}")
+
+
+def parse_page_size(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    if value in (None, ''):
+        return default
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('limit must be an integer')
+    if size < 1:
+        raise ValueError('limit must be positive')
+    return min(size, maximum)
+
+
+def parse_flag(value):
+    """Interpret a query-string switch such as ``?all=true`` or ``?fresh=1``."""
+    return str(value or '').lower() in ('1', 'true', 'yes', 'on')
+
+
+def _older_than(query, sort_column, id_column, cursor):
+    sort_value, row_id = decode_cursor(cursor)
+    # The leading range on sort_column alone keeps the index usable; the OR
+    # only breaks ties between rows sharing a sort value.
+    return query.filter(
+        sort_column <= sort_value,
+        or_(sort_column < sort_value, id_column < row_id)
+    )
+
+
+def keyset_page(query, sort_column, id_column, key, limit, before=None, after=None):
+    """Fetch one page of ``query`` ordered by ``(sort_column, id_column)`` desc.
+
+    ``key(row)`` must return the ``(sort_value, id)`` of a result row. Returns
+    ``(rows, next_cursor, prev_cursor)``: ``next_cursor`` points at older rows,
+    ``prev_cursor`` at newer ones, and either is ``None`` at the end.
+    """
+    if after:
+        sort_value, row_id = decode_cursor(after)
+        query = query.filter(
+            sort_column >= sort_value,
+            or_(sort_column > sort_value, id_column > row_id)
+        ).order_by(sort_column.asc(), id_column.asc())
+    else:
+        if before:
+            query = _older_than(query, sort_column, id_column, before)
+        query = query.order_by(sort_column.desc(), id_column.desc())
+
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if after:
+        rows.reverse()
+
+    has_older = True if after else has_more
+    has_newer = has_more if after else bool(before)
+    next_cursor = encode_cursor(*key(rows[-1])) if rows and has_older else None
+    prev_cursor = encode_cursor(*key(rows[0])) if rows and has_newer else None
+    return rows, next_cursor, prev_cursor
+
+
+def merged_keyset_page(queries, sort_column, id_column, key, limit, before=None):
+    """Page through the union of several queries without a SQL ``OR``/``UNION``.
+
+    Each query must select rows keyed on the same ``(sort_column, id_column)``
+    (ids unique across all of them). Every branch is paged on its own index
+    and the branches are merged newest first in Python, so a page reads at
+    most ``limit + 1`` rows per branch. Returns ``(rows, next_cursor)``.
+    """
+    branches = []
+    for query in queries:
+        if before:
+            query = _older_than(query, sort_column, id_column, before)
+        branches.append(query.order_by(sort_column.desc(), id_column.desc()).limit(limit + 1).all())
+
+    rows = list(islice(heapq.merge(*branches, key=key, reverse=True), limit + 1))
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(*key(rows[-1])) if rows and has_more else None
+    return rows, next_cursor
@@ -0,0 +1,125 @@
+"""Password hashing and checking off the request thread.
+
+``generate_password_hash`` and ``check_password_hash`` are deliberately slow.
+PBKDF2 with 600,000 iterations takes about 0.3s per call. Two paths move that
+work into process pools, started on first use with the ``spawn`` start method
+(forking a threaded web worker is not safe). The pools live for the life of
+the worker process, unless one of their processes dies (OOM kill, crash).
+The broken pool is then dropped and the work retried once on a new one.
+
+* ``hash_passwords`` serves bulk provisioning. It fans a batch out to
+  ``PASSWORD_HASH_WORKERS`` processes, so hundreds of hashes use every core
+  instead of holding one request thread for minutes. Small batches, or a pool
+  size of 1, are hashed inline.
+* ``verify_password`` serves ``/auth/login``. Checks run on a separate pool of
+  ``LOGIN_HASH_WORKERS`` processes, which caps how much CPU a burst of
+  sign-ins can take from other requests. At most ``LOGIN_HASH_MAX_PENDING``
+  checks may be running or queued; past that, ``PasswordCheckBusy`` is
+  raised rather than queueing without bound. ``LOGIN_HASH_WORKERS = 0``
+  checks inline.
+
+``PASSWORD_HASH_METHOD`` sets the hash and its cost, e.g.
+``pbkdf2:sha256:600000``. ``verify_password`` also reports when a stored hash
+uses a different method, and returns a fresh hash so the caller can upgrade it.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+DEFAULT_HASH_METHOD = 'pbkdf2:sha256:600000'
+# Below this many passwords the pool's start-up and IPC cost more than they save
+INLINE_HASH_LIMIT = 4
+
+_pools = {}
+_pools_lock = threading.Lock()
+_login_slots = {}
+
+
+class PasswordCheckBusy(Exception):
+    """Too many login password checks are already running or queued."""
+
+
+def _get_pool(name, workers):
+    with _pools_lock:
+        if (name, workers) not in _pools:
+            _pools[name, workers] = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return _pools[name, workers]
+
+
+def _run_on_pool(name, workers, task):
+    """Return ``task(pool)``, retried once on a new pool if a process of the pool died."""
+    for attempt in range(2):
+        pool = _get_pool(name, workers)
+        try:
+            return task(pool)
+        except BrokenProcessPool:
+            # A broken executor fails every later submit: never hand it out again
+            with _pools_lock:
+                if _pools.get((name, workers)) is pool:
+                    del _pools[name, workers]
+            pool.shutdown(wait=False, cancel_futures=True)
+            if attempt:
+                raise
+            current_app.logger.warning(f"Password {name} pool broke; retrying on a new pool")
+
+
+def _get_login_slots(limit):
+    with _pools_lock:
+        if limit not in _login_slots:
+            _login_slots[limit] = threading.BoundedSemaphore(limit)
+        return _login_slots[limit]
+
+
+def hash_method():
+    return current_app.config.get('PASSWORD_HASH_METHOD', DEFAULT_HASH_METHOD)
+
+
+def hash_password(password):
+    """Hash one password inline with the configured method."""
+    return generate_password_hash(password, method=hash_method())
+
+
+def hash_passwords(passwords):
+    """Return a hash of each password, in order, using the configured method."""
+    passwords = list(passwords)
+    methods = [hash_method()] * len(passwords)
+    workers = current_app.config.get('PASSWORD_HASH_WORKERS', 1)
+    if workers <= 1 or len(passwords) < INLINE_HASH_LIMIT:
+        return list(map(generate_password_hash, passwords, methods))
+    chunksize = max(1, len(passwords) // (workers * 4))
+    return _run_on_pool('bulk', workers, lambda pool: list(
+        pool.map(generate_password_hash, passwords, methods, chunksize=chunksize)))
+
+
+def verify_password(password_hash, password):
+    """Check a login password; returns ``(valid, new_hash)``.
+
+    ``new_hash`` is set when the password is valid but was stored with a
+    method other than ``PASSWORD_HASH_METHOD``. Raises ``PasswordCheckBusy``
+    when ``LOGIN_HASH_MAX_PENDING`` checks are already in flight.
+    """
+    config = current_app.config
+    method = hash_method()
+    needs_rehash = password_hash.split('$', 1)[0] != method
+    workers = config.get('LOGIN_HASH_WORKERS', 0)
+    if workers <= 0:
+        valid = check_password_hash(password_hash, password)
+        return valid, generate_password_hash(password, method=method) if valid and needs_rehash else None
+
+    slots = _get_login_slots(config.get('LOGIN_HASH_MAX_PENDING', 32))
+    if not slots.acquire(blocking=False):
+        raise PasswordCheckBusy()
+    def check(pool):
+        valid = pool.submit(check_password_hash, password_hash, password).result()
+        new_hash = pool.submit(generate_password_hash, password, method).result() if valid and needs_rehash else None
+        return valid, new_hash
+
+    try:
+        return _run_on_pool('login', workers, check)
+    finally:
+        slots.release()
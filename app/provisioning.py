@@ -0,0 +1,193 @@
+"""Bulk user provisioning from a JSON list or a CSV upload.
+
+Each row has ``name``, ``email`` and ``password``, plus optional ``phone``,
+``role`` and a supervisor. The supervisor is given either as
+``supervisor_id`` or as ``supervisor_email``. CSV uploads use the same
+column names.
+
+Validation takes two queries whatever the batch size. One ``IN`` lookup finds
+emails that are already registered; the other resolves the referenced
+supervisors. ``insert_users`` then hashes the passwords through
+``hash_passwords``. It writes the users with batched executemany and reads
+their ids back by email. The matching ``Budget`` rows (admins) and
+``EmployeeFund`` rows (employees) are inserted the same way, all in the
+caller's transaction.
+"""
+import csv
+from datetime import datetime
+from io import TextIOWrapper
+
+from app.models import User, Budget, EmployeeFund
+from app.passwords import hash_passwords
+from extensions import db
+
+INSERT_BATCH_SIZE = 1000
+REQUIRED_COLUMNS = ['name', 'email', 'password']
+
+
+class ProvisionFileError(ValueError):
+    """The upload as a whole is unusable (not CSV, missing columns, too many rows)."""
+
+
+def read_csv_rows(text_stream, max_rows=None):
+    """Return ``[(line_number, record), ...]`` from a CSV; the header is line 1."""
+    try:
+        reader = csv.DictReader(text_stream)
+        header = [column.strip().lower() for column in reader.fieldnames or []]
+        missing = [column for column in REQUIRED_COLUMNS if column not in header]
+        if missing:
+            raise ProvisionFileError(f"Missing columns: {', '.join(missing)}")
+        reader.fieldnames = header
+        rows = []
+        for line_number, record in enumerate(reader, start=2):
+            record = {key: (value or '').strip() for key, value in record.items() if key}
+            if not any(record.values()):
+                continue
+            if max_rows and len(rows) >= max_rows:
+                raise ProvisionFileError(f'Too many rows: at most {max_rows} per request')
+            rows.append((line_number, record))
+        return rows
+    except (csv.Error, UnicodeDecodeError) as e:
+        raise ProvisionFileError(f'Could not read CSV: {e}')
+
+
+def read_request_rows(file, body, max_rows=None):
+    """Rows from an uploaded CSV ``file``, else from ``body['users']``.
+
+    JSON rows are numbered from 1 in list order.
+    """
+    if file and file.filename:
+        return read_csv_rows(TextIOWrapper(file.stream, encoding='utf-8-sig', newline=''), max_rows=max_rows)
+    users = (body or {}).get('users')
+    if not isinstance(users, list) or not users:
+        raise ProvisionFileError('Upload a CSV (field "file") or send {"users": [...]}')
+    if max_rows and len(users) > max_rows:
+        raise ProvisionFileError(f'Too many rows: at most {max_rows} per request')
+    return list(enumerate(users, start=1))
+
+
+def _parse_id(value):
+    if isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def validate_user_rows(rows, roles, default_supervisor_id=None, active_supervisors_only=False):
+    """Check ``[(row_number, record), ...]`` for users of the given ``roles``.
+
+    A row without a role gets the first of ``roles``. Employees without a
+    supervisor get ``default_supervisor_id``. Returns ``(valid, results)``:
+    ``results`` holds one ``{'row', 'email', 'status', ...}`` report per
+    row, in order, and ``valid`` pairs the reports of the valid rows with
+    their user columns and plain-text password.
+    """
+    results, checked = [], []
+    for row_number, record in rows:
+        record = record if isinstance(record, dict) else {}
+        value = lambda key: str(record.get(key) or '').strip()
+        name, email, password, phone = value('name'), value('email'), value('password'), value('phone') or None
+        role = value('role').lower() or roles[0]
+        supervisor_id, supervisor_email = record.get('supervisor_id'), value('supervisor_email')
+
+        errors = []
+        if not name:
+            errors.append('name is required')
+        elif len(name) > 100:
+            errors.append('name is longer than 100 characters')
+        if not email:
+            errors.append('email is required')
+        elif len(email) > 100 or '@' not in email:
+            errors.append(f"'{email}' is not a valid email")
+        if not password:
+            errors.append('password is required')
+        if phone and len(phone) > 20:
+            errors.append('phone is longer than 20 characters')
+        if role not in roles:
+            errors.append(f"role must be one of: {', '.join(roles)}")
+        if supervisor_id not in (None, '') and _parse_id(supervisor_id) is None:
+            errors.append('supervisor_id must be an integer')
+
+        result = {'row': row_number, 'email': email, 'role': role}
+        results.append(result)
+        checked.append((result, errors, {
+            'name': name, 'email': email, 'phone': phone, 'role': role,
+            'supervisor_id': _parse_id(supervisor_id), 'supervisor_email': supervisor_email
+        }, password))
+
+    # One lookup for emails already taken, one for every referenced supervisor
+    emails = {columns['email'] for _, _, columns, _ in checked if columns['email']}
+    taken = {email for (email,) in db.session.query(User.email).filter(User.email.in_(emails))} if emails else set()
+    supervisor_ids = {columns['supervisor_id'] for _, _, columns, _ in checked if columns['supervisor_id']}
+    if default_supervisor_id:
+        supervisor_ids.add(default_supervisor_id)
+    supervisor_emails = {columns['supervisor_email'] for _, _, columns, _ in checked if columns['supervisor_email']}
+    supervisors = db.session.query(User.id, User.email).filter(
+        User.role == 'admin', User.id.in_(supervisor_ids) | User.email.in_(supervisor_emails))
+    if active_supervisors_only:
+        supervisors = supervisors.filter(User.is_active.is_(True))
+    supervisors = supervisors.all()
+    supervisors_by_id = {supervisor_id for supervisor_id, _ in supervisors}
+    supervisors_by_email = {email: supervisor_id for supervisor_id, email in supervisors}
+
+    valid, seen = [], set()
+    for result, errors, columns, password in checked:
+        email = columns['email']
+        if email and email in seen:
+            errors.append('Duplicate email in this request')
+        elif email and email in taken:
+            errors.append('User with this email already exists')
+        seen.add(email)
+
+        supervisor_email = columns.pop('supervisor_email')
+        supervisor_id = columns['supervisor_id']
+        if columns['role'] != 'employee':
+            columns['supervisor_id'] = None
+        else:
+            if supervisor_email and not supervisor_id:
+                supervisor_id = supervisors_by_email.get(supervisor_email)
+            elif not supervisor_id:
+                supervisor_id = default_supervisor_id
+            if not supervisor_id and not supervisor_email:
+                errors.append('A supervisor is required for employees')
+            elif supervisor_id not in supervisors_by_id:
+                errors.append('Invalid supervisor specified')
+            columns['supervisor_id'] = supervisor_id
+
+        if errors:
+            result.update(status='failed', errors=errors)
+        else:
+            result['status'] = 'valid'
+            valid.append((result, columns, password))
+    return valid, results
+
+
+def insert_users(valid, created_by):
+    """Hash passwords and insert the validated users with their budget or fund; does not commit."""
+    now = datetime.utcnow()
+    hashes = hash_passwords(password for _, _, password in valid)
+    # executemany takes its column list from the first row, so every row carries the same keys
+    rows = [dict(columns, password=password_hash, created_by=created_by, is_active=True,
+                 created_at=now, updated_at=now)
+            for (_, columns, _), password_hash in zip(valid, hashes)]
+    ids = {}
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        batch = rows[start:start + INSERT_BATCH_SIZE]
+        db.session.execute(User.__table__.insert(), batch)
+        ids.update(db.session.query(User.email, User.id).filter(User.email.in_([row['email'] for row in batch])))
+
+    budgets, funds = [], []
+    for (result, columns, _) in valid:
+        user_id = result['id'] = ids[columns['email']]
+        result['status'] = 'created'
+        if columns['role'] == 'admin':
+            budgets.append({'admin_id': user_id, 'total_budget': 0, 'total_spent': 0, 'remaining': 0,
+                            'created_at': now, 'updated_at': now})
+        elif columns['role'] == 'employee':
+            funds.append({'employee_id': user_id, 'admin_id': columns['supervisor_id'], 'amount_allocated': 0,
+                          'amount_spent': 0, 'remaining_balance': 0, 'created_at': now, 'updated_at': now})
+    for model, model_rows in ((Budget, budgets), (EmployeeFund, funds)):
+        for start in range(0, len(model_rows), INSERT_BATCH_SIZE):
+            db.session.execute(model.__table__.insert(), model_rows[start:start + INSERT_BATCH_SIZE])
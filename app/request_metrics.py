@@ -0,0 +1,164 @@
+"""Per-request latency and SQL instrumentation.
+
+``init_request_metrics(app)`` hooks the request cycle and the engine's cursor
+events. Each request's wall time, SQL statement count, SQL time, rows and
+response bytes are aggregated per endpoint and per blueprint. The totals are
+in-process: each worker keeps its own, served at /superadmin/request-metrics.
+
+Requests slower than ``SLOW_REQUEST_MS`` are logged as one JSON record on the
+``slow_requests`` logger, with their slowest statements. Parameter values are
+replaced by their type names so no user data reaches the log.
+
+Rows are the driver's ``cursor.rowcount``. pymysql reports it for SELECTs;
+drivers that report -1 for SELECTs (sqlite3) only count DML rows. Streamed
+responses report 0 bytes, and their wall time ends when the headers are sent.
+"""
+import heapq
+import json
+import logging
+import threading
+import time
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+from extensions import db
+
+DEFAULT_SLOW_REQUEST_MS = 500
+SLOWEST_STATEMENTS = 5
+
+slow_request_logger = logging.getLogger('slow_requests')
+
+
+def _redact(parameters):
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            return f'<{len(parameters)} parameter sets>'
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+class RequestMetrics:
+    """Running totals of request samples per endpoint and per blueprint."""
+
+    FIELDS = ('wall_ms', 'sql_count', 'sql_ms', 'rows', 'response_bytes')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._blueprints = {}
+
+    def _add(self, table, key, sample):
+        totals = table.get(key)
+        if totals is None:
+            totals = table[key] = dict.fromkeys(('requests', 'max_wall_ms') + self.FIELDS, 0)
+        totals['requests'] += 1
+        totals['max_wall_ms'] = max(totals['max_wall_ms'], sample['wall_ms'])
+        for field in self.FIELDS:
+            totals[field] += sample[field]
+
+    def record(self, endpoint, blueprint, sample):
+        with self._lock:
+            self._add(self._endpoints, endpoint, sample)
+            self._add(self._blueprints, blueprint, sample)
+
+    @classmethod
+    def _summary(cls, totals):
+        count = totals['requests']
+        summary = {'requests': count, 'max_wall_ms': round(totals['max_wall_ms'], 3)}
+        for field in cls.FIELDS:
+            summary[f'avg_{field}'] = round(totals[field] / count, 3)
+        summary['total_sql_count'] = totals['sql_count']
+        return summary
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'endpoints': {key: self._summary(totals) for key, totals in self._endpoints.items()},
+                'blueprints': {key: self._summary(totals) for key, totals in self._blueprints.items()}
+            }
+
+    def clear(self):
+        with self._lock:
+            self._endpoints.clear()
+            self._blueprints.clear()
+
+
+request_metrics = RequestMetrics()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('request_metrics_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['request_metrics_started'].pop()
+    if not has_request_context() or 'request_sql' not in g:
+        return
+    elapsed = time.perf_counter() - started
+    sql = g.request_sql
+    sql['count'] += 1
+    sql['seconds'] += elapsed
+    sql['rows'] += max(cursor.rowcount, 0)
+    # Min-heap of the slowest statements; the counter breaks ties between equal times
+    entry = (elapsed, sql['count'], statement, parameters)
+    if len(sql['slowest']) < SLOWEST_STATEMENTS:
+        heapq.heappush(sql['slowest'], entry)
+    else:
+        heapq.heappushpop(sql['slowest'], entry)
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    started = exception_context.connection.info.get('request_metrics_started') if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+def _start_request():
+    g.request_started = time.perf_counter()
+    g.request_sql = {'count': 0, 'seconds': 0.0, 'rows': 0, 'slowest': []}
+
+
+def _finish_request(response):
+    if 'request_started' not in g:
+        return response
+    wall_ms = (time.perf_counter() - g.request_started) * 1000
+    sql = g.request_sql
+    sample = {
+        'wall_ms': wall_ms,
+        'sql_count': sql['count'],
+        'sql_ms': sql['seconds'] * 1000,
+        'rows': sql['rows'],
+        'response_bytes': 0 if response.is_streamed else (response.calculate_content_length() or 0)
+    }
+    endpoint = request.endpoint or '<unmatched>'
+    blueprint = request.blueprint or '<app>'
+    request_metrics.record(endpoint, blueprint, sample)
+
+    if wall_ms >= current_app.config.get('SLOW_REQUEST_MS', DEFAULT_SLOW_REQUEST_MS):
+        slow_request_logger.warning(json.dumps({
+            'event': 'slow_request',
+            'method': request.method,
+            'path': request.path,
+            'endpoint': endpoint,
+            'blueprint': blueprint,
+            'status': response.status_code,
+            **{key: round(value, 3) for key, value in sample.items()},
+            'slowest_statements': [
+                {'ms': round(elapsed * 1000, 3), 'statement': ' '.join(statement.split()), 'parameters': _redact(parameters)}
+                for elapsed, _, statement, parameters in sorted(sql['slowest'], reverse=True)
+            ]
+        }, default=str))
+    return response
+
+
+def init_request_metrics(app):
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(db.engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(db.engine, 'handle_error', _handle_error)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
@@ -0,0 +1,211 @@
+"""Incrementally maintained reporting rollups.
+
+``record_expense_approval`` (``record_expense_approvals`` for a batch) is
+called by the approval paths inside their own database transaction, so the
+rollups commit (or roll back) together with the expense. The ``rebuild_*``
+functions recompute a table from ``expenses`` with portable SQL for backfills
+and repairs (see ``rebuild_rollups.py``).
+"""
+from datetime import datetime
+
+from sqlalchemy import case, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.models import ApprovalHourHistogram, Expense, MonthlySpendRollup
+from app.sql_functions import date_of, day_of_week, hour_of, year_month
+from extensions import db
+
+DAY_NAMES = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+
+
+def month_key(timestamp):
+    return timestamp.strftime('%Y-%m')
+
+
+def _upsert(model, key, increments, initial):
+    """Apply ``increments`` to the ``model`` row matching ``key``, or insert it.
+
+    The first approval in a bucket inserts the row under a savepoint; if a
+    concurrent approval inserted the same key first, fall back to the update.
+    """
+    def apply_increments():
+        return db.session.execute(
+            update(model)
+            .where(*[getattr(model, column) == value for column, value in key.items()])
+            .values(updated_at=datetime.utcnow(), **increments)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+    if apply_increments():
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(model(**key, **initial))
+    except IntegrityError:
+        apply_increments()
+
+
+def record_expense_approval(expense):
+    """Update every rollup for ``expense``, which has just been approved.
+
+    Does not commit: the caller's transaction covers the expense and rollups.
+    """
+    record_expense_approvals([expense])
+
+
+def record_expense_approvals(expenses):
+    """Update the rollups for a batch of approved expenses, one upsert per bucket.
+
+    Does not commit: the caller's transaction covers the expenses and rollups.
+    """
+    months = {}
+    hours = {}
+    for expense in expenses:
+        amount = expense.amount
+        submitted_at = expense.created_at or datetime.utcnow()
+        month = months.setdefault(
+            (expense.admin_id, expense.employee_id, expense.site_name or '', month_key(submitted_at)),
+            {'total': 0, 'count': 0, 'min': amount, 'max': amount}
+        )
+        month['total'] += amount
+        month['count'] += 1
+        month['min'] = min(month['min'], amount)
+        month['max'] = max(month['max'], amount)
+        hour = hours.setdefault(
+            (expense.admin_id, submitted_at.date(), submitted_at.hour),
+            # Python's weekday() is 0 = Monday; store 1 = Sunday like DAYOFWEEK()
+            {'total': 0, 'count': 0, 'day_of_week': (submitted_at.weekday() + 1) % 7 + 1}
+        )
+        hour['total'] += amount
+        hour['count'] += 1
+
+    rollup = MonthlySpendRollup
+    for (admin_id, employee_id, site_name, year_month_key), bucket in months.items():
+        _upsert(
+            rollup,
+            {'admin_id': admin_id, 'employee_id': employee_id, 'site_name': site_name, 'year_month': year_month_key},
+            {
+                'total_amount': rollup.total_amount + bucket['total'],
+                'expense_count': rollup.expense_count + bucket['count'],
+                'min_amount': case((rollup.min_amount > bucket['min'], bucket['min']), else_=rollup.min_amount),
+                'max_amount': case((rollup.max_amount < bucket['max'], bucket['max']), else_=rollup.max_amount),
+            },
+            {'total_amount': bucket['total'], 'expense_count': bucket['count'],
+             'min_amount': bucket['min'], 'max_amount': bucket['max']}
+        )
+
+    histogram = ApprovalHourHistogram
+    for (admin_id, activity_date, hour_of_day), bucket in hours.items():
+        _upsert(
+            histogram,
+            {'admin_id': admin_id, 'activity_date': activity_date, 'hour': hour_of_day},
+            {
+                'approval_count': histogram.approval_count + bucket['count'],
+                'total_amount': histogram.total_amount + bucket['total'],
+            },
+            {'day_of_week': bucket['day_of_week'], 'approval_count': bucket['count'], 'total_amount': bucket['total']}
+        )
+
+
+def _approved_expenses(admin_id):
+    conditions = [Expense.status == 'approved', Expense.created_at.isnot(None)]
+    if admin_id:
+        conditions.append(Expense.admin_id == admin_id)
+    return conditions
+
+
+def _clear(model, admin_id):
+    query = model.query
+    if admin_id:
+        query = query.filter(model.admin_id == admin_id)
+    query.delete(synchronize_session=False)
+
+
+def rebuild_monthly_spend(admin_id=None):
+    """Recompute ``monthly_spend_rollup`` from approved expenses in one statement."""
+    _clear(MonthlySpendRollup, admin_id)
+
+    month = year_month(Expense.created_at)
+    site = func.coalesce(Expense.site_name, '')
+    source = select(
+        Expense.admin_id,
+        Expense.employee_id,
+        site,
+        month,
+        func.sum(Expense.amount),
+        func.count(Expense.id),
+        func.min(Expense.amount),
+        func.max(Expense.amount),
+        func.now()
+    ).where(*_approved_expenses(admin_id)).group_by(Expense.admin_id, Expense.employee_id, site, month)
+
+    result = db.session.execute(insert(MonthlySpendRollup).from_select([
+        'admin_id', 'employee_id', 'site_name', 'year_month', 'total_amount',
+        'expense_count', 'min_amount', 'max_amount', 'updated_at'
+    ], source))
+    db.session.commit()
+    return result.rowcount
+
+
+def rebuild_approval_histogram(admin_id=None):
+    """Recompute ``approval_hour_histogram`` from approved expenses in one statement."""
+    _clear(ApprovalHourHistogram, admin_id)
+
+    day = date_of(Expense.created_at)
+    weekday = day_of_week(Expense.created_at)
+    hour = hour_of(Expense.created_at)
+    source = select(
+        Expense.admin_id,
+        day,
+        weekday,
+        hour,
+        func.count(Expense.id),
+        func.sum(Expense.amount),
+        func.now()
+    ).where(*_approved_expenses(admin_id)).group_by(Expense.admin_id, day, weekday, hour)
+
+    result = db.session.execute(insert(ApprovalHourHistogram).from_select([
+        'admin_id', 'activity_date', 'day_of_week', 'hour', 'approval_count', 'total_amount', 'updated_at'
+    ], source))
+    db.session.commit()
+    return result.rowcount
+
+
+def monthly_spend(admin_id, since_month, employee_id=None, site_name=None):
+    """Per-month ``(year_month, total, count)`` for an admin from ``since_month`` on.
+
+    Optionally narrowed to one employee or one site (``None`` site = all sites).
+    """
+    rollup = MonthlySpendRollup
+    query = db.session.query(
+        rollup.year_month,
+        func.sum(rollup.total_amount),
+        func.sum(rollup.expense_count)
+    ).filter(rollup.admin_id == admin_id, rollup.year_month >= since_month)
+    if employee_id:
+        query = query.filter(rollup.employee_id == employee_id)
+    if site_name is not None:
+        query = query.filter(rollup.site_name == site_name)
+    return query.group_by(rollup.year_month).order_by(rollup.year_month).all()
+
+
+def approval_patterns(admin_id, start_date=None, end_date=None):
+    """Day-of-week and hour-of-day ``(bucket, count, amount)`` rows for an admin.
+
+    ``start_date``/``end_date`` are optional inclusive ``date`` bounds.
+    """
+    histogram = ApprovalHourHistogram
+    conditions = [histogram.admin_id == admin_id]
+    if start_date:
+        conditions.append(histogram.activity_date >= start_date)
+    if end_date:
+        conditions.append(histogram.activity_date <= end_date)
+
+    def totals_by(column):
+        return db.session.query(
+            column,
+            func.sum(histogram.approval_count),
+            func.sum(histogram.total_amount)
+        ).filter(*conditions).group_by(column).order_by(column).all()
+
+    return totals_by(histogram.day_of_week), totals_by(histogram.hour)
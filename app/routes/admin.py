@@ -1,17 +1,28 @@
 # admin.py
 import os
-import mimetypes
-from flask import Blueprint, request, jsonify, current_app, make_response, send_from_directory
+from flask import Blueprint, request, jsonify, current_app, make_response
 from flask_login import login_required, current_user
 from app.models import User, Budget, Expense, Transaction, EmployeeFund
+from app.balances import credit_fund, credit_funds, debit_budget, debit_fund, parse_allocations
+from app.cache import admin_section_cache, invalidate_admin_sections
+from app.documents import delete_document_files, is_stored_name, release_documents, send_document, store_upload
+from app.expense_import import ImportFileError, insert_expenses, parse_expense_csv
+from app.passwords import hash_password
+from app.pagination import DEFAULT_PAGE_SIZE, InvalidCursor, merged_keyset_page, parse_flag, parse_page_size
+from app.provisioning import ProvisionFileError, insert_users, read_request_rows, validate_user_rows
+from app.overview import invalidate_overview
+from app.rollups import record_expense_approval, record_expense_approvals
+from app.thumbnails import delete_thumbnails, parse_thumbnail_size, schedule_thumbnails, send_thumbnail, thumbnail_url
+from app.routes.ai_insights import day_patterns_data, employee_performance_data, spending_trends_data
 from extensions import db
-from sqlalchemy import func, case, and_, or_
+from sqlalchemy import func, case, and_, or_, null
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timedelta
-from werkzeug.security import generate_password_hash
+from werkzeug.exceptions import NotFound
 from werkzeug.utils import secure_filename
 from decimal import Decimal
 import csv
-from io import StringIO
+from io import StringIO, TextIOWrapper
 from sqlalchemy.orm import aliased
 
 admin_bp = Blueprint('admin', __name__)
@@ -23,87 +34,77 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-@admin_bp.route('/dashboard')
-@login_required
-def get_dashboard():
-    if current_user.role != 'admin':
-        return jsonify({'error': 'Unauthorized'}), 403
+def _dashboard_data(admin_id):
+    budget = Budget.query.filter_by(admin_id=admin_id).first()
+    if not budget:
+        # If no budget is set, return default zero values and an empty pending expenses list
+        return {
+            'budget': {
+                'total_budget': 0,
+                'total_spent': 0, # This refers to admin's own spent budget
+                'remaining': 0
+            },
+            'pending_count': 0,
+            'employees_count': 0,
+            'total_allocated_to_employees': 0,
+            'total_spent_by_employees': 0,
+            'recent_pending_expenses': []
+        }
 
-    try:
-        budget = Budget.query.filter_by(admin_id=current_user.id).first()
-        if not budget:
-            # If no budget is set, return default zero values and an empty pending expenses list
-            return jsonify({
-                'budget': {
-                    'total_budget': 0,
-                    'total_spent': 0, # This refers to admin's own spent budget
-                    'remaining': 0
-                },
-                'pending_count': 0,
-                'employees_count': 0,
-                'total_allocated_to_employees': 0,
-                'total_spent_by_employees': 0,
-                'recent_pending_expenses': []
-            })
-
-        pending_expenses_count = Expense.query.filter_by(admin_id=current_user.id, status='pending').count()
-        employees_count = User.query.filter_by(created_by=current_user.id, role='employee').count()
-
-        # Total amount allocated to employees by this admin
-        total_allocated_to_employees = db.session.query(func.sum(EmployeeFund.amount_allocated))\
-            .filter_by(admin_id=current_user.id).scalar() or Decimal('0.00')
-        
-        # Total amount spent by employees under this admin's management
-        total_spent_by_employees = db.session.query(func.sum(Expense.amount))\
-            .filter(Expense.admin_id == current_user.id, Expense.status == 'approved').scalar() or Decimal('0.00')
-
-        # Fetch recent pending expenses with employee details
-        recent_pending_expenses = db.session.query(Expense, User.name, User.email)\
-            .join(User, Expense.employee_id == User.id)\
-            .filter(Expense.admin_id == current_user.id, Expense.status == 'pending')\
-            .order_by(Expense.created_at.desc())\
-            .limit(5)\
-            .all()
-
-        pending_expenses_list = []
-        for expense, employee_name, employee_email in recent_pending_expenses:
-            pending_expenses_list.append({
-                'id': expense.id,
-                'employee_name': employee_name,
-                'employee_email': employee_email,
-                'title': expense.title,
-                'amount': float(expense.amount),
-                'created_at': expense.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                'site_name': expense.site_name
-            })
+    pending_expenses_count = Expense.query.filter_by(admin_id=admin_id, status='pending').count()
+    employees_count = User.query.filter_by(created_by=admin_id, role='employee').count()
 
+    # Total amount allocated to employees by this admin
+    total_allocated_to_employees = db.session.query(func.sum(EmployeeFund.amount_allocated))\
+        .filter_by(admin_id=admin_id).scalar() or Decimal('0.00')
+    
+    # Total amount spent by employees under this admin's management
+    total_spent_by_employees = db.session.query(func.sum(Expense.amount))\
+        .filter(Expense.admin_id == admin_id, Expense.status == 'approved').scalar() or Decimal('0.00')
 
-        return jsonify({
-            'budget': {
-                'total_budget': float(budget.total_budget),
-                'total_spent': float(budget.total_spent),
-                'remaining': float(budget.remaining)
-            },
-            'pending_count': pending_expenses_count,
-            'employees_count': employees_count,
-            'total_allocated_to_employees': float(total_allocated_to_employees),
-            'total_spent_by_employees': float(total_spent_by_employees),
-            'recent_pending_expenses': pending_expenses_list
+    # Fetch recent pending expenses with employee details
+    recent_pending_expenses = db.session.query(Expense, User.name, User.email)\
+        .join(User, Expense.employee_id == User.id)\
+        .filter(Expense.admin_id == admin_id, Expense.status == 'pending')\
+        .order_by(Expense.created_at.desc())\
+        .limit(5)\
+        .all()
+
+    pending_expenses_list = []
+    for expense, employee_name, employee_email in recent_pending_expenses:
+        pending_expenses_list.append({
+            'id': expense.id,
+            'employee_name': employee_name,
+            'employee_email': employee_email,
+            'title': expense.title,
+            'amount': float(expense.amount),
+            'created_at': expense.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'site_name': expense.site_name,
+            'thumbnail_url': thumbnail_url('/admin/documents', expense.document_path)
         })
-    except Exception as e:
-        current_app.logger.error(f"Error fetching admin dashboard data: {e}")
-        return jsonify({'error': 'Failed to fetch dashboard data'}), 500
 
-@admin_bp.route('/employees')
-@login_required
-def get_employees_managed_by_admin():
-    if current_user.role != 'admin':
-        return jsonify({'error': 'Unauthorized'}), 403
-    
-    employees = User.query.filter_by(supervisor_id=current_user.id, role='employee').all()
+    return {
+        'budget': {
+            'total_budget': float(budget.total_budget),
+            'total_spent': float(budget.total_spent),
+            'remaining': float(budget.remaining)
+        },
+        'pending_count': pending_expenses_count,
+        'employees_count': employees_count,
+        'total_allocated_to_employees': float(total_allocated_to_employees),
+        'total_spent_by_employees': float(total_spent_by_employees),
+        'recent_pending_expenses': pending_expenses_list
+    }
+
+def _managed_employees_data(admin_id):
+    # Employees and their fund with this admin in one statement
+    employees = db.session.query(User, EmployeeFund)\
+        .outerjoin(EmployeeFund, and_(EmployeeFund.employee_id == User.id, EmployeeFund.admin_id == admin_id))\
+        .filter(User.supervisor_id == admin_id, User.role == 'employee')\
+        .order_by(User.id)\
+        .all()
     employee_list = []
-    for employee in employees:
-        fund = EmployeeFund.query.filter_by(employee_id=employee.id, admin_id=current_user.id).first()
+    for employee, fund in employees:
         employee_list.append({
             'id': employee.id,
             'name': employee.name,
@@ -115,7 +116,27 @@ def get_employees_managed_by_admin():
             'spent_funds': float(fund.amount_spent) if fund else 0.00,
             'remaining_funds': float(fund.remaining_balance) if fund else 0.00
         })
-    return jsonify({'employees': employee_list})
+    return {'employees': employee_list}
+
+@admin_bp.route('/dashboard')
+@login_required
+def get_dashboard():
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    try:
+        return jsonify(_dashboard_data(current_user.id))
+    except Exception as e:
+        current_app.logger.error(f"Error fetching admin dashboard data: {e}")
+        return jsonify({'error': 'Failed to fetch dashboard data'}), 500
+
+@admin_bp.route('/employees')
+@login_required
+def get_employees_managed_by_admin():
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    return jsonify(_managed_employees_data(current_user.id))
 
 @admin_bp.route('/add-employee', methods=['POST'])
 @login_required
@@ -148,7 +169,7 @@ def add_employee():
             name=name,
             email=email,
             phone=phone,
-            password=generate_password_hash(password),
+            password=hash_password(password),
             role='employee',
             created_by=current_user.id, # Set created_by for new employees
             supervisor_id=supervisor_id,
@@ -161,6 +182,8 @@ def add_employee():
         new_fund = EmployeeFund(employee_id=new_employee.id, admin_id=supervisor_id, amount_allocated=Decimal('0.00'), amount_spent=Decimal('0.00'), remaining_balance=Decimal('0.00'))
         db.session.add(new_fund)
         db.session.commit()
+        invalidate_overview()
+        invalidate_admin_sections(current_user.id, supervisor_id)
         
         return jsonify({'message': 'Employee added successfully', 'employee': {'id': new_employee.id, 'name': new_employee.name, 'email': new_employee.email}}), 201
     except Exception as e:
@@ -168,6 +191,45 @@ def add_employee():
         current_app.logger.error(f"Error adding employee: {e}")
         return jsonify({'error': 'Failed to add employee'}), 500
 
+@admin_bp.route('/provision-employees', methods=['POST'])
+@login_required
+def provision_employees():
+    """Create many employees in one transaction; the supervisor defaults to you.
+
+    Takes a CSV upload (field ``file``) or ``{"users": [...]}`` with the
+    columns described in ``app/provisioning.py``. By default nothing is
+    created unless every row is valid; ``?partial=true`` creates the valid
+    rows and ``?dry_run=true`` only validates. Every row gets a result.
+    """
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    partial = parse_flag(request.args.get('partial'))
+    dry_run = parse_flag(request.args.get('dry_run'))
+
+    try:
+        rows = read_request_rows(request.files.get('file'), request.get_json(silent=True),
+                                 max_rows=current_app.config.get('USER_PROVISION_MAX_ROWS'))
+        valid, results = validate_user_rows(rows, ('employee',), default_supervisor_id=current_user.id,
+                                           active_supervisors_only=True)
+        failed = len(results) - len(valid)
+        if dry_run or (failed and not partial):
+            return jsonify({'created': 0, 'failed': failed, 'results': results}), 200 if dry_run else 400
+
+        insert_users(valid, current_user.id)
+        db.session.commit()
+        invalidate_overview()
+        invalidate_admin_sections(current_user.id, *{columns['supervisor_id'] for _, columns, _ in valid})
+        return jsonify({'created': len(valid), 'failed': failed, 'results': results}), 201
+    except ProvisionFileError as e:
+        return jsonify({'error': str(e)}), 400
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Some of these emails were registered by another request; please retry'}), 409
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error provisioning employees: {e}")
+        return jsonify({'error': 'Failed to provision employees'}), 500
+
 @admin_bp.route('/allocate-fund', methods=['POST'])
 @login_required
 def allocate_fund_to_employee():
@@ -188,29 +250,16 @@ def allocate_fund_to_employee():
         if amount <= 0:
             return jsonify({'error': 'Amount must be positive'}), 400
 
-        # Check if admin has sufficient budget
-        admin_budget = Budget.query.filter_by(admin_id=current_user.id).first()
-        if not admin_budget or admin_budget.remaining < amount:
-            return jsonify({'error': 'Insufficient budget'}), 400
-
         # FIX: Allow fund allocation to any employee where supervisor_id=current_user.id
         employee = User.query.filter_by(id=employee_id, role='employee', supervisor_id=current_user.id).first()
         if not employee:
             return jsonify({'error': 'Employee not found or not managed by you'}), 404
-        
-        fund = EmployeeFund.query.filter_by(employee_id=employee_id, admin_id=current_user.id).first()
-        if not fund:
-            fund = EmployeeFund(employee_id=employee_id, admin_id=current_user.id, amount_allocated=Decimal('0.00'), amount_spent=Decimal('0.00'), remaining_balance=Decimal('0.00'))
-            db.session.add(fund)
-            db.session.flush() # Ensure the new fund object is available for update
-
-        fund.amount_allocated += amount
-        fund.remaining_balance += amount
-        fund.updated_at = datetime.utcnow()
 
-        admin_budget.total_spent += amount # Admin's budget spent for allocation
-        admin_budget.remaining -= amount
-        admin_budget.updated_at = datetime.utcnow()
+        # The budget check and deduction are one conditional UPDATE, so concurrent allocations cannot overdraw it
+        if not debit_budget(current_user.id, amount):
+            db.session.rollback()
+            return jsonify({'error': 'Insufficient budget'}), 400
+        credit_fund(employee.id, current_user.id, amount)
 
         # Record transaction for fund allocation
         transaction = Transaction(
@@ -224,6 +273,8 @@ def allocate_fund_to_employee():
         db.session.add(transaction)
         
         db.session.commit()
+        invalidate_overview()
+        invalidate_admin_sections(current_user.id)
         
         return jsonify({'message': f'Fund of {amount} allocated to {employee.name} successfully', 'employee_id': employee.id}), 200
     except Exception as e:
@@ -231,6 +282,73 @@ def allocate_fund_to_employee():
         current_app.logger.error(f"Error allocating fund: {e}")
         return jsonify({'error': 'Failed to allocate fund'}), 500
 
+@admin_bp.route('/allocate-funds', methods=['POST'])
+@login_required
+def allocate_funds_to_employees():
+    """Allocate funds to many employees at one site in one transaction.
+
+    Body: ``{"site_name": "...", "description": "...", "allocations":
+    [{"employee_id": 1, "amount": 500}, ...]}``. The summed amount is checked
+    against the admin's budget once; if any item is invalid or the budget
+    does not cover the total, nothing is allocated.
+    """
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    data = request.get_json(silent=True) or {}
+    items = data.get('allocations')
+    description = data.get('description') or 'Fund allocation'
+    site_name = data.get('site_name')
+    if not isinstance(items, list) or not items or not site_name:
+        return jsonify({'error': 'Missing required fields (allocations, site_name)'}), 400
+    max_items = current_app.config.get('BULK_ALLOCATION_MAX_ITEMS', 1000)
+    if len(items) > max_items:
+        return jsonify({'error': f'At most {max_items} allocations per request'}), 400
+    amounts, errors = parse_allocations(items, 'employee_id')
+    if errors:
+        return jsonify({'error': 'Invalid allocations', 'errors': errors}), 400
+
+    try:
+        names = dict(db.session.query(User.id, User.name).filter(
+            User.id.in_(amounts), User.role == 'employee', User.supervisor_id == current_user.id
+        ))
+        errors = [{'index': index, 'employee_id': employee_id, 'error': 'Employee not found or not managed by you'}
+                  for index, employee_id in enumerate(amounts) if employee_id not in names]
+        if errors:
+            return jsonify({'error': 'Invalid allocations', 'errors': errors}), 404
+
+        total = sum(amounts.values(), Decimal('0.00'))
+        if not debit_budget(current_user.id, total):
+            db.session.rollback()
+            return jsonify({'error': 'Insufficient budget', 'total_amount': float(total)}), 400
+        credit_funds(current_user.id, amounts)
+
+        now = datetime.utcnow()
+        db.session.execute(Transaction.__table__.insert(), [{
+            'sender_id': current_user.id, # Admin is the sender
+            'receiver_id': employee_id,
+            'type': 'allocation',
+            'amount': amount,
+            'description': description,
+            'site_name': site_name,
+            'timestamp': now,
+            'created_at': now
+        } for employee_id, amount in amounts.items()])
+
+        db.session.commit()
+        invalidate_overview()
+        invalidate_admin_sections(current_user.id)
+
+        return jsonify({
+            'message': f'Funds of {total} allocated to {len(amounts)} employees successfully',
+            'allocated': len(amounts),
+            'total_amount': float(total)
+        }), 200
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error allocating funds: {e}")
+        return jsonify({'error': 'Failed to allocate funds'}), 500
+
 @admin_bp.route('/add-expense', methods=['POST'])
 @login_required
 def add_expense():
@@ -253,20 +371,15 @@ def add_expense():
         employee = User.query.filter_by(id=employee_id, role='employee', supervisor_id=current_user.id).first()
         if not employee:
             return jsonify({'error': 'Employee not found or not managed by you'}), 404
-        document_path = None
+        document = None
         if file and file.filename:
             if not allowed_file(file.filename):
                 return jsonify({'error': 'Invalid file type. Allowed: pdf, png, jpg, jpeg'}), 400
-            filename = secure_filename(file.filename)
             upload_folder = current_app.config.get('UPLOAD_FOLDER')
             if not upload_folder:
                 return jsonify({'error': 'Upload folder not configured'}), 500
-            base, ext = os.path.splitext(filename)
-            timestamp = datetime.now().strftime("%Y%m%d%H%M%S%f")
-            unique_filename = f"{base}_{timestamp}{ext}"
-            file_save_path = os.path.join(upload_folder, unique_filename)
-            file.save(file_save_path)
-            document_path = unique_filename  # Store only the filename, not the full path
+            # One stored copy per distinct file; duplicates only add a reference
+            document = store_upload(file, upload_folder)
         new_expense = Expense(
             employee_id=employee.id,
             admin_id=current_user.id,
@@ -274,17 +387,63 @@ def add_expense():
             amount=amount,
             site_name=site_name,
             description=description,
-            document_path=document_path,
+            document_path=document.filename if document else None,  # Store only the filename, not the full path
+            document_id=document.id if document else None,
             status='pending'
         )
         db.session.add(new_expense)
         db.session.commit()
+        invalidate_admin_sections(current_user.id)
+        if document:
+            schedule_thumbnails(upload_folder, document.filename)
         return jsonify({'message': 'Expense added successfully', 'expense_id': new_expense.id}), 201
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"Error adding expense: {e}")
         return jsonify({'error': 'Failed to add expense'}), 500
 
+@admin_bp.route('/import-expenses', methods=['POST'])
+@login_required
+def import_expenses():
+    """Import pending expenses from a CSV in the employee transactions export format.
+
+    By default nothing is imported unless every row is valid; ``?partial=true``
+    imports the valid rows and ``?dry_run=true`` only validates.
+    """
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    file = request.files.get('file')
+    if not file or not file.filename:
+        return jsonify({'error': 'No CSV file uploaded (field "file")'}), 400
+    partial = parse_flag(request.args.get('partial'))
+    dry_run = parse_flag(request.args.get('dry_run'))
+
+    try:
+        rows, errors, skipped = parse_expense_csv(
+            TextIOWrapper(file.stream, encoding='utf-8-sig', newline=''),
+            current_user.id,
+            upload_folder=current_app.config.get('UPLOAD_FOLDER'),
+            max_rows=current_app.config.get('EXPENSE_IMPORT_MAX_ROWS')
+        )
+    except ImportFileError as e:
+        return jsonify({'error': str(e)}), 400
+
+    report = {'valid': len(rows), 'imported': 0, 'errors': errors, 'skipped': skipped}
+    if dry_run or (errors and not partial) or not rows:
+        return jsonify(report), 400 if errors and not partial else 200
+
+    try:
+        insert_expenses(rows)
+        db.session.commit()
+        invalidate_admin_sections(current_user.id)
+        report['imported'] = len(rows)
+        return jsonify(report), 201
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error importing expenses: {e}")
+        return jsonify({'error': 'Failed to import expenses'}), 500
+
 @admin_bp.route('/expenses/<int:expense_id>/details')
 @login_required
 def get_expense_details(expense_id):
@@ -312,6 +471,9 @@ def get_expense_details(expense_id):
             'amount': float(expense.amount),
             'status': expense.status,
             'document_path': expense.document_path,
+            'thumbnail_url': thumbnail_url('/admin/documents', expense.document_path),
+            # Review-sized preview, far smaller than a full-resolution screenshot
+            'preview_url': thumbnail_url('/admin/documents', expense.document_path, current_app.config['THUMBNAIL_SIZES'][-1]),
             'site_name': expense.site_name,
             'created_at': expense.created_at.strftime('%Y-%m-%d %H:%M:%S') if expense.created_at else None,
             'updated_at': expense.updated_at.strftime('%Y-%m-%d %H:%M:%S') if expense.updated_at else None
@@ -320,6 +482,19 @@ def get_expense_details(expense_id):
         current_app.logger.error(f"Error fetching expense details: {e}")
         return jsonify({'error': 'Failed to fetch expense details'}), 500
 
+def _review_pending(expense_id, status):
+    """Move a pending expense to ``status`` with one conditional UPDATE.
+
+    Returns False when another request reviewed it first; the caller rolls back.
+    """
+    values = {'status': status, 'updated_at': datetime.utcnow()} # Update review timestamp
+    if status == 'rejected':
+        values['document_id'] = None # A rejected expense gives up its document reference
+    reviewed = Expense.__table__.update().where(
+        Expense.id == expense_id, Expense.status == 'pending'
+    ).values(**values)
+    return db.session.execute(reviewed).rowcount == 1
+
 @admin_bp.route('/expenses/<int:expense_id>/approve', methods=['POST'])
 @login_required
 def approve_expense(expense_id):
@@ -336,21 +511,17 @@ def approve_expense(expense_id):
         if expense.status != 'pending':
             return jsonify({'error': 'Expense is not in pending status'}), 400
         
-        employee_fund = EmployeeFund.query.filter_by(employee_id=expense.employee_id, admin_id=current_user.id).first()
-        if not employee_fund:
-            return jsonify({'error': 'Employee fund not found for this admin'}), 404
-        
-        if employee_fund.remaining_balance < expense.amount:
-            return jsonify({'error': 'Insufficient employee fund balance to approve this expense'}), 400
-        
-        # Update expense status
-        expense.status = 'approved'
-        expense.updated_at = datetime.utcnow() # Update review timestamp
+        # Claim the expense first so two concurrent approvals cannot both spend it
+        if not _review_pending(expense.id, 'approved'):
+            db.session.rollback()
+            return jsonify({'error': 'Expense is not in pending status'}), 400
 
         # Deduct from employee's allocated fund only on approval
-        employee_fund.amount_spent += expense.amount
-        employee_fund.remaining_balance -= expense.amount
-        employee_fund.updated_at = datetime.utcnow()
+        if not debit_fund(expense.employee_id, current_user.id, expense.amount):
+            db.session.rollback()
+            if not EmployeeFund.query.filter_by(employee_id=expense.employee_id, admin_id=current_user.id).count():
+                return jsonify({'error': 'Employee fund not found for this admin'}), 404
+            return jsonify({'error': 'Insufficient employee fund balance to approve this expense'}), 400
 
         # Record transaction for expense approval
         transaction = Transaction(
@@ -364,7 +535,12 @@ def approve_expense(expense_id):
         )
         db.session.add(transaction)
 
+        # Reporting rollups commit together with the approval
+        record_expense_approval(expense)
+
         db.session.commit()
+        invalidate_overview()
+        invalidate_admin_sections(current_user.id)
         
         return jsonify({'message': 'Expense approved successfully', 'expense_id': expense.id})
     except Exception as e:
@@ -387,25 +563,14 @@ def reject_expense(expense_id):
         if expense.status != 'pending':
             return jsonify({'error': 'Expense is not in pending status'}), 400
 
-        expense.status = 'rejected'
-        expense.updated_at = datetime.utcnow() # Update review timestamp
+        if not _review_pending(expense.id, 'rejected'):
+            db.session.rollback()
+            return jsonify({'error': 'Expense is not in pending status'}), 400
+        unused = _release_documents([expense])
         db.session.commit()
+        invalidate_admin_sections(current_user.id)
 
-        # --- DELETE ASSOCIATED DOCUMENT ---
-        if expense.document_path:
-            try:
-                upload_folder = current_app.config.get('UPLOAD_FOLDER')
-                # Use os.path.basename to get just the filename from document_path
-                # in case document_path stores a full path or a path from a different system
-                file_path = os.path.join(upload_folder, os.path.basename(expense.document_path))
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                    current_app.logger.info(f"Deleted document: {file_path}")
-                else:
-                    current_app.logger.warning(f"Document not found for deletion: {file_path}")
-            except Exception as e:
-                current_app.logger.error(f"Error deleting document {expense.document_path}: {e}")
-        # --- END DELETE ---
+        _delete_documents(unused)
 
         return jsonify({'message': 'Expense rejected successfully', 'expense_id': expense.id})
     except Exception as e:
@@ -413,6 +578,158 @@ def reject_expense(expense_id):
         current_app.logger.error(f"Error rejecting expense: {e}")
         return jsonify({'error': 'Failed to reject expense'}), 500
 
+def _release_documents(expenses):
+    """Drop rejected expenses' document references; call before the commit.
+
+    Returns the files to delete once it has committed: stored documents whose
+    last reference went, and legacy per-upload files no other live expense
+    links (an imported row can share one with the expense it was exported from).
+    """
+    unused = release_documents(expense.document_id for expense in expenses)
+    legacy = {expense.document_path for expense in expenses
+              if expense.document_path and not expense.document_id and not is_stored_name(expense.document_path)}
+    if legacy:
+        shared = {document_path for (document_path,) in db.session.query(Expense.document_path).filter(
+            Expense.document_path.in_(legacy), Expense.status != 'rejected',
+            Expense.id.notin_([expense.id for expense in expenses])).distinct()}
+        unused += sorted(legacy - shared)
+    return unused
+
+def _delete_documents(filenames):
+    """Remove rejected expenses' documents, and their previews, from the upload folder."""
+    upload_folder = current_app.config.get('UPLOAD_FOLDER')
+    delete_document_files(upload_folder, filenames, logger=current_app.logger)
+    delete_thumbnails(upload_folder, filenames)
+
+@admin_bp.route('/expenses/review', methods=['POST'])
+@login_required
+def review_expenses():
+    """Approve and reject many pending expenses in one transaction.
+
+    Body: ``{"items": [{"expense_id": 1, "decision": "approve"},
+    {"expense_id": 2, "decision": "reject", "reason": "..."}]}``. Every item
+    gets its own result. An item that cannot be applied (not found, not yours,
+    not pending, insufficient fund balance) fails alone, and the rest go ahead.
+    """
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    items = (request.get_json(silent=True) or {}).get('items')
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'items must be a non-empty list'}), 400
+    max_items = current_app.config.get('EXPENSE_REVIEW_MAX_ITEMS', 1000)
+    if len(items) > max_items:
+        return jsonify({'error': f'At most {max_items} items per request'}), 400
+
+    results = []
+    requested = {}
+    for item in items:
+        item = item if isinstance(item, dict) else {}
+        expense_id, decision = item.get('expense_id'), item.get('decision')
+        result = {'expense_id': expense_id, 'decision': decision}
+        results.append(result)
+        if not isinstance(expense_id, int) or isinstance(expense_id, bool) or decision not in ('approve', 'reject'):
+            result['error'] = 'Each item needs an integer expense_id and a decision of approve or reject'
+        elif expense_id in requested:
+            result['error'] = 'Duplicate expense_id in this request'
+        else:
+            requested[expense_id] = (result, item.get('reason'))
+
+    try:
+        now = datetime.utcnow()
+        # Lock the expenses, then their funds, each in id order so concurrent batches cannot deadlock
+        expenses = {
+            expense.id: expense for expense in
+            Expense.query.filter(Expense.id.in_(requested)).order_by(Expense.id).with_for_update().all()
+        } if requested else {}
+        approvals = []
+        rejections = []
+        for expense_id, (result, reason) in requested.items():
+            expense = expenses.get(expense_id)
+            if not expense:
+                result['error'] = 'Expense not found'
+            elif expense.admin_id != current_user.id:
+                result['error'] = 'Forbidden - You can only review your own managed expenses'
+            elif expense.status != 'pending':
+                result['error'] = 'Expense is not in pending status'
+            elif result['decision'] == 'approve':
+                approvals.append((expense, result))
+            else:
+                rejections.append((expense, result, reason))
+
+        employee_ids = {expense.employee_id for expense, _ in approvals}
+        funds = {
+            fund.employee_id: fund for fund in
+            EmployeeFund.query.filter(EmployeeFund.admin_id == current_user.id, EmployeeFund.employee_id.in_(employee_ids))
+            .order_by(EmployeeFund.id).with_for_update().all()
+        } if employee_ids else {}
+
+        # Deduct per employee in aggregate; an item that would overdraw its fund fails alone
+        spent = {employee_id: Decimal('0.00') for employee_id in funds}
+        approved = []
+        for expense, result in approvals:
+            fund = funds.get(expense.employee_id)
+            if not fund:
+                result['error'] = 'Employee fund not found for this admin'
+            elif fund.remaining_balance - spent[expense.employee_id] < expense.amount:
+                result['error'] = 'Insufficient employee fund balance to approve this expense'
+            else:
+                spent[expense.employee_id] += expense.amount
+                expense.status = 'approved'
+                expense.updated_at = now
+                result['status'] = 'approved'
+                approved.append(expense)
+        for employee_id, amount in spent.items():
+            if amount:
+                funds[employee_id].amount_spent += amount
+                funds[employee_id].remaining_balance -= amount
+                funds[employee_id].updated_at = now
+
+        unused = _release_documents([expense for expense, _, _ in rejections])
+        for expense, result, reason in rejections:
+            expense.status = 'rejected'
+            expense.updated_at = now
+            expense.document_id = None
+            if reason:
+                expense.rejection_reason = reason
+            result['status'] = 'rejected'
+
+        if approved:
+            db.session.execute(Transaction.__table__.insert(), [{
+                'sender_id': expense.employee_id, # Employee is the sender
+                'receiver_id': expense.admin_id, # Admin is the receiver (for tracking)
+                'expense_id': expense.id,
+                'type': 'expense',
+                'amount': expense.amount,
+                'description': expense.title,
+                'site_name': expense.site_name,
+                'timestamp': now,
+                'created_at': now
+            } for expense in approved])
+            # Reporting rollups commit together with the approvals
+            record_expense_approvals(approved)
+
+        db.session.commit()
+        if approved:
+            invalidate_overview()
+        if approved or rejections:
+            invalidate_admin_sections(current_user.id)
+        _delete_documents(unused)
+
+        for result in results:
+            if 'error' in result:
+                result['status'] = 'failed'
+        return jsonify({
+            'results': results,
+            'approved': len(approved),
+            'rejected': len(rejections),
+            'failed': sum(1 for result in results if result['status'] == 'failed')
+        })
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error reviewing expenses: {e}")
+        return jsonify({'error': 'Failed to review expenses'}), 500
+
 @admin_bp.route('/documents/<filename>')
 @login_required
 def serve_document(filename):
@@ -420,17 +737,57 @@ def serve_document(filename):
     if not upload_folder:
         return jsonify({'error': 'Upload folder not configured'}), 500
 
-    safe_filename = secure_filename(filename)
-    file_path = os.path.join(upload_folder, safe_filename)
-
-    if not os.path.exists(file_path):
+    # Make all documents public to any logged-in user
+    try:
+        return send_document(upload_folder, secure_filename(filename))
+    except NotFound:
         return jsonify({'error': 'Document not found'}), 404
 
-    # Make all documents public to any logged-in user
-    mimetype = mimetypes.guess_type(file_path)[0]
-    if not mimetype:
-        mimetype = 'application/octet-stream' # Default if type cannot be guessed
-    return send_from_directory(upload_folder, safe_filename, mimetype=mimetype)
+@admin_bp.route('/documents/<filename>/thumbnail')
+@login_required
+def serve_thumbnail(filename):
+    upload_folder = current_app.config.get('UPLOAD_FOLDER')
+    if not upload_folder:
+        return jsonify({'error': 'Upload folder not configured'}), 500
+    try:
+        size = parse_thumbnail_size(request.args.get('size'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Same visibility as the documents themselves
+    try:
+        return send_thumbnail(upload_folder, secure_filename(filename), size)
+    except NotFound:
+        return jsonify({'error': 'Preview not available'}), 404
+
+def _parse_date_range(start_date_str, end_date_str):
+    """Parse optional YYYY-MM-DD bounds into a half-open [start, end) range."""
+    start_date = datetime.min
+    end_date = datetime.max
+    try:
+        if start_date_str:
+            start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
+        if end_date_str:
+            end_date = datetime.strptime(end_date_str, '%Y-%m-%d') + timedelta(days=1) # Include end day
+    except ValueError:
+        raise ValueError('Dates must be in YYYY-MM-DD format')
+    return start_date, end_date
+
+def _serialize_employee_transaction(row):
+    transaction, sender_name, receiver_name, document_path = row
+    return {
+        'id': transaction.id,
+        'timestamp': transaction.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+        'type': transaction.type,
+        'amount': float(transaction.amount),
+        'description': transaction.description,
+        'sender_name': sender_name,
+        'receiver_name': receiver_name,
+        'expense_id': transaction.expense_id,
+        'document_link': f"/admin/documents/{os.path.basename(document_path)}" if document_path and transaction.type == 'expense' else None,
+        'thumbnail_url': thumbnail_url('/admin/documents', document_path) if transaction.type == 'expense' else None,
+        'site_name': transaction.site_name
+    }
 
 @admin_bp.route('/employee-transactions')
 @login_required
@@ -457,25 +814,146 @@ def get_employee_transactions():
         )\
         .order_by(Transaction.timestamp.desc()).all()
 
-        transaction_list = []
-        for transaction, sender_name, receiver_name, document_path in transactions:
-            transaction_list.append({
-                'id': transaction.id,
-                'timestamp': transaction.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-                'type': transaction.type,
-                'amount': float(transaction.amount),
-                'description': transaction.description,
-                'sender_name': sender_name,
-                'receiver_name': receiver_name,
-                'expense_id': transaction.expense_id,
-                'document_link': f"/admin/documents/{os.path.basename(document_path)}" if document_path and transaction.type == 'expense' else None,
-                'site_name': transaction.site_name
-            })
-        return jsonify({'transactions': transaction_list})
+        return jsonify({'transactions': [_serialize_employee_transaction(row) for row in transactions]})
     except Exception as e:
         current_app.logger.error(f"Error fetching employee transactions: {e}")
         return jsonify({'error': 'Failed to fetch employee transactions'}), 500
 
+def _ledger_page(admin_id, transaction_type=None, employee_id=None, start_date=datetime.min,
+                 end_date=datetime.max, limit=DEFAULT_PAGE_SIZE, before=None):
+    Sender = aliased(User)
+    Receiver = aliased(User)
+    branches = []
+
+    # Allocations made by this admin: served by (sender_id, type, timestamp)
+    if transaction_type in (None, '', 'allocation'):
+        allocations = db.session.query(
+            Transaction,
+            Sender.name.label('sender_name'),
+            Receiver.name.label('receiver_name'),
+            null().label('document_path')
+        ).outerjoin(Sender, Transaction.sender_id == Sender.id)\
+         .outerjoin(Receiver, Transaction.receiver_id == Receiver.id)\
+         .filter(Transaction.sender_id == admin_id, Transaction.type == 'allocation')
+        if employee_id:
+            allocations = allocations.filter(Transaction.receiver_id == employee_id)
+        branches.append(allocations)
+
+    # Approved expenses of this admin's employees: served by (receiver_id, type, timestamp)
+    if transaction_type in (None, '', 'expense'):
+        expenses = db.session.query(
+            Transaction,
+            Sender.name.label('sender_name'),
+            Receiver.name.label('receiver_name'),
+            Expense.document_path.label('document_path')
+        ).join(Expense, Transaction.expense_id == Expense.id)\
+         .outerjoin(Sender, Transaction.sender_id == Sender.id)\
+         .outerjoin(Receiver, Transaction.receiver_id == Receiver.id)\
+         .filter(
+            Transaction.receiver_id == admin_id,
+            Transaction.type == 'expense',
+            Expense.admin_id == admin_id,
+            Expense.employee_id == Transaction.sender_id
+        )
+        if employee_id:
+            expenses = expenses.filter(Transaction.sender_id == employee_id)
+        branches.append(expenses)
+
+    branches = [
+        branch.filter(Transaction.timestamp >= start_date, Transaction.timestamp < end_date)
+        for branch in branches
+    ]
+    transactions, next_cursor = merged_keyset_page(
+        branches, Transaction.timestamp, Transaction.id,
+        key=lambda row: (row[0].timestamp, row[0].id),
+        limit=limit,
+        before=before
+    )
+    return {
+        'transactions': [_serialize_employee_transaction(row) for row in transactions],
+        'next_cursor': next_cursor,
+        'limit': limit
+    }
+
+@admin_bp.route('/ledger')
+@login_required
+def get_ledger():
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    transaction_type = request.args.get('type')
+    try:
+        limit = parse_page_size(request.args.get('limit'))
+        start_date, end_date = _parse_date_range(request.args.get('start_date'), request.args.get('end_date'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if transaction_type not in (None, '', 'allocation', 'expense'):
+        return jsonify({'error': 'type must be allocation or expense'}), 400
+
+    try:
+        return jsonify(_ledger_page(
+            current_user.id,
+            transaction_type=transaction_type,
+            employee_id=request.args.get('employee_id', type=int),
+            start_date=start_date,
+            end_date=end_date,
+            limit=limit,
+            before=request.args.get('before')
+        ))
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Error fetching ledger: {e}")
+        return jsonify({'error': 'Failed to fetch ledger'}), 500
+
+# Sections of /admin/bootstrap, each the payload of the endpoint it replaces
+BOOTSTRAP_SECTIONS = {
+    'dashboard': _dashboard_data,
+    'employees': _managed_employees_data,
+    'ledger': _ledger_page,
+    'spending_trends': spending_trends_data,
+    'employee_performance': employee_performance_data,
+    'day_patterns': day_patterns_data,
+}
+
+@admin_bp.route('/bootstrap')
+@login_required
+def get_bootstrap():
+    """Everything the admin dashboard needs on load, in one response.
+
+    ``?sections=dashboard,employees`` limits the response to some sections;
+    each section is cached per admin and ``?fresh=true`` bypasses the cache.
+    """
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    sections = [name.strip() for name in request.args.get('sections', '').split(',') if name.strip()] or list(BOOTSTRAP_SECTIONS)
+    unknown = [name for name in sections if name not in BOOTSTRAP_SECTIONS]
+    if unknown:
+        return jsonify({'error': f"Unknown sections: {', '.join(unknown)}"}), 400
+    fresh = parse_flag(request.args.get('fresh'))
+    ttl = current_app.config.get('ADMIN_SECTION_CACHE_TTL', 30)
+
+    try:
+        payload = {
+            'user': {
+                'id': current_user.id,
+                'name': current_user.name,
+                'email': current_user.email,
+                'role': current_user.role
+            }
+        }
+        for name in dict.fromkeys(sections): # each section once, in request order
+            key = (current_user.id, name)
+            data = None if fresh else admin_section_cache.get(key)
+            if data is None:
+                data = BOOTSTRAP_SECTIONS[name](current_user.id)
+                admin_section_cache.set(key, data, ttl=ttl)
+            payload[name] = data
+        return jsonify(payload)
+    except Exception as e:
+        current_app.logger.error(f"Error fetching admin bootstrap data: {e}")
+        return jsonify({'error': 'Failed to fetch dashboard data'}), 500
 
 @admin_bp.route('/export-employee-transactions-csv')
 @login_required
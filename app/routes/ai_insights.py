@@ -1,14 +1,39 @@
 from flask import Blueprint, request, jsonify, current_app
 from flask_login import login_required, current_user
 from app.models import User, Budget, Expense, Transaction, EmployeeFund
+from app.rollups import DAY_NAMES, approval_patterns, month_key, monthly_spend
+from app.sql_functions import seconds_between
 from extensions import db
-from sqlalchemy import func, case, extract, and_, or_
+from sqlalchemy import func, case, and_, or_
 from datetime import datetime, timedelta
 from decimal import Decimal
 import calendar
 
 ai_insights_bp = Blueprint('ai_insights', __name__)
 
+def spending_trends_data(admin_id, employee_id=None, site_name=None):
+    # Get last 12 months of data
+    end_date = datetime.now()
+    # Set start_date to the beginning of the month 11 months ago to cover 12 full months
+    start_date = (end_date.replace(day=1) - timedelta(days=365/12 * 11)).replace(day=1)
+
+    # Monthly spending trends from the rollup (one row per month), optionally
+    # narrowed to a single employee or site
+    monthly_data = monthly_spend(admin_id, month_key(start_date), employee_id=employee_id, site_name=site_name)
+
+    trends_data = []
+    for period, total_spent, expense_count in monthly_data:
+        year, month = period.split('-')
+        month_name = calendar.month_abbr[int(month)]
+        expense_count = int(expense_count) if expense_count else 0
+        trends_data.append({
+            'period': f"{month_name} {int(year)}",
+            'total_spent': float(total_spent) if total_spent else 0.0,
+            'expense_count': expense_count,
+            'avg_expense': float(total_spent) / expense_count if expense_count else 0.0
+        })
+    return {'spending_trends': trends_data}
+
 @ai_insights_bp.route('/admin/spending-trends')
 @login_required
 def get_admin_spending_trends():
@@ -16,45 +41,60 @@ def get_admin_spending_trends():
         return jsonify({'error': 'Unauthorized'}), 403
 
     try:
-        # Get last 12 months of data
-        end_date = datetime.now()
-        # Set start_date to the beginning of the month 11 months ago to cover 12 full months
-        start_date = (end_date.replace(day=1) - timedelta(days=365/12 * 11)).replace(day=1)
-
-        # Monthly spending trends (using created_at for spending origination)
-        monthly_data = db.session.query(
-            extract('year', Expense.created_at).label('year'),
-            extract('month', Expense.created_at).label('month'),
-            func.sum(Expense.amount).label('total_spent'),
-            func.count(Expense.id).label('expense_count'),
-            func.avg(Expense.amount).label('avg_expense')
-        ).filter(
-            Expense.admin_id == current_user.id,
-            Expense.status == 'approved',
-            Expense.created_at >= start_date
-        ).group_by(
-            extract('year', Expense.created_at),
-            extract('month', Expense.created_at)
-        ).order_by(
-            extract('year', Expense.created_at),
-            extract('month', Expense.created_at)
-        ).all()
-
-        trends_data = []
-        for year, month, total_spent, expense_count, avg_expense in monthly_data:
-            month_name = calendar.month_abbr[int(month)]
-            trends_data.append({
-                'period': f"{month_name} {int(year)}",
-                'total_spent': float(total_spent) if total_spent else 0.0,
-                'expense_count': int(expense_count) if expense_count else 0,
-                'avg_expense': float(avg_expense) if avg_expense else 0.0
-            })
-        
-        return jsonify({'spending_trends': trends_data})
+        return jsonify(spending_trends_data(
+            current_user.id,
+            employee_id=request.args.get('employee_id', type=int),
+            site_name=request.args.get('site_name')
+        ))
     except Exception as e:
         current_app.logger.error(f"Error fetching admin spending trends: {e}")
         return jsonify({'error': 'Failed to fetch spending trends'}), 500
 
+def employee_performance_data(admin_id):
+    # One grouped statement for every employee managed by this admin:
+    # conditional counts per status and the average review time in SQL.
+    processed = and_(
+        Expense.status.in_(['approved', 'rejected']),
+        Expense.created_at.isnot(None),
+        Expense.updated_at.isnot(None)
+    )
+    rows = db.session.query(
+        User.id,
+        User.name,
+        func.count(Expense.id).label('total_submitted'),
+        func.sum(case((Expense.status == 'approved', 1), else_=0)).label('approved_count'),
+        func.sum(case((Expense.status == 'rejected', 1), else_=0)).label('rejected_count'),
+        func.avg(case((processed, seconds_between(Expense.created_at, Expense.updated_at)), else_=None)).label('avg_seconds')
+    ).outerjoin(Expense, and_(Expense.employee_id == User.id, Expense.admin_id == admin_id))\
+    .filter(User.created_by == admin_id, User.role == 'employee')\
+    .group_by(User.id, User.name)\
+    .order_by(User.id)\
+    .all()
+
+    performance_data = []
+    for employee_id, employee_name, total_submitted, approved_expenses, rejected_expenses, avg_seconds in rows:
+        total_submitted = int(total_submitted or 0)
+        approved_expenses = int(approved_expenses or 0)
+        rejected_expenses = int(rejected_expenses or 0)
+
+        # Approval rate
+        approval_rate = (approved_expenses / total_submitted * 100) if total_submitted > 0 else 0
+
+        # Average processing time (using updated_at as review timestamp)
+        avg_response_hours = float(avg_seconds) / 3600 if avg_seconds is not None else 0
+
+        performance_data.append({
+            'employee_id': employee_id,
+            'employee_name': employee_name,
+            'total_submitted': total_submitted,
+            'approved_count': approved_expenses,
+            'rejected_count': rejected_expenses,
+            'approval_rate': round(approval_rate, 2),
+            'avg_processing_time_hours': round(avg_response_hours, 2)
+        })
+    
+    return {'employee_performance': performance_data}
+
 @ai_insights_bp.route('/admin/employee-performance')
 @login_required
 def get_admin_employee_performance():
@@ -62,88 +102,37 @@ def get_admin_employee_performance():
         return jsonify({'error': 'Unauthorized'}), 403
     
     try:
-        # Get employees managed by this admin
-        managed_employees = User.query.filter_by(created_by=current_user.id, role='employee').all()
-
-        performance_data = []
-        for employee in managed_employees:
-            # Total expenses submitted by this employee to this admin
-            total_submitted = Expense.query.filter_by(employee_id=employee.id, admin_id=current_user.id).count()
-            
-            # Approved expenses
-            approved_expenses = Expense.query.filter_by(employee_id=employee.id, admin_id=current_user.id, status='approved').count()
-            
-            # Rejected expenses
-            rejected_expenses = Expense.query.filter_by(employee_id=employee.id, admin_id=current_user.id, status='rejected').count()
-
-            # Approval rate
-            approval_rate = (approved_expenses / total_submitted * 100) if total_submitted > 0 else 0
-
-            # Average processing time (using updated_at as review timestamp)
-            processed_expenses = Expense.query.filter(
-                Expense.employee_id == employee.id,
-                Expense.admin_id == current_user.id,
-                or_(Expense.status == 'approved', Expense.status == 'rejected'),
-                Expense.created_at.isnot(None),
-                Expense.updated_at.isnot(None)
-            ).all()
-
-            total_response_time_seconds = 0
-            count_processed = 0
-            for exp in processed_expenses:
-                if exp.updated_at and exp.created_at:
-                    time_diff = exp.updated_at - exp.created_at
-                    total_response_time_seconds += time_diff.total_seconds()
-                    count_processed += 1
-
-            avg_response_hours = (total_response_time_seconds / count_processed / 3600) if count_processed > 0 else 0
-
-            performance_data.append({
-                'employee_id': employee.id,
-                'employee_name': employee.name,
-                'total_submitted': total_submitted,
-                'approved_count': approved_expenses,
-                'rejected_count': rejected_expenses,
-                'approval_rate': round(approval_rate, 2),
-                'avg_processing_time_hours': round(avg_response_hours, 2)
-            })
-        
-        return jsonify({'employee_performance': performance_data})
+        return jsonify(employee_performance_data(current_user.id))
     except Exception as e:
         current_app.logger.error(f"Error fetching admin employee performance: {e}")
         return jsonify({'error': 'Failed to fetch employee performance'}), 500
 
+def day_patterns_data(admin_id, start_date=None, end_date=None):
+    # Both patterns come from the precomputed approval histogram
+    day_of_week_patterns, hour_of_day_patterns = approval_patterns(admin_id, start_date, end_date)
+    day_patterns = [
+        {'day': DAY_NAMES[int(day) - 1], 'count': int(count), 'amount': float(amount or 0)}
+        for day, count, amount in day_of_week_patterns
+    ]
+    hour_patterns = [
+        {'hour': int(hour), 'count': int(count), 'amount': float(amount or 0)}
+        for hour, count, amount in hour_of_day_patterns
+    ]
+    return {'day_of_week_patterns': day_patterns, 'hour_of_day_patterns': hour_patterns}
+
 @ai_insights_bp.route('/admin/day-patterns')
 @login_required
 def get_admin_day_patterns():
     if current_user.role != 'admin':
         return jsonify({'error': 'Unauthorized'}), 403
     try:
-        # Day of week pattern
-        day_of_week_patterns = db.session.query(
-            func.dayofweek(Expense.created_at).label('day'),
-            func.count(Expense.id).label('count')
-        ).filter(
-            Expense.admin_id == current_user.id,
-            Expense.status == 'approved'
-        ).group_by(func.dayofweek(Expense.created_at)).all()
-        # Convert to readable day names
-        day_map = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
-        day_patterns = [
-            {'day': day_map[int(day)-1], 'count': count} for day, count in day_of_week_patterns if day is not None
-        ]
-        # Hour of day pattern
-        hour_of_day_patterns = db.session.query(
-            func.hour(Expense.created_at).label('hour'),
-            func.count(Expense.id).label('count')
-        ).filter(
-            Expense.admin_id == current_user.id,
-            Expense.status == 'approved'
-        ).group_by(func.hour(Expense.created_at)).all()
-        hour_patterns = [
-            {'hour': int(hour), 'count': count} for hour, count in hour_of_day_patterns if hour is not None
-        ]
-        return jsonify({'day_of_week_patterns': day_patterns, 'hour_of_day_patterns': hour_patterns})
+        # Optional inclusive date window (YYYY-MM-DD)
+        start_date = datetime.strptime(request.args['start_date'], '%Y-%m-%d').date() if request.args.get('start_date') else None
+        end_date = datetime.strptime(request.args['end_date'], '%Y-%m-%d').date() if request.args.get('end_date') else None
+    except ValueError:
+        return jsonify({'error': 'Dates must be in YYYY-MM-DD format'}), 400
+    try:
+        return jsonify(day_patterns_data(current_user.id, start_date, end_date))
     except Exception as e:
         current_app.logger.error(f"Error fetching day patterns: {e}")
         return jsonify({'error': 'Failed to fetch day patterns'}), 500
@@ -13,8 +13,10 @@
 
 from flask import Blueprint, request, jsonify, session, current_app
 from flask_login import login_user, logout_user, login_required, current_user
-from werkzeug.security import check_password_hash
+from app.identity import bump_user_version
 from app.models import User
+from app.passwords import PasswordCheckBusy, verify_password
+from extensions import db
 from datetime import datetime
 
 auth_bp = Blueprint('auth', __name__)
@@ -29,10 +31,30 @@ def login():
         return jsonify({'error': 'Email and password are required'}), 400
     
     user = User.query.filter_by(email=email).first()
-    
-    if not user or not check_password_hash(user.password, password):
+    if not user:
         return jsonify({'error': 'Invalid email or password'}), 401
-    
+
+    # Hand the connection back to the pool while the hash is checked on the bounded
+    # login pool (app/passwords.py); close() keeps the loaded user usable, detached
+    password_hash = user.password
+    db.session.close()
+    try:
+        valid, new_hash = verify_password(password_hash, password)
+    except PasswordCheckBusy:
+        return jsonify({'error': 'Too many sign-ins in progress, please try again'}), 503, {'Retry-After': '1'}
+    if not valid:
+        return jsonify({'error': 'Invalid email or password'}), 401
+
+    # Upgrade hashes stored with an older method or cost while the password is at hand
+    if new_hash:
+        try:
+            User.query.filter_by(id=user.id).update({'password': new_hash})
+            db.session.commit()
+            bump_user_version(user.id)
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.warning(f"Could not upgrade password hash for user {user.id}: {e}")
+
     # Log in the user with session management
     login_user(user, remember=True)
     
@@ -1,14 +1,17 @@
 # routes/employee.py (or employee.py if in root)
 import os
-from flask import Blueprint, request, jsonify, current_app, make_response, send_from_directory
+from flask import Blueprint, request, jsonify, current_app, make_response
 from flask_login import login_required, current_user
 from app.models import User, Budget, Expense, Transaction, EmployeeFund
+from app.cache import invalidate_admin_sections
+from app.documents import send_document, store_upload
+from app.pagination import InvalidCursor, keyset_page, parse_page_size
+from app.thumbnails import parse_thumbnail_size, schedule_thumbnails, send_thumbnail, thumbnail_url
 from extensions import db
 from sqlalchemy import func, case
 from decimal import Decimal
-from datetime import datetime
+from werkzeug.exceptions import NotFound
 from werkzeug.utils import secure_filename
-import mimetypes
 
 employee_bp = Blueprint('employee', __name__)
 
@@ -119,18 +122,13 @@ def submit_expense():
         amount = Decimal(str(amount))
         if amount <= 0:
             return jsonify({'error': 'Amount must be positive'}), 400
-        document_path = None
+        document = None
         if file:
-            filename = secure_filename(file.filename)
             upload_folder = current_app.config.get('UPLOAD_FOLDER')
             if not upload_folder:
                 return jsonify({'error': 'Upload folder not configured'}), 500
-            base, ext = os.path.splitext(filename)
-            timestamp = datetime.now().strftime("%Y%m%d%H%M%S%f")
-            unique_filename = f"{base}_{timestamp}{ext}"
-            file_save_path = os.path.join(upload_folder, unique_filename)
-            file.save(file_save_path)
-            document_path = unique_filename # Store only the filename
+            # One stored copy per distinct file; duplicates only add a reference
+            document = store_upload(file, upload_folder)
         new_expense = Expense(
             employee_id=current_user.id,
             admin_id=admin_id_for_expense,
@@ -138,11 +136,15 @@ def submit_expense():
             amount=amount,
             site_name=site_name,
             description=description,
-            document_path=document_path,
+            document_path=document.filename if document else None, # Store only the filename
+            document_id=document.id if document else None,
             status='pending'
         )
         db.session.add(new_expense)
         db.session.commit()
+        invalidate_admin_sections(admin_id_for_expense)
+        if document:
+            schedule_thumbnails(upload_folder, document.filename)
         return jsonify({'message': 'Expense submitted successfully', 'expense_id': new_expense.id}), 201
     except Exception as e:
         db.session.rollback()
@@ -154,31 +156,78 @@ def submit_expense():
 def get_my_requests():
     if current_user.role != 'employee':
         return jsonify({'error': 'Unauthorized'}), 403
-    
+
+    status = request.args.get('status')
+    if status and status not in ('pending', 'approved', 'rejected'):
+        return jsonify({'error': 'status must be pending, approved or rejected'}), 400
     try:
-        # Get all expenses submitted by this employee
-        expenses = Expense.query.filter_by(employee_id=current_user.id)\
-            .order_by(Expense.created_at.desc()).all()
-        
+        limit = parse_page_size(request.args.get('limit'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        # One statement per page: only the columns we render, with the
+        # reviewing admin's name joined in rather than looked up per row.
+        query = db.session.query(
+            Expense.id,
+            Expense.title,
+            Expense.amount,
+            Expense.status,
+            Expense.document_path,
+            Expense.site_name,
+            Expense.created_at,
+            Expense.updated_at,
+            User.name.label('admin_name')
+        ).outerjoin(User, Expense.admin_id == User.id)\
+        .filter(Expense.employee_id == current_user.id)
+        if status:
+            query = query.filter(Expense.status == status)
+
+        expenses, next_cursor, prev_cursor = keyset_page(
+            query, Expense.created_at, Expense.id,
+            key=lambda row: (row.created_at, row.id),
+            limit=limit,
+            before=request.args.get('before'),
+            after=request.args.get('after')
+        )
+
         request_list = []
         for expense in expenses:
-            admin = User.query.get(expense.admin_id)
             request_list.append({
                 'id': expense.id,
                 'title': expense.title,
                 'amount': float(expense.amount),
                 'status': expense.status,
                 'document_link': f"/employee/documents/{os.path.basename(expense.document_path)}" if expense.document_path else None,
+                'thumbnail_url': thumbnail_url('/employee/documents', expense.document_path),
                 'site_name': expense.site_name,
                 'submitted_at': expense.created_at.strftime('%Y-%m-%d %H:%M:%S'),
                 'reviewed_at': expense.updated_at.strftime('%Y-%m-%d %H:%M:%S') if expense.updated_at else None,
-                'admin_name': admin.name if admin else 'N/A'
+                'admin_name': expense.admin_name or 'N/A'
             })
-        return jsonify({'requests': request_list})
+        return jsonify({
+            'requests': request_list,
+            'next_cursor': next_cursor,
+            'prev_cursor': prev_cursor,
+            'limit': limit
+        })
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error fetching employee requests: {e}")
         return jsonify({'error': 'Failed to fetch requests'}), 500
 
+def _owned_document(filename):
+    """Bare name of a document linked to one of the current employee's expenses, else None."""
+    safe_filename = secure_filename(filename)
+    # document_path holds the bare filename, so this is a point lookup on idx_expenses_employee_document
+    owned = db.session.query(Expense.id).filter_by(
+        employee_id=current_user.id, document_path=safe_filename).first()
+    if not owned:
+        current_app.logger.warning(f"Denied document {safe_filename} to employee {current_user.id}")
+        return None
+    return safe_filename
+
 @employee_bp.route('/documents/<filename>')
 @login_required
 def serve_document(filename):
@@ -186,30 +235,32 @@ def serve_document(filename):
     if not upload_folder:
         return jsonify({'error': 'Upload folder not configured'}), 500
 
-    safe_filename = secure_filename(filename)
-    file_path = os.path.join(upload_folder, safe_filename)
+    # Employees may only view documents linked to their own expenses
+    safe_filename = _owned_document(filename)
+    if not safe_filename:
+        return jsonify({'error': 'Unauthorized to view this document'}), 403
 
-    if not os.path.exists(file_path):
+    try:
+        return send_document(upload_folder, safe_filename)
+    except NotFound:
         return jsonify({'error': 'Document not found'}), 404
 
-    # --- ROBUST AUTHORIZATION CHECK FOR EMPLOYEE ---
-    # Check if this document_path belongs to an expense associated with current_user.id
-    # Using os.path.basename for comparison as document_path in DB might be full path
-    expense = Expense.query.filter_by(document_path=file_path).first() # Assuming document_path in DB is full path
-    if not expense:
-         # Try matching with just filename if document_path stores only filename
-        expense = Expense.query.filter(Expense.document_path.like(f"%{safe_filename}")).first()
-
-
-    if not expense: # If no expense record found for this document_path
-        current_app.logger.warning(f"Attempt to access unlinked document: {safe_filename}")
-        return jsonify({'error': 'Document access denied (not linked to an expense)'}), 403
-
-    # Allow access only if it's the current employee's document
-    if expense.employee_id == current_user.id:
-        mimetype = mimetypes.guess_type(file_path)[0]
-        if not mimetype:
-            mimetype = 'application/octet-stream' # Default if type cannot be guessed
-        return send_from_directory(upload_folder, safe_filename, mimetype=mimetype)
-    else:
-        return jsonify({'error': 'Unauthorized to view this document'}), 403
\ No newline at end of file
+@employee_bp.route('/documents/<filename>/thumbnail')
+@login_required
+def serve_thumbnail(filename):
+    upload_folder = current_app.config.get('UPLOAD_FOLDER')
+    if not upload_folder:
+        return jsonify({'error': 'Upload folder not configured'}), 500
+    try:
+        size = parse_thumbnail_size(request.args.get('size'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    safe_filename = _owned_document(filename)
+    if not safe_filename:
+        return jsonify({'error': 'Unauthorized to view this document'}), 403
+
+    try:
+        return send_thumbnail(upload_folder, safe_filename, size)
+    except NotFound:
+        return jsonify({'error': 'Preview not available'}), 404
\ No newline at end of file
@@ -1,157 +1,98 @@
-from flask import Blueprint, request, jsonify, render_template, current_app, make_response
+from flask import Blueprint, request, jsonify, render_template, current_app, Response, stream_with_context
 from flask_login import login_required, current_user
-from app.models import User, Budget, Expense, Transaction, EmployeeFund
+from app.models import User, Budget, Transaction, EmployeeFund
+from app.balances import credit_budget, credit_budgets, parse_allocations
+from app.cache import admin_section_cache, invalidate_admin_sections
+from app.db_pool import pool_stats
+from app.directory import ADMIN_FIELDS, EMPLOYEE_FIELDS, USER_FIELDS, list_directory, parse_fields
+from app.identity import bump_user_version, user_cache
+from app.overview import get_overview, invalidate_overview
+from app.passwords import hash_password
+from app.pagination import InvalidCursor, keyset_page, parse_flag, parse_page_size
+from app.provisioning import ProvisionFileError, insert_users, read_request_rows, validate_user_rows
+from app.request_metrics import request_metrics
 from extensions import db
-from sqlalchemy import func, case
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import aliased
 from decimal import Decimal
 from datetime import datetime, timedelta
-from werkzeug.security import generate_password_hash
 import csv
+import os
 from io import StringIO
 from sqlalchemy import or_ # Import or_ for filtering
 
 superadmin_bp = Blueprint('superadmin', __name__)
 
+# Rows fetched per server-side batch (and written per chunk) by the CSV export
+CSV_EXPORT_BATCH_SIZE = 1000
+
 @superadmin_bp.route('/overview')
 @login_required
 def get_superadmin_overview():
     if current_user.role != 'superadmin':
         return jsonify({'error': 'Unauthorized'}), 403
     try:
-        total_admins = User.query.filter_by(role='admin').count()
-        total_employees = User.query.filter_by(role='employee').count()
-        total_superadmins = User.query.filter_by(role='superadmin').count()
-        total_users = User.query.count()
-
-        total_budget_allocated = db.session.query(func.sum(Budget.total_budget)).scalar() or Decimal('0.00')
-        total_budget_spent = db.session.query(func.sum(Budget.total_spent)).scalar() or Decimal('0.00')
-        
-        # Calculate total expenses across all employees and admins
-        total_expenses_overall = db.session.query(func.sum(Expense.amount))\
-            .filter(Expense.status == 'approved').scalar() or Decimal('0.00')
-
-        # Get top 5 employees by expense amount
-        top_employees = db.session.query(
-            User.name,
-            func.sum(Expense.amount).label('total_spent')
-        ).join(Expense, User.id == Expense.employee_id)\
-        .filter(Expense.status == 'approved')\
-        .group_by(User.name)\
-        .order_by(func.sum(Expense.amount).desc())\
-        .limit(5).all()
-
-        top_employees_data = [{'name': name, 'total_spent': float(total_spent)} for name, total_spent in top_employees]
-
-        # Get overall transaction types distribution
-        transaction_type_distribution = db.session.query(
-            Transaction.type,
-            func.count(Transaction.id)
-        ).group_by(Transaction.type).all()
+        # Cached snapshot; ?fresh=true forces a recompute
+        return jsonify(get_overview(fresh=parse_flag(request.args.get('fresh'))))
+    except Exception as e:
+        current_app.logger.error(f"Error fetching superadmin overview: {e}")
+        return jsonify({'error': 'Failed to fetch overview data'}), 500
 
-        transaction_type_data = {t_type: count for t_type, count in transaction_type_distribution}
+def _directory_response(key, default_fields, role=None):
+    """Shared handler for the user directory listings below.
 
+    Query args: ``fields`` (comma-separated), ``q`` (name/email prefix),
+    ``limit`` and ``after_id`` (page by id; omit ``limit`` for the full list).
+    """
+    try:
+        fields = parse_fields(request.args.get('fields'), default_fields)
+        limit = parse_page_size(request.args.get('limit')) if request.args.get('limit') else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-        return jsonify({
-            'total_users': total_users,
-            'total_superadmins': total_superadmins,
-            'total_admins': total_admins,
-            'total_employees': total_employees,
-            'total_budget_allocated': float(total_budget_allocated),
-            'total_budget_spent': float(total_budget_spent),
-            'total_expenses_overall': float(total_expenses_overall),
-            'top_employees_by_expense': top_employees_data,
-            'transaction_type_distribution': transaction_type_data
-        })
+    try:
+        users, next_after_id = list_directory(
+            fields,
+            role=role,
+            search=request.args.get('q'),
+            after_id=request.args.get('after_id', type=int),
+            limit=limit
+        )
+        response = {key: users}
+        if limit:
+            response['next_after_id'] = next_after_id
+        return jsonify(response)
     except Exception as e:
-        current_app.logger.error(f"Error fetching superadmin overview: {e}")
-        return jsonify({'error': 'Failed to fetch overview data'}), 500
+        current_app.logger.error(f"Error fetching {key}: {e}")
+        return jsonify({'error': f'Failed to fetch {key}'}), 500
 
 @superadmin_bp.route('/users')
 @login_required
 def get_users():
     if current_user.role != 'superadmin':
         return jsonify({'error': 'Unauthorized'}), 403
-    users = User.query.all()
-    user_list = []
-    for user in users:
-        user_list.append({
-            'id': user.id,
-            'name': user.name,
-            'email': user.email,
-            'phone': user.phone,
-            'role': user.role,
-            'is_active': user.is_active,
-            'created_at': user.created_at.strftime('%Y-%m-%d %H:%M:%S') if user.created_at else None
-        })
-    return jsonify({'users': user_list})
+    return _directory_response('users', USER_FIELDS, role=request.args.get('role'))
 
 @superadmin_bp.route('/all-users')
 @login_required
 def get_all_users():
     if current_user.role != 'superadmin':
         return jsonify({'error': 'Unauthorized'}), 403
-    users = User.query.all()
-    user_list = []
-    for user in users:
-        user_list.append({
-            'id': user.id,
-            'name': user.name,
-            'email': user.email,
-            'phone': user.phone,
-            'role': user.role,
-            'is_active': user.is_active,
-            'created_at': user.created_at.strftime('%Y-%m-%d %H:%M:%S') if user.created_at else None
-        })
-    return jsonify({'users': user_list})
+    return _directory_response('users', USER_FIELDS, role=request.args.get('role'))
 
 @superadmin_bp.route('/admins')
 @login_required
 def get_admins():
     if current_user.role != 'superadmin':
         return jsonify({'error': 'Unauthorized'}), 403
-    
-    admins = User.query.filter_by(role='admin').all()
-    admin_list = []
-    for admin in admins:
-        budget = Budget.query.filter_by(admin_id=admin.id).first()
-        admin_list.append({
-            'id': admin.id,
-            'name': admin.name,
-            'email': admin.email,
-            'phone': admin.phone,
-            'is_active': admin.is_active,
-            'created_at': admin.created_at.strftime('%Y-%m-%d %H:%M:%S') if admin.created_at else None,
-            'total_budget': float(budget.total_budget) if budget else 0.00,
-            'total_spent': float(budget.total_spent) if budget else 0.00,
-            'remaining': float(budget.remaining) if budget else 0.00
-        })
-    return jsonify({'admins': admin_list})
+    return _directory_response('admins', ADMIN_FIELDS, role='admin')
 
 @superadmin_bp.route('/employees')
 @login_required
 def get_employees():
     if current_user.role != 'superadmin':
         return jsonify({'error': 'Unauthorized'}), 403
-    
-    employees = User.query.filter_by(role='employee').all()
-    employee_list = []
-    for employee in employees:
-        supervisor = User.query.get(employee.supervisor_id) if employee.supervisor_id else None
-        employee_list.append({
-            'id': employee.id,
-            'name': employee.name,
-            'email': employee.email,
-            'phone': employee.phone,
-            'is_active': employee.is_active,
-            'created_at': employee.created_at.strftime('%Y-%m-%d %H:%M:%S') if employee.created_at else None,
-            'supervisor': {
-                'id': supervisor.id if supervisor else None,
-                'name': supervisor.name if supervisor else None,
-                'email': supervisor.email if supervisor else None
-            }
-        })
-    return jsonify({'employees': employee_list})
+    return _directory_response('employees', EMPLOYEE_FIELDS, role='employee')
 
 @superadmin_bp.route('/add-user', methods=['POST'])
 @login_required
@@ -188,7 +129,7 @@ def add_user():
             name=name,
             email=email,
             phone=phone,
-            password=generate_password_hash(password),
+            password=hash_password(password),
             role=role,
             created_by=current_user.id,
             is_active=True,
@@ -216,12 +157,52 @@ def add_user():
             db.session.add(new_fund)
             db.session.commit() # Commit again after adding the fund
 
+        invalidate_overview()
+        invalidate_admin_sections(supervisor_id if role == 'employee' else None)
         return jsonify({'message': f'{role.capitalize()} added successfully', 'user': {'id': new_user.id, 'name': new_user.name, 'email': new_user.email, 'role': new_user.role}}), 201
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"Error adding user: {e}")
         return jsonify({'error': 'Failed to add user'}), 500
       
+@superadmin_bp.route('/provision-users', methods=['POST'])
+@login_required
+def provision_users():
+    """Create many users in one transaction.
+
+    Takes a CSV upload (field ``file``) or ``{"users": [...]}`` with the
+    columns described in ``app/provisioning.py``. By default nothing is
+    created unless every row is valid; ``?partial=true`` creates the valid
+    rows and ``?dry_run=true`` only validates. Every row gets a result.
+    """
+    if current_user.role != 'superadmin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    partial = parse_flag(request.args.get('partial'))
+    dry_run = parse_flag(request.args.get('dry_run'))
+
+    try:
+        rows = read_request_rows(request.files.get('file'), request.get_json(silent=True),
+                                 max_rows=current_app.config.get('USER_PROVISION_MAX_ROWS'))
+        valid, results = validate_user_rows(rows, ('employee', 'admin', 'superadmin'))
+        failed = len(results) - len(valid)
+        if dry_run or (failed and not partial):
+            return jsonify({'created': 0, 'failed': failed, 'results': results}), 200 if dry_run else 400
+
+        insert_users(valid, current_user.id)
+        db.session.commit()
+        invalidate_overview()
+        invalidate_admin_sections(*{columns['supervisor_id'] for _, columns, _ in valid})
+        return jsonify({'created': len(valid), 'failed': failed, 'results': results}), 201
+    except ProvisionFileError as e:
+        return jsonify({'error': str(e)}), 400
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Some of these emails were registered by another request; please retry'}), 409
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error provisioning users: {e}")
+        return jsonify({'error': 'Failed to provision users'}), 500
+
 @superadmin_bp.route('/update-user/<int:user_id>', methods=['PUT'])
 @login_required
 def update_user(user_id):
@@ -233,6 +214,8 @@ def update_user(user_id):
         return jsonify({'error': 'User not found'}), 404
     
     data = request.get_json()
+    # A reassigned employee must also leave the previous supervisor's cached sections
+    old_supervisor_id = user.supervisor_id
     try:
         if 'name' in data:
             user.name = data['name']
@@ -247,7 +230,7 @@ def update_user(user_id):
                 return jsonify({'error': 'Invalid role specified'}), 400
             user.role = data['role']
         if 'password' in data and data['password']:
-            user.password = generate_password_hash(data['password'])
+            user.password = hash_password(data['password'])
         if 'is_active' in data:
             user.is_active = bool(data['is_active'])
         # Allow updating supervisor_id for employees
@@ -258,6 +241,9 @@ def update_user(user_id):
             user.supervisor_id = data['supervisor_id']
         user.updated_at = datetime.utcnow()
         db.session.commit()
+        invalidate_overview()
+        invalidate_admin_sections(user.id, old_supervisor_id, user.supervisor_id)
+        bump_user_version(user.id)
         return jsonify({'message': 'User updated successfully', 'user': {'id': user.id, 'name': user.name, 'email': user.email, 'role': user.role}}), 200
     except Exception as e:
         db.session.rollback()
@@ -287,15 +273,8 @@ def allocate_budget():
         if not admin:
             return jsonify({'error': 'Admin not found'}), 404
         
-        budget = Budget.query.filter_by(admin_id=admin_id).first()
-        if not budget:
-            budget = Budget(admin_id=admin_id, total_budget=Decimal('0.00'), total_spent=Decimal('0.00'), remaining=Decimal('0.00'))
-            db.session.add(budget)
-            db.session.commit()
-        
-        budget.total_budget += amount
-        budget.remaining += amount
-        budget.updated_at = datetime.utcnow()
+        # Added in the database, so concurrent allocations and spending are not lost
+        credit_budget(admin.id, amount)
 
         transaction = Transaction(
             sender_id=current_user.id,
@@ -308,6 +287,8 @@ def allocate_budget():
         )
         db.session.add(transaction)
         db.session.commit()
+        invalidate_overview()
+        invalidate_admin_sections(admin.id)
         
         return jsonify({'message': f'Budget of {amount} allocated to {admin.name} successfully'}), 200
     except Exception as e:
@@ -315,45 +296,166 @@ def allocate_budget():
         current_app.logger.error(f"Error allocating budget: {e}")
         return jsonify({'error': 'Failed to allocate budget'}), 500
 
+@superadmin_bp.route('/allocate-budgets', methods=['POST'])
+@login_required
+def allocate_budgets():
+    """Allocate budget to many admins in one transaction.
+
+    Body: ``{"site_name": "...", "allocations": [{"admin_id": 2, "amount":
+    10000}, ...]}``. Nothing is allocated if any item is invalid.
+    """
+    if current_user.role != 'superadmin':
+        return jsonify({'error': 'Unauthorized'}), 403
+
+    data = request.get_json(silent=True) or {}
+    items = data.get('allocations')
+    site_name = data.get('site_name')
+    if not isinstance(items, list) or not items or not site_name:
+        return jsonify({'error': 'Missing required fields'}), 400
+    max_items = current_app.config.get('BULK_ALLOCATION_MAX_ITEMS', 1000)
+    if len(items) > max_items:
+        return jsonify({'error': f'At most {max_items} allocations per request'}), 400
+    amounts, errors = parse_allocations(items, 'admin_id')
+    if errors:
+        return jsonify({'error': 'Invalid allocations', 'errors': errors}), 400
+
+    try:
+        names = dict(db.session.query(User.id, User.name).filter(User.id.in_(amounts), User.role == 'admin'))
+        errors = [{'index': index, 'admin_id': admin_id, 'error': 'Admin not found'}
+                  for index, admin_id in enumerate(amounts) if admin_id not in names]
+        if errors:
+            return jsonify({'error': 'Invalid allocations', 'errors': errors}), 404
+
+        credit_budgets(amounts)
+        now = datetime.utcnow()
+        db.session.execute(Transaction.__table__.insert(), [{
+            'sender_id': current_user.id,
+            'receiver_id': admin_id,
+            'type': 'allocation',
+            'amount': amount,
+            'description': f"Budget allocation to {names[admin_id]} (Admin)",
+            'site_name': site_name,
+            'timestamp': now,
+            'created_at': now
+        } for admin_id, amount in amounts.items()])
+        db.session.commit()
+        invalidate_overview()
+        invalidate_admin_sections(*amounts)
+
+        total = sum(amounts.values(), Decimal('0.00'))
+        return jsonify({
+            'message': f'Budget of {total} allocated to {len(amounts)} admins successfully',
+            'allocated': len(amounts),
+            'total_amount': float(total)
+        }), 200
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error allocating budgets: {e}")
+        return jsonify({'error': 'Failed to allocate budgets'}), 500
+
+def _serialize_transaction(row):
+    transaction, sender_name, sender_email, receiver_name, receiver_email = row
+    return {
+        'id': transaction.id,
+        'timestamp': transaction.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+        'type': transaction.type,
+        'amount': float(transaction.amount),
+        'description': transaction.description,
+        'sender': {'id': transaction.sender_id, 'name': sender_name, 'email': sender_email},
+        'receiver': {'id': transaction.receiver_id, 'name': receiver_name, 'email': receiver_email},
+        'expense_id': transaction.expense_id,
+        'site_name': transaction.site_name
+    }
+
 @superadmin_bp.route('/transactions')
 @login_required
 def get_transactions():
     if current_user.role != 'superadmin':
         return jsonify({'error': 'Unauthorized'}), 403
 
+    try:
+        limit = parse_page_size(request.args.get('limit'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
     try:
         # Aliases for clarity in joins
         Sender = aliased(User)
         Receiver = aliased(User)
 
-        transactions = db.session.query(
+        query = db.session.query(
             Transaction,
             Sender.name.label('sender_name'),
             Sender.email.label('sender_email'),
             Receiver.name.label('receiver_name'),
             Receiver.email.label('receiver_email')
         ).outerjoin(Sender, Transaction.sender_id == Sender.id)\
-        .outerjoin(Receiver, Transaction.receiver_id == Receiver.id)\
-        .order_by(Transaction.timestamp.desc()).all()
-
-        transaction_list = []
-        for transaction, sender_name, sender_email, receiver_name, receiver_email in transactions:
-            transaction_list.append({
-                'id': transaction.id,
-                'timestamp': transaction.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-                'type': transaction.type,
-                'amount': float(transaction.amount),
-                'description': transaction.description,
-                'sender': {'id': transaction.sender_id, 'name': sender_name, 'email': sender_email},
-                'receiver': {'id': transaction.receiver_id, 'name': receiver_name, 'email': receiver_email},
-                'expense_id': transaction.expense_id,
-                'site_name': transaction.site_name
-            })
-        return jsonify({'transactions': transaction_list})
+        .outerjoin(Receiver, Transaction.receiver_id == Receiver.id)
+
+        # Optional filters
+        if request.args.get('type'):
+            query = query.filter(Transaction.type == request.args['type'])
+        if request.args.get('site_name'):
+            query = query.filter(Transaction.site_name == request.args['site_name'])
+        if request.args.get('sender_id', type=int):
+            query = query.filter(Transaction.sender_id == request.args.get('sender_id', type=int))
+        if request.args.get('receiver_id', type=int):
+            query = query.filter(Transaction.receiver_id == request.args.get('receiver_id', type=int))
+
+        # Legacy behaviour: the whole table in one response
+        if parse_flag(request.args.get('all')):
+            transactions = query.order_by(Transaction.timestamp.desc()).all()
+            return jsonify({'transactions': [_serialize_transaction(row) for row in transactions]})
+
+        transactions, next_cursor, prev_cursor = keyset_page(
+            query, Transaction.timestamp, Transaction.id,
+            key=lambda row: (row[0].timestamp, row[0].id),
+            limit=limit,
+            before=request.args.get('before'),
+            after=request.args.get('after')
+        )
+        return jsonify({
+            'transactions': [_serialize_transaction(row) for row in transactions],
+            'next_cursor': next_cursor,
+            'prev_cursor': prev_cursor,
+            'limit': limit
+        })
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Error fetching transactions: {e}")
         return jsonify({'error': 'Failed to fetch transactions'}), 500
 
+def _generate_transactions_csv(rows):
+    """Yield the transactions CSV in chunks of CSV_EXPORT_BATCH_SIZE rows."""
+    si = StringIO()
+    cw = csv.writer(si)
+
+    # CSV Header
+    cw.writerow(['Transaction ID', 'Timestamp', 'Type', 'Amount', 'Description', 'Sender Name', 'Sender Email', 'Receiver Name', 'Receiver Email', 'Site Name', 'Expense ID'])
+
+    for i, (transaction_id, timestamp, t_type, amount, description, sender_name, sender_email,
+            receiver_name, receiver_email, site_name, expense_id) in enumerate(rows, 1):
+        cw.writerow([
+            transaction_id,
+            timestamp.isoformat(),
+            t_type,
+            str(amount),
+            description,
+            sender_name,
+            sender_email,
+            receiver_name,
+            receiver_email,
+            site_name,
+            expense_id
+        ])
+        if i % CSV_EXPORT_BATCH_SIZE == 0:
+            yield si.getvalue()
+            si.seek(0)
+            si.truncate(0)
+
+    yield si.getvalue()
+
 @superadmin_bp.route('/export-transactions-csv')
 @login_required
 def export_transactions_csv():
@@ -374,41 +476,29 @@ def export_transactions_csv():
         Sender = aliased(User)
         Receiver = aliased(User)
 
+        # Select plain columns (no ORM entities) and read them through a
+        # server-side cursor so memory stays flat whatever the date range.
         transactions = db.session.query(
-            Transaction,
+            Transaction.id,
+            Transaction.timestamp,
+            Transaction.type,
+            Transaction.amount,
+            Transaction.description,
             Sender.name.label('sender_name'),
             Sender.email.label('sender_email'),
             Receiver.name.label('receiver_name'),
-            Receiver.email.label('receiver_email')
+            Receiver.email.label('receiver_email'),
+            Transaction.site_name,
+            Transaction.expense_id
         ).outerjoin(Sender, Transaction.sender_id == Sender.id)\
         .outerjoin(Receiver, Transaction.receiver_id == Receiver.id)\
         .filter(
             Transaction.timestamp >= start_date,
             Transaction.timestamp < end_date
-        ).order_by(Transaction.timestamp.asc()).all()
-
-        si = StringIO()
-        cw = csv.writer(si)
-
-        # CSV Header
-        cw.writerow(['Transaction ID', 'Timestamp', 'Type', 'Amount', 'Description', 'Sender Name', 'Sender Email', 'Receiver Name', 'Receiver Email', 'Site Name', 'Expense ID'])
-
-        for transaction, sender_name, sender_email, receiver_name, receiver_email in transactions:
-            cw.writerow([
-                transaction.id,
-                transaction.timestamp.isoformat(),
-                transaction.type,
-                str(transaction.amount),
-                transaction.description,
-                sender_name,
-                sender_email,
-                receiver_name,
-                receiver_email,
-                transaction.site_name,
-                transaction.expense_id
-            ])
-
-        output = make_response(si.getvalue())
+        ).order_by(Transaction.timestamp.asc())\
+        .yield_per(CSV_EXPORT_BATCH_SIZE)
+
+        output = Response(stream_with_context(_generate_transactions_csv(transactions)))
         output.headers["Content-Disposition"] = f"attachment; filename=transactions_{start_date_str}_to_{end_date_str}.csv"
         output.headers["Content-type"] = "text/csv"
         return output
@@ -435,6 +525,9 @@ def toggle_user_status(user_id):
         user.is_active = not user.is_active
         user.updated_at = datetime.utcnow()
         db.session.commit()
+        invalidate_overview()
+        invalidate_admin_sections(user.id, user.supervisor_id)
+        bump_user_version(user.id)
         
         action = 'activated' if user.is_active else 'deactivated'
         return jsonify({'message': f'User {user.name} ({user.role}) {action} successfully', 'is_active': user.is_active})
@@ -442,4 +535,35 @@ def toggle_user_status(user_id):
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"Error toggling user status: {str(e)}")
-        return jsonify({'error': 'Failed to toggle user status'}), 500
\ No newline at end of file
+        return jsonify({'error': 'Failed to toggle user status'}), 500
+
+@superadmin_bp.route('/cache-stats')
+@login_required
+def get_cache_stats():
+    if current_user.role != 'superadmin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    # Figures are per worker: each process keeps its own caches
+    return jsonify({
+        'pid': os.getpid(),
+        'users': user_cache.stats(),
+        'admin_sections': admin_section_cache.stats()
+    })
+
+@superadmin_bp.route('/pool-stats')
+@login_required
+def get_pool_stats():
+    if current_user.role != 'superadmin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    # Each worker has its own pool
+    return jsonify({'pid': os.getpid(), 'pool': pool_stats(db.engine)})
+
+@superadmin_bp.route('/request-metrics')
+@login_required
+def get_request_metrics():
+    if current_user.role != 'superadmin':
+        return jsonify({'error': 'Unauthorized'}), 403
+    # Totals since this worker started (or since ?reset=true)
+    metrics = request_metrics.snapshot()
+    if parse_flag(request.args.get('reset')):
+        request_metrics.clear()
+    return jsonify({'pid': os.getpid(), **metrics})
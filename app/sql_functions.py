@@ -0,0 +1,121 @@
+"""Portable SQL expressions used by the reporting queries.
+
+Production runs on MySQL, local load tests on SQLite. Each construct below
+compiles to the native expression of the dialect in use so aggregates can
+stay in the database instead of being computed row by row in Python.
+"""
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.types import Date, Float, Integer, String
+
+
+class seconds_between(FunctionElement):
+    """``seconds_between(start, end)``: seconds from ``start`` to ``end``."""
+    type = Float()
+    inherit_cache = True
+    name = 'seconds_between'
+
+
+@compiles(seconds_between)
+def _seconds_between_default(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return f"EXTRACT(EPOCH FROM ({compiler.process(end, **kw)} - {compiler.process(start, **kw)}))"
+
+
+@compiles(seconds_between, 'mysql')
+def _seconds_between_mysql(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return f"TIMESTAMPDIFF(SECOND, {compiler.process(start, **kw)}, {compiler.process(end, **kw)})"
+
+
+@compiles(seconds_between, 'sqlite')
+def _seconds_between_sqlite(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return (f"(CAST(strftime('%s', {compiler.process(end, **kw)}) AS INTEGER)"
+            f" - CAST(strftime('%s', {compiler.process(start, **kw)}) AS INTEGER))")
+
+
+class year_month(FunctionElement):
+    """``year_month(ts)``: the ``'YYYY-MM'`` month key of a timestamp."""
+    type = String(7)
+    inherit_cache = True
+    name = 'year_month'
+
+
+@compiles(year_month)
+def _year_month_default(element, compiler, **kw):
+    return f"to_char({compiler.process(list(element.clauses)[0], **kw)}, 'YYYY-MM')"
+
+
+@compiles(year_month, 'mysql')
+def _year_month_mysql(element, compiler, **kw):
+    # CONCAT/LPAD rather than DATE_FORMAT: a literal % would clash with pymysql's paramstyle
+    ts = compiler.process(list(element.clauses)[0], **kw)
+    return f"CONCAT(YEAR({ts}), '-', LPAD(MONTH({ts}), 2, '0'))"
+
+
+@compiles(year_month, 'sqlite')
+def _year_month_sqlite(element, compiler, **kw):
+    return f"strftime('%Y-%m', {compiler.process(list(element.clauses)[0], **kw)})"
+
+
+class date_of(FunctionElement):
+    """``date_of(ts)``: the calendar date of a timestamp."""
+    type = Date()
+    inherit_cache = True
+    name = 'date_of'
+
+
+@compiles(date_of)
+def _date_of_default(element, compiler, **kw):
+    return f"CAST({compiler.process(list(element.clauses)[0], **kw)} AS DATE)"
+
+
+@compiles(date_of, 'mysql')
+@compiles(date_of, 'sqlite')
+def _date_of_native(element, compiler, **kw):
+    return f"DATE({compiler.process(list(element.clauses)[0], **kw)})"
+
+
+class day_of_week(FunctionElement):
+    """``day_of_week(ts)``: 1 = Sunday ... 7 = Saturday, as MySQL's DAYOFWEEK()."""
+    type = Integer()
+    inherit_cache = True
+    name = 'day_of_week'
+
+
+@compiles(day_of_week)
+def _day_of_week_default(element, compiler, **kw):
+    return f"(CAST(EXTRACT(DOW FROM {compiler.process(list(element.clauses)[0], **kw)}) AS INTEGER) + 1)"
+
+
+@compiles(day_of_week, 'mysql')
+def _day_of_week_mysql(element, compiler, **kw):
+    return f"DAYOFWEEK({compiler.process(list(element.clauses)[0], **kw)})"
+
+
+@compiles(day_of_week, 'sqlite')
+def _day_of_week_sqlite(element, compiler, **kw):
+    return f"(CAST(strftime('%w', {compiler.process(list(element.clauses)[0], **kw)}) AS INTEGER) + 1)"
+
+
+class hour_of(FunctionElement):
+    """``hour_of(ts)``: hour of the day, 0-23."""
+    type = Integer()
+    inherit_cache = True
+    name = 'hour_of'
+
+
+@compiles(hour_of)
+def _hour_of_default(element, compiler, **kw):
+    return f"CAST(EXTRACT(HOUR FROM {compiler.process(list(element.clauses)[0], **kw)}) AS INTEGER)"
+
+
+@compiles(hour_of, 'mysql')
+def _hour_of_mysql(element, compiler, **kw):
+    return f"HOUR({compiler.process(list(element.clauses)[0], **kw)})"
+
+
+@compiles(hour_of, 'sqlite')
+def _hour_of_sqlite(element, compiler, **kw):
+    return f"CAST(strftime('%H', {compiler.process(list(element.clauses)[0], **kw)}) AS INTEGER)"
@@ -0,0 +1,186 @@
+"""Downscaled previews of receipts, rendered off the request thread.
+
+Reviewers only need a preview, not a multi-MB screenshot, so each document
+gets a thumbnail per size in ``THUMBNAIL_SIZES``. The size is the longest
+side in pixels, the format ``THUMBNAIL_FORMAT`` (``webp`` or ``jpeg``).
+Previews are cached on disk, keyed by document and size:
+``uploads/.thumbnails/320/3f/a2/<stored name>.webp``. A stored document never
+changes, so neither do its previews, and they are served like the document:
+immutable, with the digest in the ETag.
+
+``schedule_thumbnails`` queues every size after an upload commits, on a pool
+of ``THUMBNAIL_WORKERS`` processes. ``ensure_thumbnail`` serves the thumbnail
+routes. It returns the cached file, or renders a missing one and waits for
+it, so a cleared cache or a new size fills itself on demand. Concurrent
+requests for the same preview share one render. ``THUMBNAIL_WORKERS = 0``
+renders inline on request and schedules nothing.
+
+Images are decoded with Pillow. For a PDF, poppler's ``pdftoppm``
+rasterises the first page; without it, PDFs simply have no preview.
+"""
+import glob
+import multiprocessing
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+from flask import current_app
+from PIL import Image
+from werkzeug.exceptions import NotFound
+
+from app.documents import document_file, is_stored_name, send_upload
+from app.images import FORMAT_EXTENSIONS, encode_image, open_image
+
+THUMBNAIL_FOLDER = '.thumbnails'
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.gif', '.webp', '.bmp'}
+PDF_RENDER_TIMEOUT = 30
+
+_pools = {}
+_pools_lock = threading.Lock()
+_pending = {}
+_pending_lock = threading.Lock()
+
+
+def _get_pool(workers):
+    with _pools_lock:
+        if workers not in _pools:
+            _pools[workers] = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return _pools[workers]
+
+
+def can_preview(filename):
+    extension = os.path.splitext(filename or '')[1].lower()
+    if extension == '.pdf':
+        return shutil.which('pdftoppm') is not None
+    return extension in IMAGE_EXTENSIONS
+
+
+def thumbnail_url(prefix, document_path, size=None):
+    """Link to a document's preview under ``prefix``, or None if it cannot have one."""
+    if not document_path or not can_preview(document_path):
+        return None
+    url = f"{prefix}/{os.path.basename(document_path)}/thumbnail"
+    return f"{url}?size={size}" if size else url
+
+
+def parse_thumbnail_size(value):
+    sizes = current_app.config['THUMBNAIL_SIZES']
+    if value in (None, ''):
+        return sizes[0]
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        size = None
+    if size not in sizes:
+        raise ValueError(f"size must be one of {', '.join(map(str, sizes))}")
+    return size
+
+
+def thumbnail_file(upload_folder, filename, size):
+    """Cache path of a document's preview at ``size``."""
+    config = current_app.config
+    name = os.path.basename(filename) + FORMAT_EXTENSIONS[config['THUMBNAIL_FORMAT']]
+    shard = [name[:2], name[2:4]] if is_stored_name(filename) else []
+    return os.path.join(upload_folder, THUMBNAIL_FOLDER, str(size), *shard, name)
+
+
+def _pdf_first_page(source, size):
+    with tempfile.TemporaryDirectory() as directory:
+        output = os.path.join(directory, 'page')
+        subprocess.run(
+            ['pdftoppm', '-f', '1', '-l', '1', '-singlefile', '-png', '-scale-to', str(size), source, output],
+            check=True, capture_output=True, timeout=PDF_RENDER_TIMEOUT)
+        with Image.open(output + '.png') as page:
+            page.load()
+            return page
+
+
+def render_thumbnail(source, target, size, image_format, quality):
+    """Write a preview of ``source``, at most ``size`` px on its longest side, to ``target``.
+
+    Runs in a worker process. Writes to a temporary file first, so readers
+    never see a partial preview.
+    """
+    if os.path.splitext(source)[1].lower() == '.pdf':
+        image = _pdf_first_page(source, size)
+    else:
+        image = open_image(source, size)
+    data = encode_image(image, image_format, quality, size)
+
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(target), delete=False) as temp:
+        temp.write(data)
+    os.replace(temp.name, target)
+    return target
+
+
+def _render(upload_folder, filename, size, wait):
+    config = current_app.config
+    source = document_file(upload_folder, filename)
+    target = thumbnail_file(upload_folder, filename, size)
+    args = (source, target, size, config['THUMBNAIL_FORMAT'], config['THUMBNAIL_QUALITY'])
+    workers = config.get('THUMBNAIL_WORKERS', 1)
+    if workers <= 0:
+        return render_thumbnail(*args) if wait else None
+
+    pool = _get_pool(workers)
+    key = (source, target)
+    with _pending_lock:
+        future = _pending.get(key)
+        if future is None:
+            future = _pending[key] = pool.submit(render_thumbnail, *args)
+            future.add_done_callback(lambda done: _pending.pop(key, None))
+    return future.result(timeout=config['THUMBNAIL_TIMEOUT']) if wait else None
+
+
+def schedule_thumbnails(upload_folder, filename):
+    """Queue every configured preview of a newly uploaded document; never raises."""
+    if not filename or current_app.config.get('THUMBNAIL_WORKERS', 1) <= 0 or not can_preview(filename):
+        return
+    try:
+        for size in current_app.config['THUMBNAIL_SIZES']:
+            if not os.path.exists(thumbnail_file(upload_folder, filename, size)):
+                _render(upload_folder, filename, size, wait=False)
+    except Exception as e:
+        current_app.logger.warning(f"Could not queue thumbnails for {filename}: {e}")
+
+
+def ensure_thumbnail(upload_folder, filename, size):
+    """Path of the preview at ``size``, rendered now if missing; None if there can be none."""
+    target = thumbnail_file(upload_folder, filename, size)
+    if os.path.exists(target):
+        return target
+    if not can_preview(filename) or not os.path.exists(document_file(upload_folder, filename)):
+        return None
+    try:
+        return _render(upload_folder, filename, size, wait=True)
+    except FutureTimeout:
+        current_app.logger.warning(f"Timed out rendering a {size}px thumbnail of {filename}")
+    except Exception as e:
+        current_app.logger.warning(f"Could not render a {size}px thumbnail of {filename}: {e}")
+    return None
+
+
+def send_thumbnail(upload_folder, filename, size):
+    """Response serving a document's preview; raises ``NotFound`` if there is none."""
+    path = ensure_thumbnail(upload_folder, filename, size)
+    if not path:
+        raise NotFound()
+    etag = f"{filename[:64]}-{size}{os.path.splitext(path)[1]}" if is_stored_name(filename) else None
+    return send_upload(upload_folder, os.path.relpath(path, upload_folder), etag)
+
+
+def delete_thumbnails(upload_folder, filenames):
+    """Remove the cached previews of deleted documents, at every size."""
+    for filename in filenames:
+        thumbnails = os.path.join(upload_folder, THUMBNAIL_FOLDER)
+        pattern = os.path.join(glob.escape(thumbnails), '*', '**', glob.escape(os.path.basename(filename)) + '.*')
+        for path in glob.glob(pattern, recursive=True):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,184 @@
+"""Fire concurrent allocations and approvals and check the balances reconcile.
+
+Seeds admins with labour and pending expenses through ``seed_data.seed``.
+Each admin's remaining budget is cut to ``--budget`` so that allocations
+start failing part way through the run. Threads then run at the same time:
+
+* admins allocating random amounts to their labour (``/admin/allocate-fund``);
+* admins approving pending expenses, where every expense is raced by
+  ``--racers`` threads at once (``/admin/expenses/<id>/approve``);
+* the superadmin topping up admin budgets (``/superadmin/allocate-budget``).
+
+Afterwards every budget and fund is checked against the transactions the run
+wrote. Allocated and spent must move by exactly the committed amounts, and no
+balance may go negative. Each approved expense must have exactly one expense
+transaction. Responses other than 200 and 400 are counted as errors. On
+SQLite these are "database is locked" timeouts; point ``DATABASE_URL`` at
+MySQL to exercise row-level concurrency.
+
+    python -m benchmarks.balance_stress --threads 8 --racers 3
+"""
+import argparse
+import random
+import sys
+import threading
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from sqlalchemy import func
+
+from benchmarks.common import app, db, login, Timer
+from app.models import Budget, EmployeeFund, Expense, Transaction, User
+from seed_data import seed
+
+SUPERADMIN = 'superadmin@seed.test'
+
+
+def snapshot():
+    return (
+        {budget.admin_id: (budget.total_budget, budget.total_spent, budget.remaining) for budget in Budget.query},
+        {fund.employee_id: (fund.amount_allocated, fund.amount_spent, fund.remaining_balance) for fund in EmployeeFund.query}
+    )
+
+
+def prepare(args):
+    seed(args.admins, args.employees, args.expenses, quiet=True)
+    with app.app_context():
+        for budget in Budget.query:
+            budget.total_budget -= budget.remaining - Decimal(args.budget)
+            budget.remaining = Decimal(args.budget)
+        db.session.commit()
+        admins = {admin.id: admin.email for admin in User.query.filter_by(role='admin')}
+        employees = defaultdict(list)
+        for employee_id, admin_id in db.session.query(User.id, User.supervisor_id).filter_by(role='employee'):
+            employees[admin_id].append(employee_id)
+        pending = defaultdict(list)
+        for expense_id, admin_id in db.session.query(Expense.id, Expense.admin_id).filter_by(status='pending'):
+            pending[admin_id].append(expense_id)
+        last_transaction = db.session.query(func.max(Transaction.id)).scalar() or 0
+        return admins, employees, pending, last_transaction, snapshot()
+
+
+def run(args, admins, employees, pending):
+    outcomes = Counter()
+    lock = threading.Lock()
+
+    def record(kind, response):
+        status = response.status_code if response.status_code in (200, 400) else 'error'
+        with lock:
+            outcomes[kind, status] += 1
+
+    def allocator(admin_id, seed):
+        rng = random.Random(seed)
+        client = login(app.test_client(), admins[admin_id])
+        for _ in range(args.allocations):
+            record('allocate', client.post('/admin/allocate-fund', json={
+                'employee_id': rng.choice(employees[admin_id]), 'amount': f'{rng.uniform(50, 500):.2f}',
+                'site_name': 'Stress'}))
+
+    def approver(admin_id, expense_ids):
+        client = login(app.test_client(), admins[admin_id])
+        for expense_id in expense_ids:
+            record('approve', client.post(f'/admin/expenses/{expense_id}/approve'))
+
+    def topper(seed):
+        rng = random.Random(seed)
+        client = login(app.test_client(), SUPERADMIN)
+        for _ in range(args.allocations):
+            record('top up', client.post('/superadmin/allocate-budget', json={
+                'admin_id': rng.choice(list(admins)), 'amount': f'{rng.uniform(100, 1000):.2f}', 'site_name': 'Stress'}))
+
+    threads = []
+    for n, admin_id in enumerate(admins):
+        for t in range(args.threads):
+            threads.append(threading.Thread(target=allocator, args=(admin_id, n * 1000 + t)))
+        # Each racer walks the same expenses in its own order, so every approval is contested
+        for r in range(args.racers):
+            expense_ids = list(pending[admin_id])
+            random.Random(r).shuffle(expense_ids)
+            threads.append(threading.Thread(target=approver, args=(admin_id, expense_ids)))
+    threads.append(threading.Thread(target=topper, args=(7,)))
+
+    with Timer() as timer:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return outcomes, len(threads), timer.elapsed
+
+
+def reconcile(last_transaction, before):
+    problems = []
+    budgets_before, funds_before = before
+    zero = Decimal('0.00')
+    with app.app_context():
+        budgets_after, funds_after = snapshot()
+        topped_up, handed_out, allocated, spent = Counter(), Counter(), Counter(), Counter()
+        expense_transactions = Counter()
+        for transaction in Transaction.query.filter(Transaction.id > last_transaction):
+            if transaction.type == 'allocation' and transaction.expense_id is None:
+                sender_role = 'admin' if transaction.sender_id in budgets_after else 'superadmin'
+                if sender_role == 'superadmin':
+                    topped_up[transaction.receiver_id] += transaction.amount
+                else:
+                    handed_out[transaction.sender_id] += transaction.amount
+                    allocated[transaction.receiver_id] += transaction.amount
+            elif transaction.type == 'expense':
+                spent[transaction.sender_id] += transaction.amount
+                expense_transactions[transaction.expense_id] += 1
+
+        for admin_id, (total, total_spent, remaining) in budgets_after.items():
+            old_total, old_spent, _ = budgets_before.get(admin_id, (zero, zero, zero))
+            if total - old_total != topped_up[admin_id]:
+                problems.append(f'budget of admin {admin_id}: total moved {total - old_total}, top-ups {topped_up[admin_id]}')
+            if total_spent - old_spent != handed_out[admin_id]:
+                problems.append(f'budget of admin {admin_id}: spent moved {total_spent - old_spent}, allocations {handed_out[admin_id]}')
+            if remaining != total - total_spent or remaining < 0:
+                problems.append(f'budget of admin {admin_id}: remaining {remaining} != {total} - {total_spent}')
+
+        for employee_id, (fund_allocated, fund_spent, remaining) in funds_after.items():
+            old_allocated, old_spent, _ = funds_before.get(employee_id, (zero, zero, zero))
+            if fund_allocated - old_allocated != allocated[employee_id]:
+                problems.append(f'fund of {employee_id}: allocated moved {fund_allocated - old_allocated}, allocations {allocated[employee_id]}')
+            if fund_spent - old_spent != spent[employee_id]:
+                problems.append(f'fund of {employee_id}: spent moved {fund_spent - old_spent}, expenses {spent[employee_id]}')
+            if remaining != fund_allocated - fund_spent or remaining < 0:
+                problems.append(f'fund of {employee_id}: remaining {remaining} != {fund_allocated} - {fund_spent}')
+
+        approved = dict(db.session.query(Expense.id, Expense.status).filter(Expense.id.in_(list(expense_transactions))))
+        for expense_id, count in expense_transactions.items():
+            if count != 1 or approved.get(expense_id) != 'approved':
+                problems.append(f'expense {expense_id}: {count} expense transactions, status {approved.get(expense_id)}')
+    return problems, sum(expense_transactions.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--admins', type=int, default=2)
+    parser.add_argument('--employees', type=int, default=10, help='labour per admin')
+    parser.add_argument('--expenses', type=int, default=20, help='expenses per labour (about a quarter pending)')
+    parser.add_argument('--threads', type=int, default=4, help='allocating threads per admin')
+    parser.add_argument('--racers', type=int, default=3, help='threads approving the same expenses per admin')
+    parser.add_argument('--allocations', type=int, default=25, help='allocations per allocating thread')
+    parser.add_argument('--budget', default='5000.00', help='remaining budget each admin starts with')
+    args = parser.parse_args()
+
+    admins, employees, pending, last_transaction, before = prepare(args)
+    outcomes, thread_count, elapsed = run(args, admins, employees, pending)
+    print(f"{thread_count} threads, {sum(outcomes.values())} requests in {elapsed:.2f}s")
+    for (kind, status), count in sorted(outcomes.items(), key=str):
+        print(f"  {kind:<9} {status:<6} {count}")
+
+    problems, approvals = reconcile(last_transaction, before)
+    expected = outcomes['approve', 200]
+    if approvals != expected:
+        problems.append(f'{expected} approvals answered 200 but {approvals} expense transactions were written')
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    if problems:
+        sys.exit(1)
+    print("OK: budgets, funds and transactions reconcile")
+
+
+if __name__ == '__main__':
+    main()
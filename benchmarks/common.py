@@ -0,0 +1,86 @@
+"""Shared helpers for the benchmark scripts in this folder.
+
+The benchmarks run the real Flask app against a throwaway SQLite database so
+they can be run on a laptop without MySQL. Import this module *before*
+anything from ``app`` so ``DATABASE_URL`` is picked up at import time. It
+also sends the app's log to ``benchmarks/bench.log`` (ignored by git), not the
+tracked ``logs/error.log``, which slow-request warnings would otherwise fill.
+"""
+import logging
+import os
+import sys
+import time
+import resource
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+DEFAULT_DB_PATH = os.path.join(ROOT, 'benchmarks', 'bench.sqlite3')
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{DEFAULT_DB_PATH}")
+
+# Configured first, so the app's own logging.basicConfig is a no-op
+logging.basicConfig(
+    filename=os.path.join(ROOT, 'benchmarks', 'bench.log'),
+    level=logging.WARNING,
+    format='%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
+)
+
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.dialects.mysql import ENUM
+
+
+# The models use MySQL ENUM columns; render them as VARCHAR on SQLite.
+@compiles(ENUM, 'sqlite')
+def _compile_enum_sqlite(element, compiler, **kw):
+    return 'VARCHAR(20)'
+
+
+from app import app  # noqa: E402
+from extensions import db  # noqa: E402
+from app.cache import admin_section_cache  # noqa: E402
+from app.identity import user_cache  # noqa: E402
+from app.overview import invalidate_overview  # noqa: E402
+
+BENCH_PASSWORD = 'password'
+
+
+def clear_caches():
+    """Empty the per-worker caches, which would otherwise outlive a database reset.
+
+    Recreated rows reuse ids, so a cached user or section would be served as
+    if it were the new one, and the first request would differ from the rest.
+    """
+    admin_section_cache.clear()
+    user_cache.clear()
+    invalidate_overview()
+
+
+def reset_database():
+    """Drop and recreate every table in the benchmark database."""
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    clear_caches()
+
+
+def login(client, email, password=BENCH_PASSWORD):
+    response = client.post('/auth/login', json={'email': email, 'password': password})
+    if response.status_code != 200:
+        raise RuntimeError(f"Login failed for {email}: {response.get_json()}")
+    return client
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (Linux reports KB)."""
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage / 1024 if sys.platform != 'darwin' else usage / (1024 * 1024)
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
@@ -0,0 +1,127 @@
+"""Benchmark /superadmin/export-transactions-csv.
+
+Seeds N transactions into a throwaway SQLite database and reports, for each
+size, time-to-first-byte, total download time and the peak RSS of the worker
+process. Every size runs in its own subprocess so peak RSS is not polluted by
+the previous run.
+
+    python -m benchmarks.csv_export                  # 10k, 100k and 1M rows
+    python -m benchmarks.csv_export --rows 10000
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+INSERT_CHUNK = 10_000
+
+
+def seed(rows):
+    from benchmarks.common import app, db, reset_database, BENCH_PASSWORD
+    from app.models import User, Transaction
+    from werkzeug.security import generate_password_hash
+
+    reset_database()
+    with app.app_context():
+        password = generate_password_hash(BENCH_PASSWORD)
+        superadmin = User(name='Bench Superadmin', email='superadmin@bench.test', password=password, role='superadmin')
+        db.session.add(superadmin)
+        admins = [User(name=f'Admin {i}', email=f'admin{i}@bench.test', password=password, role='admin') for i in range(10)]
+        db.session.add_all(admins)
+        db.session.flush()
+        employees = [
+            User(name=f'Employee {i}', email=f'employee{i}@bench.test', password=password, role='employee',
+                 supervisor_id=admins[i % len(admins)].id)
+            for i in range(100)
+        ]
+        db.session.add_all(employees)
+        db.session.commit()
+
+        admin_ids = [a.id for a in admins]
+        employee_ids = [e.id for e in employees]
+        start = datetime(2025, 1, 1)
+        rng = random.Random(rows)
+        batch = []
+        for i in range(rows):
+            admin_id = rng.choice(admin_ids)
+            employee_id = rng.choice(employee_ids)
+            is_allocation = rng.random() < 0.4
+            batch.append({
+                'sender_id': admin_id if is_allocation else employee_id,
+                'receiver_id': employee_id if is_allocation else admin_id,
+                'type': 'allocation' if is_allocation else 'expense',
+                'amount': Decimal(rng.randint(100, 500000)) / 100,
+                'description': 'Fund allocation' if is_allocation else f'Site material purchase #{i}',
+                'timestamp': start + timedelta(seconds=rng.randint(0, 365 * 24 * 3600)),
+                'site_name': f'Site {rng.randint(1, 25)}',
+            })
+            if len(batch) == INSERT_CHUNK:
+                db.session.execute(Transaction.__table__.insert(), batch)
+                batch = []
+        if batch:
+            db.session.execute(Transaction.__table__.insert(), batch)
+        db.session.commit()
+
+
+def run_worker(rows):
+    seed_started = time.perf_counter()
+    seed(rows)
+    seed_seconds = time.perf_counter() - seed_started
+
+    from benchmarks.common import app, login, peak_rss_mb
+    rss_before = peak_rss_mb()
+
+    client = login(app.test_client(), 'superadmin@bench.test')
+    started = time.perf_counter()
+    response = client.get('/superadmin/export-transactions-csv?start_date=2025-01-01&end_date=2025-12-31', buffered=False)
+    chunks = iter(response.response)
+    first = next(chunks, b'')
+    ttfb = time.perf_counter() - started
+    size = len(first)
+    for chunk in chunks:
+        size += len(chunk)
+    total = time.perf_counter() - started
+    response.close()
+
+    print(json.dumps({
+        'rows': rows,
+        'status': response.status_code,
+        'seed_s': round(seed_seconds, 2),
+        'ttfb_ms': round(ttfb * 1000, 1),
+        'total_s': round(total, 3),
+        'bytes': size,
+        'rss_before_mb': round(rss_before, 1),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, action='append', help='number of transactions (repeatable)')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.rows[0])
+        return
+
+    print(f"{'rows':>10} {'ttfb ms':>10} {'total s':>10} {'MB out':>8} {'RSS before':>11} {'peak RSS':>9}")
+    for rows in args.rows or DEFAULT_SIZES:
+        out = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.csv_export', '--worker', '--rows', str(rows)],
+            cwd=os.path.abspath(os.path.join(os.path.dirname(__file__), '..')),
+            check=True, capture_output=True, text=True
+        ).stdout.strip().splitlines()[-1]
+        result = json.loads(out)
+        print(f"{result['rows']:>10} {result['ttfb_ms']:>10} {result['total_s']:>10} "
+              f"{result['bytes'] / 1e6:>8.1f} {result['rss_before_mb']:>10.1f}M {result['peak_rss_mb']:>8.1f}M")
+
+
+if __name__ == '__main__':
+    main()
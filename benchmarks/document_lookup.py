@@ -0,0 +1,153 @@
+"""Time the /employee/documents authorisation lookup on a large expenses table.
+
+Bulk-inserts ``--expenses`` expenses (1M by default) spread over
+``--employees`` employees, each with a stored-style receipt name. It then
+times, per lookup:
+
+* the old check, ``document_path LIKE '%<name>'``, a leading-wildcard scan
+  of the whole table (only ``--like`` lookups, since each one is slow);
+* the indexed check the route now runs, an exact match on
+  ``(employee_id, document_path)``;
+* ``GET /employee/documents/<name>`` end to end, for the owner and for
+  another employee, who must be refused.
+
+It also prints SQLite's plan for both queries.
+
+    python -m benchmarks.document_lookup --expenses 1000000
+"""
+import argparse
+import hashlib
+import os
+import random
+import shutil
+import statistics
+import tempfile
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import text
+
+from benchmarks.common import app, db, login, reset_database, Timer, BENCH_PASSWORD
+from app.documents import document_file
+from app.models import User, Expense
+from werkzeug.security import generate_password_hash
+
+BATCH_SIZE = 50000
+
+
+def stored_name(i):
+    return f"{hashlib.sha256(str(i).encode()).hexdigest()}.png"
+
+
+def seed(expense_count, employee_count):
+    reset_database()
+    with app.app_context():
+        password = generate_password_hash(BENCH_PASSWORD)
+        admin = User(name='Admin', email='admin@bench.test', password=password, role='admin')
+        db.session.add(admin)
+        db.session.flush()
+        db.session.execute(User.__table__.insert(), [{
+            'name': f'Employee {i}', 'email': f'employee{i}@bench.test', 'password': password,
+            'role': 'employee', 'supervisor_id': admin.id, 'is_active': True,
+        } for i in range(employee_count)])
+        employee_ids = [employee_id for (employee_id,) in
+                        db.session.query(User.id).filter_by(role='employee').order_by(User.id)]
+        created_at = datetime(2025, 1, 1)
+        for start in range(0, expense_count, BATCH_SIZE):
+            db.session.execute(Expense.__table__.insert(), [{
+                'employee_id': employee_ids[i % employee_count],
+                'admin_id': admin.id,
+                'title': f'Expense {i}',
+                'amount': Decimal('10.00'),
+                'document_path': stored_name(i),
+                'status': 'approved',
+                'created_at': created_at,
+                'updated_at': created_at,
+            } for i in range(start, min(start + BATCH_SIZE, expense_count))])
+        db.session.commit()
+        db.session.execute(text('ANALYZE'))
+        return employee_ids
+
+
+def time_query(statement, params_list):
+    timings = []
+    with app.app_context():
+        for params in params_list:
+            with Timer() as timer:
+                row = db.session.execute(text(statement), params).first()
+            assert row is not None, params
+            timings.append(timer.elapsed)
+        plan = db.session.execute(text(f'EXPLAIN QUERY PLAN {statement}'), params_list[0]).all()
+    return timings, '; '.join(step[-1] for step in plan)
+
+
+def report(label, timings):
+    ms = [t * 1000 for t in timings]
+    print(f"{label:<28} {len(ms):>6} {statistics.median(ms):>10.3f} {max(ms):>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--expenses', type=int, default=1000000)
+    parser.add_argument('--employees', type=int, default=1000)
+    parser.add_argument('--lookups', type=int, default=500)
+    parser.add_argument('--like', type=int, default=5, help='lookups with the old LIKE query')
+    args = parser.parse_args()
+
+    with Timer() as timer:
+        employee_ids = seed(args.expenses, args.employees)
+    print(f"seeded {args.expenses} expenses for {args.employees} employees in {timer.elapsed:.1f}s")
+
+    rng = random.Random(0)
+    picks = [rng.randrange(args.expenses) for _ in range(args.lookups)]
+    owner = lambda i: employee_ids[i % args.employees]
+
+    old_timings, old_plan = time_query(
+        'SELECT id, employee_id FROM expenses WHERE document_path LIKE :pattern LIMIT 1',
+        [{'pattern': f'%{stored_name(i)}'} for i in picks[:args.like]])
+    new_timings, new_plan = time_query(
+        'SELECT id FROM expenses WHERE employee_id = :employee_id AND document_path = :name LIMIT 1',
+        [{'employee_id': owner(i), 'name': stored_name(i)} for i in picks])
+
+    # The route checks the file exists before authorising, so give it some
+    upload_folder = tempfile.mkdtemp()
+    app.config['UPLOAD_FOLDER'] = upload_folder
+    route_picks = picks[:50]
+    try:
+        for i in route_picks:
+            path = document_file(upload_folder, stored_name(i))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(b'receipt')
+        clients = {}
+        allowed, denied = [], []
+        for i in route_picks:
+            employee_id = owner(i)
+            if employee_id not in clients:
+                clients[employee_id] = login(app.test_client(), f'employee{employee_ids.index(employee_id)}@bench.test')
+            with Timer() as timer:
+                response = clients[employee_id].get(f'/employee/documents/{stored_name(i)}')
+            assert response.status_code == 200, response.get_json()
+            allowed.append(timer.elapsed)
+            # Same document, asked for by the next employee along
+            other = owner(i + 1)
+            if other not in clients:
+                clients[other] = login(app.test_client(), f'employee{employee_ids.index(other)}@bench.test')
+            with Timer() as timer:
+                response = clients[other].get(f'/employee/documents/{stored_name(i)}')
+            assert response.status_code == 403, response.get_json()
+            denied.append(timer.elapsed)
+    finally:
+        shutil.rmtree(upload_folder, ignore_errors=True)
+
+    print(f"{'lookup':<28} {'calls':>6} {'p50 ms':>10} {'max ms':>10}")
+    report('old LIKE query', old_timings)
+    report('indexed query', new_timings)
+    report('GET documents (owner)', allowed)
+    report('GET documents (other)', denied)
+    print(f"old plan: {old_plan}")
+    print(f"new plan: {new_plan}")
+
+
+if __name__ == '__main__':
+    main()
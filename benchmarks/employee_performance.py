@@ -0,0 +1,138 @@
+"""Benchmark /ai/admin/employee-performance against the previous per-employee loop.
+
+Seeds one admin with N employees and K expenses each, then times the legacy
+implementation (three COUNTs per employee plus a Python loop over every
+processed expense) against the single grouped aggregate served by the
+endpoint, and checks both produce the same numbers.
+
+    python -m benchmarks.employee_performance --employees 200 --expenses 50
+"""
+import argparse
+import random
+import statistics
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import event, or_
+
+from benchmarks.common import app, db, reset_database, login, Timer, BENCH_PASSWORD
+from app.models import User, Expense
+from werkzeug.security import generate_password_hash
+
+
+def seed(employee_count, expenses_per_employee):
+    reset_database()
+    with app.app_context():
+        password = generate_password_hash(BENCH_PASSWORD)
+        admin = User(name='Admin', email='admin@bench.test', password=password, role='admin')
+        db.session.add(admin)
+        db.session.flush()
+        employees = [
+            User(name=f'Employee {i}', email=f'employee{i}@bench.test', password=password, role='employee',
+                 supervisor_id=admin.id, created_by=admin.id)
+            for i in range(employee_count)
+        ]
+        db.session.add_all(employees)
+        db.session.flush()
+
+        rng = random.Random(42)
+        start = datetime(2025, 1, 1)
+        rows = []
+        for employee in employees:
+            for i in range(expenses_per_employee):
+                created_at = start + timedelta(minutes=rng.randint(0, 365 * 24 * 60))
+                rows.append({
+                    'employee_id': employee.id,
+                    'admin_id': admin.id,
+                    'title': f'Expense {i}',
+                    'amount': Decimal(rng.randint(100, 100000)) / 100,
+                    'site_name': f'Site {rng.randint(1, 10)}',
+                    'status': rng.choice(['pending', 'approved', 'approved', 'rejected']),
+                    'created_at': created_at,
+                    'updated_at': created_at + timedelta(minutes=rng.randint(5, 72 * 60)),
+                })
+        db.session.execute(Expense.__table__.insert(), rows)
+        db.session.commit()
+        return admin.id
+
+
+def legacy_employee_performance(admin_id):
+    """The implementation this endpoint replaced, kept here for comparison."""
+    managed_employees = User.query.filter_by(created_by=admin_id, role='employee').all()
+    performance_data = []
+    for employee in managed_employees:
+        total_submitted = Expense.query.filter_by(employee_id=employee.id, admin_id=admin_id).count()
+        approved_expenses = Expense.query.filter_by(employee_id=employee.id, admin_id=admin_id, status='approved').count()
+        rejected_expenses = Expense.query.filter_by(employee_id=employee.id, admin_id=admin_id, status='rejected').count()
+        approval_rate = (approved_expenses / total_submitted * 100) if total_submitted > 0 else 0
+        processed_expenses = Expense.query.filter(
+            Expense.employee_id == employee.id,
+            Expense.admin_id == admin_id,
+            or_(Expense.status == 'approved', Expense.status == 'rejected'),
+            Expense.created_at.isnot(None),
+            Expense.updated_at.isnot(None)
+        ).all()
+        total_seconds = 0
+        count_processed = 0
+        for exp in processed_expenses:
+            total_seconds += (exp.updated_at - exp.created_at).total_seconds()
+            count_processed += 1
+        avg_response_hours = (total_seconds / count_processed / 3600) if count_processed > 0 else 0
+        performance_data.append({
+            'employee_id': employee.id,
+            'employee_name': employee.name,
+            'total_submitted': total_submitted,
+            'approved_count': approved_expenses,
+            'rejected_count': rejected_expenses,
+            'approval_rate': round(approval_rate, 2),
+            'avg_processing_time_hours': round(avg_response_hours, 2)
+        })
+    return performance_data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--employees', type=int, default=200)
+    parser.add_argument('--expenses', type=int, default=50, help='expenses per employee')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    admin_id = seed(args.employees, args.expenses)
+    client = login(app.test_client(), 'admin@bench.test')
+
+    statements = []
+    listener = lambda *a, **kw: statements.append(1)  # noqa: E731
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', listener)
+
+    legacy_times = []
+    for _ in range(args.repeat):
+        statements.clear()
+        with app.app_context(), Timer() as timer:
+            legacy = legacy_employee_performance(admin_id)
+        legacy_times.append(timer.elapsed)
+    legacy_queries = len(statements)
+
+    new_times = []
+    for _ in range(args.repeat):
+        statements.clear()
+        with Timer() as timer:
+            response = client.get('/ai/admin/employee-performance')
+        new_times.append(timer.elapsed)
+    new_queries = len(statements)
+    event.remove(engine, 'before_cursor_execute', listener)
+
+    current = response.get_json()['employee_performance']
+    mismatches = [(a, b) for a, b in zip(legacy, current) if a != b]
+
+    print(f"{args.employees} employees x {args.expenses} expenses")
+    print(f"{'':>8} {'median ms':>10} {'queries':>8}  (endpoint figures include the login lookup)")
+    print(f"{'legacy':>8} {statistics.median(legacy_times) * 1000:>10.1f} {legacy_queries:>8}")
+    print(f"{'grouped':>8} {statistics.median(new_times) * 1000:>10.1f} {new_queries:>8}")
+    print('results match' if not mismatches and len(legacy) == len(current)
+          else f"MISMATCH in {len(mismatches)} rows, e.g. {mismatches[:1]}")
+
+
+if __name__ == '__main__':
+    main()
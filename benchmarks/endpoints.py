@@ -0,0 +1,351 @@
+"""Benchmark every blueprint endpoint against a synthetic organisation.
+
+Seeds the benchmark database with ``seed_data.seed`` and then calls each
+endpoint ``--iterations`` times through the Flask test client as the role it
+serves. For each endpoint it reports p50/p95 latency, the SQL statements per
+call and the peak Python memory allocated by one call (tracemalloc).
+
+``--save`` writes the results as JSON, and ``--compare`` checks a run against
+a saved baseline. The compare step exits non-zero when an endpoint's p95
+latency grows by more than ``--tolerance`` or its query count grows at all.
+
+    python -m benchmarks.endpoints --save benchmarks/baseline.json
+    python -m benchmarks.endpoints --compare benchmarks/baseline.json
+
+By default, caches are warm after the first call, as in production.
+``--cold`` clears the in-process caches before every call.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import tracemalloc
+from datetime import datetime
+from decimal import Decimal
+
+from PIL import Image
+from sqlalchemy import event
+
+from benchmarks.common import app, clear_caches, db, login, peak_rss_mb, Timer, BENCH_PASSWORD
+from app.models import User, Expense, EmployeeFund
+from seed_data import seed
+
+SUPERADMIN = 'superadmin@seed.test'
+ADMIN = 'admin1@seed.test'
+EMPLOYEE = 'employee1_1@seed.test'
+
+
+class Endpoint:
+    """One benchmarked call. ``url``, ``json`` and ``data`` may be callables of the call number."""
+
+    def __init__(self, name, account, method, url, json=None, data=None, session='shared'):
+        self.name = name
+        self.account = account
+        self.method = method
+        self.url = url
+        self.json = json
+        self.data = data
+        # 'shared': the account's logged-in client; 'anonymous': a new client;
+        # 'fresh': a newly logged-in client per call (for logout)
+        self.session = session
+
+    def request_args(self, n):
+        resolve = lambda value: value(n) if callable(value) else value
+        kwargs = {}
+        if self.json is not None:
+            kwargs['json'] = resolve(self.json)
+        if self.data is not None:
+            kwargs['data'] = resolve(self.data)
+        return resolve(self.url), kwargs
+
+
+def prepare_fixtures(upload_folder):
+    """Ids and files the endpoints below need, looked up from the seeded data."""
+    with app.app_context():
+        users = {user.email: user for user in User.query.filter(User.email.in_([SUPERADMIN, ADMIN, EMPLOYEE])).all()}
+        admin, employee = users[ADMIN], users[EMPLOYEE]
+        other_admin = User.query.filter_by(email='admin2@seed.test').one()
+        other_employee = User.query.filter_by(supervisor_id=other_admin.id, role='employee').first()
+
+        # Room in every fund of the benchmarked admin so approvals never fail on balance
+        EmployeeFund.query.filter_by(admin_id=admin.id).update(
+            {EmployeeFund.remaining_balance: EmployeeFund.remaining_balance + Decimal('10000000.00')},
+            synchronize_session=False
+        )
+        db.session.commit()
+
+        pending = [expense_id for (expense_id,) in db.session.query(Expense.id).filter_by(
+            admin_id=admin.id, status='pending').order_by(Expense.id)]
+        # Approved receipts: rejecting an expense deletes its document
+        with_document = Expense.query.filter(Expense.status == 'approved', Expense.document_path.isnot(None))
+        admin_document = with_document.filter(Expense.admin_id == admin.id).first()
+        employee_document = with_document.filter(Expense.employee_id == employee.id).first()
+        # A decodable photo, so the thumbnail routes can render previews of it
+        for expense in (admin_document, employee_document):
+            Image.effect_noise((1200, 1600), 64).convert('RGB').save(
+                os.path.join(upload_folder, expense.document_path), 'JPEG')
+
+        return {
+            'admin_id': admin.id,
+            'employee_id': employee.id,
+            'employee_name': employee.name,
+            'other_admin_id': other_admin.id,
+            'other_employee_id': other_employee.id,
+            'pending': pending,
+            'expense_id': admin_document.id,
+            'admin_document': admin_document.document_path,
+            'employee_document': employee_document.document_path,
+        }
+
+
+def build_endpoints(f):
+    pending = list(reversed(f['pending']))
+
+    def next_pending(n):
+        if not pending:
+            raise SystemExit("Not enough pending expenses for approve/reject; seed more --expenses")
+        return pending.pop()
+
+    stamp = datetime.utcnow().strftime('%H%M%S%f')
+
+    def expenses_csv(n):
+        rows = [f"{f['employee_name']},Bench import {n} {i},10,Bench" for i in range(10)]
+        return (io.BytesIO('\n'.join(['Name (Labour),Description,Amount,Site Name', *rows]).encode()), 'import.csv')
+
+    def new_users(prefix, n, **extra):
+        return {'users': [{'name': f'Bench Labour {n} {i}', 'email': f'{prefix}-{stamp}-{n}-{i}@seed.test',
+                           'password': BENCH_PASSWORD, **extra} for i in range(5)]}
+
+    return [
+        # app
+        Endpoint('index', None, 'GET', '/', session='anonymous'),
+        Endpoint('dashboard', ADMIN, 'GET', '/dashboard/admin'),
+        Endpoint('session_status', EMPLOYEE, 'GET', '/session-status'),
+        # auth
+        Endpoint('auth.login', None, 'POST', '/auth/login',
+                 json={'email': EMPLOYEE, 'password': BENCH_PASSWORD}, session='anonymous'),
+        Endpoint('auth.get_current_user', EMPLOYEE, 'GET', '/auth/me'),
+        Endpoint('auth.check_session', EMPLOYEE, 'GET', '/auth/check-session'),
+        Endpoint('auth.logout', EMPLOYEE, 'POST', '/auth/logout', session='fresh'),
+        # superadmin
+        Endpoint('superadmin.get_superadmin_overview', SUPERADMIN, 'GET', '/superadmin/overview'),
+        Endpoint('superadmin.get_users', SUPERADMIN, 'GET', '/superadmin/users'),
+        Endpoint('superadmin.get_all_users', SUPERADMIN, 'GET', '/superadmin/all-users'),
+        Endpoint('superadmin.get_admins', SUPERADMIN, 'GET', '/superadmin/admins'),
+        Endpoint('superadmin.get_employees', SUPERADMIN, 'GET', '/superadmin/employees'),
+        Endpoint('superadmin.get_transactions', SUPERADMIN, 'GET', '/superadmin/transactions'),
+        Endpoint('superadmin.export_transactions_csv', SUPERADMIN, 'GET',
+                 '/superadmin/export-transactions-csv?start_date=2000-01-01&end_date=2100-01-01'),
+        Endpoint('superadmin.get_cache_stats', SUPERADMIN, 'GET', '/superadmin/cache-stats'),
+        Endpoint('superadmin.get_pool_stats', SUPERADMIN, 'GET', '/superadmin/pool-stats'),
+        Endpoint('superadmin.get_request_metrics', SUPERADMIN, 'GET', '/superadmin/request-metrics'),
+        Endpoint('superadmin.add_user', SUPERADMIN, 'POST', '/superadmin/add-user',
+                 json=lambda n: {'name': f'Bench Labour {n}', 'email': f'bench-su-{stamp}-{n}@seed.test',
+                                 'password': BENCH_PASSWORD, 'role': 'employee', 'supervisor_id': f['other_admin_id']}),
+        Endpoint('superadmin.update_user', SUPERADMIN, 'PUT', f"/superadmin/update-user/{f['other_employee_id']}",
+                 json=lambda n: {'phone': f'+91{n:010d}'}),
+        Endpoint('superadmin.toggle_user_status', SUPERADMIN, 'POST',
+                 f"/superadmin/user/{f['other_employee_id']}/toggle-status"),
+        Endpoint('superadmin.allocate_budget', SUPERADMIN, 'POST', '/superadmin/allocate-budget',
+                 json={'admin_id': f['other_admin_id'], 'amount': 1, 'site_name': 'Bench'}),
+        Endpoint('superadmin.allocate_budgets', SUPERADMIN, 'POST', '/superadmin/allocate-budgets',
+                 json={'allocations': [{'admin_id': f['admin_id'], 'amount': 1},
+                                       {'admin_id': f['other_admin_id'], 'amount': 1}], 'site_name': 'Bench'}),
+        Endpoint('superadmin.provision_users', SUPERADMIN, 'POST', '/superadmin/provision-users',
+                 json=lambda n: new_users('bench-su-bulk', n, role='employee', supervisor_id=f['other_admin_id'])),
+        # admin
+        Endpoint('admin.get_dashboard', ADMIN, 'GET', '/admin/dashboard'),
+        Endpoint('admin.get_employees_managed_by_admin', ADMIN, 'GET', '/admin/employees'),
+        Endpoint('admin.get_bootstrap', ADMIN, 'GET', '/admin/bootstrap'),
+        Endpoint('admin.get_ledger', ADMIN, 'GET', '/admin/ledger'),
+        Endpoint('admin.get_employee_transactions', ADMIN, 'GET', '/admin/employee-transactions'),
+        Endpoint('admin.get_expense_details', ADMIN, 'GET', f"/admin/expenses/{f['expense_id']}/details"),
+        Endpoint('admin.export_employee_transactions_csv', ADMIN, 'GET',
+                 '/admin/export-employee-transactions-csv?start_date=2000-01-01&end_date=2100-01-01'),
+        Endpoint('admin.get_all_admins', ADMIN, 'GET', '/admin/all-admins'),
+        Endpoint('admin.serve_document', ADMIN, 'GET', f"/admin/documents/{f['admin_document']}"),
+        Endpoint('admin.serve_thumbnail', ADMIN, 'GET', f"/admin/documents/{f['admin_document']}/thumbnail"),
+        Endpoint('admin.add_employee', ADMIN, 'POST', '/admin/add-employee',
+                 json=lambda n: {'name': f'Bench Labour {n}', 'email': f'bench-ad-{stamp}-{n}@seed.test',
+                                 'password': BENCH_PASSWORD}),
+        Endpoint('admin.allocate_fund_to_employee', ADMIN, 'POST', '/admin/allocate-fund',
+                 json={'employee_id': f['employee_id'], 'amount': 1, 'site_name': 'Bench'}),
+        Endpoint('admin.allocate_funds_to_employees', ADMIN, 'POST', '/admin/allocate-funds',
+                 json={'allocations': [{'employee_id': f['employee_id'], 'amount': 1}], 'site_name': 'Bench'}),
+        Endpoint('admin.provision_employees', ADMIN, 'POST', '/admin/provision-employees',
+                 json=lambda n: new_users('bench-ad-bulk', n)),
+        Endpoint('admin.add_expense', ADMIN, 'POST', '/admin/add-expense',
+                 data={'employee_id': str(f['employee_id']), 'title': 'Bench expense', 'amount': '10', 'site_name': 'Bench'}),
+        Endpoint('admin.approve_expense', ADMIN, 'POST', lambda n: f'/admin/expenses/{next_pending(n)}/approve'),
+        Endpoint('admin.reject_expense', ADMIN, 'POST', lambda n: f'/admin/expenses/{next_pending(n)}/reject',
+                 json={'reason': 'Benchmark'}),
+        Endpoint('admin.review_expenses', ADMIN, 'POST', '/admin/expenses/review',
+                 json=lambda n: {'items': [{'expense_id': next_pending(n), 'decision': 'approve'},
+                                           {'expense_id': next_pending(n), 'decision': 'reject', 'reason': 'Benchmark'}]}),
+        Endpoint('admin.import_expenses', ADMIN, 'POST', '/admin/import-expenses',
+                 data=lambda n: {'file': expenses_csv(n)}),
+        # ai_insights
+        Endpoint('ai_insights.get_admin_spending_trends', ADMIN, 'GET', '/ai/admin/spending-trends'),
+        Endpoint('ai_insights.get_admin_employee_performance', ADMIN, 'GET', '/ai/admin/employee-performance'),
+        Endpoint('ai_insights.get_admin_day_patterns', ADMIN, 'GET', '/ai/admin/day-patterns'),
+        Endpoint('ai_insights.get_employee_spending_insights', EMPLOYEE, 'GET', '/ai/employee/spending-insights'),
+        # employee
+        Endpoint('employee.get_employee_dashboard', EMPLOYEE, 'GET', '/employee/dashboard'),
+        Endpoint('employee.get_admins', EMPLOYEE, 'GET', '/employee/admins'),
+        Endpoint('employee.get_my_requests', EMPLOYEE, 'GET', '/employee/my-requests'),
+        Endpoint('employee.serve_document', EMPLOYEE, 'GET', f"/employee/documents/{f['employee_document']}"),
+        Endpoint('employee.serve_thumbnail', EMPLOYEE, 'GET', f"/employee/documents/{f['employee_document']}/thumbnail"),
+        Endpoint('employee.submit_expense', EMPLOYEE, 'POST', '/employee/submit-expense',
+                 data={'title': 'Bench expense', 'amount': '10', 'site_name': 'Bench'}),
+    ]
+
+
+def check_coverage(endpoints):
+    """Fail if a registered view has no benchmark, so new routes cannot slip past."""
+    registered = {rule.endpoint for rule in app.url_map.iter_rules()} - {'static'}
+    missing = sorted(registered - {endpoint.name for endpoint in endpoints})
+    if missing:
+        raise SystemExit(f"No benchmark for registered endpoints: {', '.join(missing)}; add them to build_endpoints")
+
+
+def measure(endpoint, clients, iterations, cold):
+    statements = []
+    with app.app_context():
+        engine = db.engine
+
+    def count(*args):
+        statements[-1] += 1
+
+    def call(n):
+        if endpoint.session == 'anonymous':
+            client = app.test_client()
+        elif endpoint.session == 'fresh':
+            client = login(app.test_client(), endpoint.account)
+        else:
+            client = clients[endpoint.account]
+        url, kwargs = endpoint.request_args(n)
+        if cold:
+            clear_caches()
+        statements.append(0)
+        event.listen(engine, 'before_cursor_execute', count)
+        try:
+            with Timer() as timer:
+                response = getattr(client, endpoint.method.lower())(url, **kwargs)
+                response.get_data()  # drain streamed responses
+        finally:
+            event.remove(engine, 'before_cursor_execute', count)
+        if response.status_code >= 400:
+            raise SystemExit(f"{endpoint.name}: {endpoint.method} {url} returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+        return timer.elapsed
+
+    call(0)  # warm-up
+    latencies = [call(n) for n in range(1, iterations + 1)]
+    counts = statements[1:]
+
+    tracemalloc.start()
+    call(iterations + 1)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'p50_ms': round(statistics.median(latencies) * 1000, 3),
+        'p95_ms': round(latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] * 1000, 3),
+        'queries': round(statistics.mean(counts), 2),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def compare(results, dataset, baseline_path, tolerance, min_delta_ms):
+    with open(baseline_path) as handle:
+        saved = json.load(handle)
+    baseline = saved['endpoints']
+    regressions = []
+    if {key: saved['meta']['dataset'].get(key) for key in dataset} != dataset:
+        print(f"\nWARNING: baseline dataset {saved['meta']['dataset']} differs from this run's {dataset}")
+    print(f"\nCompared with {baseline_path} (tolerance {tolerance:.0%}, at least {min_delta_ms:g}ms):")
+    print(f"{'endpoint':<52} {'p95 before':>10} {'p95 now':>9} {'change':>8} {'queries':>11}")
+    for name, now in results.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f"{name:<52} {'new':>10}")
+            continue
+        change = (now['p95_ms'] - before['p95_ms']) / before['p95_ms'] if before['p95_ms'] else 0.0
+        flags = []
+        if change > tolerance and now['p95_ms'] - before['p95_ms'] > min_delta_ms:
+            flags.append('latency')
+        if now['queries'] > before['queries']:
+            flags.append('queries')
+        if flags:
+            regressions.append((name, flags))
+        print(f"{name:<52} {before['p95_ms']:>9.2f}ms {now['p95_ms']:>8.2f}ms {change:>+8.0%} "
+              f"{before['queries']:>5g}->{now['queries']:<5g}{'  REGRESSED: ' + ', '.join(flags) if flags else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--admins', type=int, default=5)
+    parser.add_argument('--employees', type=int, default=20, help='employees per admin')
+    parser.add_argument('--expenses', type=int, default=50, help='expenses per employee')
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--only', action='append', help='benchmark only endpoints whose name contains this')
+    parser.add_argument('--cold', action='store_true', help='clear in-process caches before every call')
+    parser.add_argument('--save', metavar='PATH', help='write the results as a JSON baseline')
+    parser.add_argument('--compare', metavar='PATH', help='compare against a saved baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed p95 growth before failing (0.2 = 20%%)')
+    parser.add_argument('--min-delta-ms', type=float, default=2.0, help='ignore p95 growth smaller than this')
+    args = parser.parse_args()
+
+    counts = seed(args.admins, args.employees, args.expenses, quiet=True)
+    print(f"Seeded {counts}")
+
+    upload_folder = tempfile.mkdtemp(prefix='bench-uploads-')
+    app.config['UPLOAD_FOLDER'] = upload_folder
+    try:
+        fixtures = prepare_fixtures(upload_folder)
+        endpoints = build_endpoints(fixtures)
+        check_coverage(endpoints)
+        if args.only:
+            endpoints = [endpoint for endpoint in endpoints if any(part in endpoint.name for part in args.only)]
+        clients = {account: login(app.test_client(), account) for account in (SUPERADMIN, ADMIN, EMPLOYEE)}
+
+        results = {}
+        print(f"\n{'endpoint':<52} {'p50':>9} {'p95':>9} {'queries':>8} {'peak':>10}")
+        for endpoint in endpoints:
+            result = results[endpoint.name] = measure(endpoint, clients, args.iterations, args.cold)
+            print(f"{endpoint.name:<52} {result['p50_ms']:>7.2f}ms {result['p95_ms']:>7.2f}ms "
+                  f"{result['queries']:>8g} {result['peak_kb']:>8.1f}KB")
+        print(f"\nProcess peak RSS: {peak_rss_mb():.1f} MB")
+    finally:
+        shutil.rmtree(upload_folder, ignore_errors=True)
+
+    if args.save:
+        with open(args.save, 'w') as handle:
+            json.dump({
+                'meta': {
+                    'created_at': datetime.utcnow().isoformat(timespec='seconds'),
+                    'python': platform.python_version(),
+                    'database': app.config['SQLALCHEMY_DATABASE_URI'].split(':', 1)[0],
+                    'dataset': {'admins': args.admins, 'employees_per_admin': args.employees,
+                                'expenses_per_employee': args.expenses, 'rows': counts},
+                    'iterations': args.iterations,
+                    'cold': args.cold,
+                    'peak_rss_mb': round(peak_rss_mb(), 1),
+                },
+                'endpoints': results
+            }, handle, indent=2, sort_keys=True)
+        print(f"Saved baseline to {args.save}")
+
+    dataset = {'admins': args.admins, 'employees_per_admin': args.employees, 'expenses_per_employee': args.expenses}
+    if args.compare and compare(results, dataset, args.compare, args.tolerance, args.min_delta_ms):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Time /admin/import-expenses against one /admin/add-expense call per row.
+
+Seeds an admin with labour through ``seed_data.seed``. It builds a CSV in
+the employee transactions export format, with a few invalid rows mixed in,
+and imports it with ``?partial=true``. It reports time, SQL statements and
+the error report, then times ``--single`` rows added one request at a time
+for comparison.
+
+    python -m benchmarks.expense_import --rows 10000
+"""
+import argparse
+import csv
+import io
+import random
+
+from sqlalchemy import event
+
+from benchmarks.common import app, db, login, Timer
+from app.models import User, Expense
+from seed_data import seed, SITE_NAMES, EXPENSE_TITLES
+
+ADMIN = 'admin1@seed.test'
+HEADER = ['Serial No.', 'Date', 'Name (Labour)', 'Description', 'Amount',
+          'Supporting Document (Invoice/Bill) Link', 'Type', 'Site Name', 'Document URL']
+
+
+def build_csv(names, rows, invalid_every=500):
+    rng = random.Random(7)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(HEADER)
+    for i in range(rows):
+        amount = f'{rng.uniform(10, 5000):.2f}'
+        name = rng.choice(names)
+        if invalid_every and i % invalid_every == invalid_every - 1:
+            amount, name = ('-5', name) if (i // invalid_every) % 2 else (amount, 'Nobody')
+        writer.writerow([i + 1, f'2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 10:00:00', name,
+                         rng.choice(EXPENSE_TITLES), amount, '', 'Expense', rng.choice(SITE_NAMES), ''])
+    return buffer.getvalue().encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--employees', type=int, default=50)
+    parser.add_argument('--single', type=int, default=200, help='rows to add one request at a time')
+    args = parser.parse_args()
+
+    seed(1, args.employees, 0, quiet=True)
+    with app.app_context():
+        employees = User.query.filter_by(role='employee').all()
+        names = [employee.name for employee in employees]
+        employee_id = employees[0].id
+        engine = db.engine
+    client = login(app.test_client(), ADMIN)
+    payload = build_csv(names, args.rows)
+
+    statements = []
+    count = lambda *a: statements.append(1)
+    event.listen(engine, 'before_cursor_execute', count)
+    with Timer() as timer:
+        response = client.post('/admin/import-expenses?partial=true',
+                               data={'file': (io.BytesIO(payload), 'expenses.csv')})
+    event.remove(engine, 'before_cursor_execute', count)
+    report = response.get_json()
+    assert response.status_code == 201, report
+    print(f"bulk import:  {report['imported']} rows in {timer.elapsed:.2f}s "
+          f"({report['imported'] / timer.elapsed:,.0f} rows/s), {len(statements)} SQL statements, "
+          f"{len(report['errors'])} rows rejected")
+    for error in report['errors'][:3]:
+        print(f"  line {error['line']}: {'; '.join(error['errors'])}")
+
+    with Timer() as timer:
+        for i in range(args.single):
+            response = client.post('/admin/add-expense', data={
+                'employee_id': str(employee_id), 'title': 'Cement bags', 'amount': '100', 'site_name': SITE_NAMES[0]})
+            assert response.status_code == 201, response.get_json()
+    per_row = timer.elapsed / args.single
+    print(f"add-expense:  {args.single} rows in {timer.elapsed:.2f}s ({1 / per_row:,.0f} rows/s); "
+          f"{args.rows} rows would take ~{per_row * args.rows:.0f}s")
+
+    with app.app_context():
+        print(f"expenses in database: {Expense.query.count()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""Time /admin/expenses/review against one approve/reject request per expense.
+
+Seeds one admin with labour and pending expenses through ``seed_data.seed``.
+One employee's fund is squeezed so that some approvals fail on balance.
+Every pending expense is then reviewed twice, on identical seeds: once one
+request per expense, once in a single batch. The script checks that both runs
+leave the same expenses approved. Afterwards it reconciles the batch run:
+fund balances against approved spend, one expense transaction per approval,
+and the incremental rollups against a full rebuild.
+
+    python -m benchmarks.expense_review --employees 50 --expenses 40
+"""
+import argparse
+import sys
+from decimal import Decimal
+
+from sqlalchemy import event, func
+
+from benchmarks.common import app, db, login, Timer
+from app.models import ApprovalHourHistogram, EmployeeFund, Expense, MonthlySpendRollup, Transaction
+from app.rollups import rebuild_approval_histogram, rebuild_monthly_spend
+from seed_data import seed
+
+ADMIN = 'admin1@seed.test'
+
+
+def prepare(employees, expenses):
+    seed(1, employees, expenses, quiet=True)
+    with app.app_context():
+        pending = Expense.query.filter_by(status='pending').order_by(Expense.id).all()
+        # Leave the first employee able to afford only part of their pending expenses
+        squeezed = pending[0].employee_id
+        fund = EmployeeFund.query.filter_by(employee_id=squeezed).one()
+        own = sorted(expense.amount for expense in pending if expense.employee_id == squeezed)
+        fund.remaining_balance = sum(own[:len(own) // 2], Decimal('0.00'))
+        db.session.commit()
+        # Every fifth pending expense is rejected, the rest approved
+        return [{'expense_id': expense.id, 'decision': 'reject' if i % 5 == 4 else 'approve'}
+                for i, expense in enumerate(pending)]
+
+
+def count_statements():
+    statements = []
+    with app.app_context():
+        engine = db.engine
+    listener = lambda *args: statements.append(1)
+    event.listen(engine, 'before_cursor_execute', listener)
+    return statements, lambda: event.remove(engine, 'before_cursor_execute', listener)
+
+
+def approved_ids():
+    with app.app_context():
+        return {expense_id for (expense_id,) in db.session.query(Expense.id).filter_by(status='approved')}
+
+
+def rollup_rows():
+    return (
+        sorted(db.session.query(MonthlySpendRollup.admin_id, MonthlySpendRollup.employee_id, MonthlySpendRollup.site_name,
+                                MonthlySpendRollup.year_month, MonthlySpendRollup.total_amount,
+                                MonthlySpendRollup.expense_count, MonthlySpendRollup.min_amount,
+                                MonthlySpendRollup.max_amount).all()),
+        sorted(db.session.query(ApprovalHourHistogram.admin_id, ApprovalHourHistogram.activity_date,
+                                ApprovalHourHistogram.hour, ApprovalHourHistogram.approval_count,
+                                ApprovalHourHistogram.total_amount).all())
+    )
+
+
+def reconcile():
+    problems = []
+    with app.app_context():
+        spent = dict(db.session.query(Expense.employee_id, func.sum(Expense.amount))
+                     .filter_by(status='approved').group_by(Expense.employee_id).all())
+        for fund in EmployeeFund.query.all():
+            if fund.amount_spent != spent.get(fund.employee_id, 0):
+                problems.append(f'fund {fund.id}: amount_spent {fund.amount_spent} != approved {spent.get(fund.employee_id)}')
+            if fund.remaining_balance < 0:
+                problems.append(f'fund {fund.id}: negative balance {fund.remaining_balance}')
+        approvals = Expense.query.filter_by(status='approved').count()
+        transactions = Transaction.query.filter_by(type='expense').count()
+        if approvals != transactions:
+            problems.append(f'{approvals} approved expenses but {transactions} expense transactions')
+
+        incremental = rollup_rows()
+        rebuild_monthly_spend()
+        rebuild_approval_histogram()
+        if incremental != rollup_rows():
+            problems.append('incremental rollups differ from a rebuild')
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--employees', type=int, default=50)
+    parser.add_argument('--expenses', type=int, default=40, help='expenses per employee (about a quarter are pending)')
+    args = parser.parse_args()
+
+    items = prepare(args.employees, args.expenses)
+    client = login(app.test_client(), ADMIN)
+    statements, stop = count_statements()
+    with Timer() as timer:
+        for item in items:
+            client.post(f"/admin/expenses/{item['expense_id']}/{item['decision']}")
+    stop()
+    single_approved = approved_ids()
+    print(f"one request per expense: {len(items)} items in {timer.elapsed:.2f}s, {len(statements)} SQL statements")
+
+    prepare(args.employees, args.expenses)
+    client = login(app.test_client(), ADMIN)
+    statements, stop = count_statements()
+    with Timer() as timer:
+        response = client.post('/admin/expenses/review', json={'items': items})
+    stop()
+    report = response.get_json()
+    assert response.status_code == 200, report
+    print(f"one batch request:       {len(items)} items in {timer.elapsed:.2f}s, {len(statements)} SQL statements "
+          f"({report['approved']} approved, {report['rejected']} rejected, {report['failed']} failed)")
+
+    problems = reconcile()
+    if approved_ids() != single_approved:
+        problems.append('batch and single requests approved different expenses')
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    if problems:
+        sys.exit(1)
+    print("OK: balances, transactions and rollups reconcile")
+
+
+if __name__ == '__main__':
+    main()
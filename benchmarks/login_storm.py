@@ -0,0 +1,94 @@
+"""Login throughput, and the latency of other requests, during a login storm.
+
+Seeds a small organisation through ``seed_data.seed``. For each
+``--workers`` setting (``LOGIN_HASH_WORKERS``; 0 checks passwords on the
+request thread), ``--storm`` threads log in back to back for ``--seconds``.
+Meanwhile a probe thread, already signed in, calls ``GET /admin/dashboard``
+every ``--probe-ms``. The script reports logins per second, 503 answers and
+probe latency percentiles.
+
+Everything runs in this process, in the threads of one worker, as under
+gunicorn's gthread worker. On a single core the pool cannot add throughput;
+what it shows is that capping concurrent hashes keeps the probe responsive.
+
+    python -m benchmarks.login_storm --storm 16 --workers 0 --workers 2
+"""
+import argparse
+import threading
+import time
+
+from benchmarks.common import app, login, BENCH_PASSWORD
+from seed_data import seed
+
+ADMIN = 'admin1@seed.test'
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def storm(workers, threads, seconds, probe_interval):
+    app.config['LOGIN_HASH_WORKERS'] = workers
+    # Start the pool, and sign the probe in, before the clock does
+    login(app.test_client(), 'employee1_1@seed.test')
+    probe_client = login(app.test_client(), ADMIN)
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    logins, busy, probes = [], [0], []
+
+    def stormer(n):
+        client = app.test_client()
+        email = f'employee1_{n % 10 + 1}@seed.test'
+        while not stop.is_set():
+            started = time.perf_counter()
+            response = client.post('/auth/login', json={'email': email, 'password': BENCH_PASSWORD})
+            with lock:
+                if response.status_code == 200:
+                    logins.append(time.perf_counter() - started)
+                elif response.status_code == 503:
+                    busy[0] += 1
+
+    def prober():
+        while not stop.is_set():
+            started = time.perf_counter()
+            response = probe_client.get('/admin/dashboard')
+            assert response.status_code == 200, response.get_json()
+            probes.append(time.perf_counter() - started)
+            time.sleep(probe_interval)
+
+    all_threads = [threading.Thread(target=stormer, args=(n,)) for n in range(threads)]
+    all_threads.append(threading.Thread(target=prober))
+    for thread in all_threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in all_threads:
+        thread.join()
+
+    ms = lambda value: f'{value * 1000:7.0f}'
+    mode = f'{workers} processes' if workers else 'inline'
+    print(f"{mode:<12} {len(logins) / seconds:9.1f} {busy[0]:6} {ms(percentile(logins, 0.5))} "
+          f"{ms(percentile(probes, 0.5))} {ms(percentile(probes, 0.95))} {ms(max(probes, default=0))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--storm', type=int, default=16, help='threads logging in concurrently')
+    parser.add_argument('--workers', type=int, action='append', help='LOGIN_HASH_WORKERS values (default 0 and 2)')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--probe-ms', type=float, default=50, help='pause between probe requests')
+    args = parser.parse_args()
+
+    seed(1, 10, 10, quiet=True)
+    print(f"{args.storm} login threads for {args.seconds:.0f}s, probe GET /admin/dashboard")
+    print(f"{'mode':<12} {'logins/s':>9} {'503s':>6} {'login p50':>7} {'probe p50':>7} {'p95':>7} {'max':>7}  (ms)")
+    for workers in args.workers or [0, 2]:
+        storm(workers, args.storm, args.seconds, args.probe_ms / 1000)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Check that /employee/my-requests reads expenses with exactly one SQL statement.
+
+Seeds one employee with an increasing number of expense requests and counts
+the statements each page request runs against ``expenses``. Statements on
+other tables are left out, such as the ``load_user`` lookup that the identity
+cache may or may not skip. The check therefore measures the route itself.
+Exits non-zero unless every size takes ``EXPECTED_STATEMENTS``.
+
+    python -m benchmarks.my_requests_queries
+"""
+import sys
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import event
+
+from benchmarks.common import app, db, reset_database, login, Timer, BENCH_PASSWORD
+from app.models import User, Expense
+from werkzeug.security import generate_password_hash
+
+SIZES = [5, 50, 500, 5000]
+# One joined, keyset-paged query for the page, whatever the row count
+EXPECTED_STATEMENTS = 1
+
+
+def seed(expense_count):
+    reset_database()
+    with app.app_context():
+        password = generate_password_hash(BENCH_PASSWORD)
+        admins = [User(name=f'Admin {i}', email=f'admin{i}@bench.test', password=password, role='admin') for i in range(3)]
+        db.session.add_all(admins)
+        db.session.flush()
+        employee = User(name='Employee', email='employee@bench.test', password=password, role='employee',
+                        supervisor_id=admins[0].id)
+        db.session.add(employee)
+        db.session.flush()
+        start = datetime(2025, 1, 1)
+        db.session.execute(Expense.__table__.insert(), [{
+            'employee_id': employee.id,
+            'admin_id': admins[i % len(admins)].id,
+            'title': f'Expense {i}',
+            'amount': Decimal('10.00'),
+            'site_name': 'Site 1',
+            'document_path': f'receipt_{i}.png' if i % 2 else None,
+            'status': ('pending', 'approved', 'rejected')[i % 3],
+            'created_at': start + timedelta(minutes=i),
+            'updated_at': start + timedelta(minutes=i, hours=4),
+        } for i in range(expense_count)])
+        db.session.commit()
+
+
+def count_statements(client, url):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM expenses' in statement:
+            statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        with Timer() as timer:
+            response = client.get(url)
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    assert response.status_code == 200, response.get_json()
+    return len(statements), timer.elapsed, response.get_json()
+
+
+def main():
+    counts = set()
+    print(f"{'expenses':>9} {'queries':>8} {'rows':>6} {'ms':>8}")
+    for size in SIZES:
+        seed(size)
+        client = login(app.test_client(), 'employee@bench.test')
+        queries, elapsed, data = count_statements(client, '/employee/my-requests?limit=200')
+        counts.add(queries)
+        print(f"{size:>9} {queries:>8} {len(data['requests']):>6} {elapsed * 1000:>8.1f}")
+
+    if counts != {EXPECTED_STATEMENTS}:
+        print(f"FAIL: expected {EXPECTED_STATEMENTS} statement on expenses per request at every size, "
+              f"got {sorted(counts)}")
+        sys.exit(1)
+    print(f"OK: {EXPECTED_STATEMENTS} statement on expenses per request regardless of size")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Show connection pool exhaustion and checkout latency under thread load.
+
+Each thread repeatedly checks out a connection, runs ``SELECT 1``, holds the
+connection for ``--hold-ms`` (standing in for request work) and returns it.
+The thread count is stepped through ``--threads`` against a pool built with
+the same options the app uses (``app/db_pool.py``); ``--pool-size``,
+``--max-overflow`` and ``--timeout`` override the DB_POOL_* environment.
+
+A gunicorn deployment opens up to workers x (pool size + overflow)
+connections in total; this script measures one worker's pool.
+
+    python -m benchmarks.pool_load --threads 2 --threads 8 --threads 32
+"""
+import argparse
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from benchmarks.common import app, Timer
+from app.db_pool import engine_options_from_env
+
+DEFAULT_THREADS = [1, 4, 8, 16, 32]
+
+
+def run(uri, options, threads, iterations, hold):
+    engine = create_engine(uri, **options)
+    waits = []
+    timeouts = 0
+    peak_checked_out = 0
+    lock = threading.Lock()
+
+    def worker():
+        nonlocal timeouts, peak_checked_out
+        for _ in range(iterations):
+            started = time.perf_counter()
+            try:
+                with engine.connect() as conn:
+                    waited = time.perf_counter() - started
+                    with lock:
+                        peak_checked_out = max(peak_checked_out, engine.pool.checkedout())
+                    conn.execute(text('SELECT 1'))
+                    time.sleep(hold)
+            except PoolTimeoutError:
+                with lock:
+                    timeouts += 1
+                continue
+            with lock:
+                waits.append(waited)
+
+    pool_threads = [threading.Thread(target=worker) for _ in range(threads)]
+    with Timer() as timer:
+        for thread in pool_threads:
+            thread.start()
+        for thread in pool_threads:
+            thread.join()
+    engine.dispose()
+    return waits, timeouts, peak_checked_out, timer.elapsed
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, action='append', help=f'thread counts (default {DEFAULT_THREADS})')
+    parser.add_argument('--iterations', type=int, default=50, help='checkouts per thread')
+    parser.add_argument('--hold-ms', type=float, default=5.0, help='time each checkout holds its connection')
+    parser.add_argument('--pool-size', type=int)
+    parser.add_argument('--max-overflow', type=int)
+    parser.add_argument('--timeout', type=float, help='seconds to wait for a connection')
+    args = parser.parse_args()
+
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    options = engine_options_from_env(uri)
+    for key, value in (('pool_size', args.pool_size), ('max_overflow', args.max_overflow), ('pool_timeout', args.timeout)):
+        if value is not None:
+            options[key] = value
+    print(f"pool_size={options['pool_size']} max_overflow={options['max_overflow']} "
+          f"timeout={options['pool_timeout']}s hold={args.hold_ms}ms iterations={args.iterations}")
+    print(f"{'threads':>7} {'ops/s':>8} {'wait p50':>9} {'wait p95':>9} {'wait max':>9} {'timeouts':>8} {'peak out':>8}")
+
+    for threads in args.threads or DEFAULT_THREADS:
+        waits, timeouts, peak, elapsed = run(uri, options, threads, args.iterations, args.hold_ms / 1000)
+        completed = len(waits)
+        print(f"{threads:>7} {completed / elapsed:>8.0f} "
+              f"{percentile(waits, 0.5) * 1000:>8.2f}ms {percentile(waits, 0.95) * 1000:>8.2f}ms "
+              f"{max(waits, default=0) * 1000:>8.2f}ms {timeouts:>8} {peak:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Bytes and time to show a receipt in the review modal: original vs preview.
+
+Seeds one admin with labour through ``seed_data.seed``, then uploads
+``--receipts`` synthetic phone screenshots (PNG, ``--width`` x ``--height``)
+through ``/admin/add-expense``, which queues their thumbnails. For each
+receipt it fetches ``/admin/expenses/<id>/details`` and what the modal
+loads: the original document before, ``preview_url`` now. It reports the
+bytes transferred and the time of each fetch. Previews are fetched straight
+after upload, so some are still rendering and the request waits for them.
+A second pass shows the cached case.
+
+    python -m benchmarks.thumbnails --receipts 20 --workers 2
+"""
+import argparse
+import io
+import random
+import shutil
+import statistics
+import tempfile
+
+from PIL import Image, ImageDraw
+
+from benchmarks.common import app, db, login, Timer
+from app.models import User
+from seed_data import seed
+
+ADMIN = 'admin1@seed.test'
+
+
+def screenshot(rng, width, height):
+    """A receipt-like screenshot: flat background, bars of 'text', a photo-ish block."""
+    image = Image.new('RGB', (width, height), (250, 250, 250))
+    draw = ImageDraw.Draw(image)
+    y = 80
+    while y < height - 80:
+        draw.rectangle([60, y, 60 + rng.randrange(width // 4, width - 120), y + 24], fill=(40, 40, 40))
+        y += rng.choice([48, 48, 96])
+    noise = Image.effect_noise((width // 2, height // 4), 64).convert('RGB')
+    image.paste(noise, (width // 4, height // 3))
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def fetch(client, url):
+    with Timer() as timer:
+        response = client.get(url)
+    assert response.status_code == 200, (url, response.status_code)
+    return len(response.data), timer.elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--receipts', type=int, default=20)
+    parser.add_argument('--width', type=int, default=1170)
+    parser.add_argument('--height', type=int, default=2532)
+    parser.add_argument('--workers', type=int, help='render processes (default THUMBNAIL_WORKERS)')
+    args = parser.parse_args()
+    if args.workers is not None:
+        app.config['THUMBNAIL_WORKERS'] = args.workers
+
+    seed(1, 5, 0, quiet=True)
+    upload_folder = tempfile.mkdtemp()
+    app.config['UPLOAD_FOLDER'] = upload_folder
+    with app.app_context():
+        employee_id = db.session.query(User.id).filter_by(role='employee').first()[0]
+    client = login(app.test_client(), ADMIN)
+    rng = random.Random(0)
+
+    try:
+        expense_ids = []
+        for i in range(args.receipts):
+            response = client.post('/admin/add-expense', data={
+                'employee_id': employee_id, 'title': f'Receipt {i}', 'amount': '10',
+                'document': (io.BytesIO(screenshot(rng, args.width, args.height)), f'receipt{i}.png')})
+            assert response.status_code == 201, response.get_json()
+            expense_ids.append(response.get_json()['expense_id'])
+
+        details = [client.get(f'/admin/expenses/{expense_id}/details').get_json() for expense_id in expense_ids]
+        originals = [fetch(client, f"/admin/documents/{d['document_path']}") for d in details]
+        first = [fetch(client, d['preview_url']) for d in details]
+        cached = [fetch(client, d['preview_url']) for d in details]
+    finally:
+        shutil.rmtree(upload_folder, ignore_errors=True)
+
+    print(f"{args.receipts} receipts {args.width}x{args.height}, preview {app.config['THUMBNAIL_SIZES'][-1]}px "
+          f"{app.config['THUMBNAIL_FORMAT']}, {app.config['THUMBNAIL_WORKERS']} render processes")
+    print(f"{'modal loads':<22} {'KB p50':>9} {'KB total':>10} {'ms p50':>8} {'ms max':>8}")
+    for label, rows in (('original', originals), ('preview (first)', first), ('preview (cached)', cached)):
+        sizes, times = [size / 1024 for size, _ in rows], [elapsed * 1000 for _, elapsed in rows]
+        print(f"{label:<22} {statistics.median(sizes):>9.0f} {sum(sizes):>10.0f} "
+              f"{statistics.median(times):>8.1f} {max(times):>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Count the SQL statements behind session-only endpoints with the user cache.
+
+Logs in once, then polls /auth/me and /auth/check-session the way the
+dashboards do. The first request loads the user (a cache miss); every later
+one should be served from the identity cache without touching the database.
+Then the user is updated through /superadmin/update-user, which bumps the
+user's version, and the next poll must load the user again.
+
+    python -m benchmarks.user_loader [--requests 500]
+"""
+import argparse
+import sys
+
+from sqlalchemy import event
+
+from benchmarks.common import app, db, reset_database, login, Timer, BENCH_PASSWORD
+from app.identity import user_cache
+from app.models import User
+from werkzeug.security import generate_password_hash
+
+SESSION_ENDPOINTS = ['/auth/me', '/auth/check-session']
+
+
+def seed():
+    reset_database()
+    with app.app_context():
+        password = generate_password_hash(BENCH_PASSWORD)
+        db.session.add_all([
+            User(name='Superadmin', email='superadmin@bench.test', password=password, role='superadmin'),
+            User(name='Employee', email='employee@bench.test', password=password, role='employee'),
+        ])
+        db.session.commit()
+        return User.query.filter_by(email='employee@bench.test').one().id
+
+
+class StatementCounter:
+    def __init__(self):
+        with app.app_context():
+            self.engine = db.engine
+        self.count = 0
+
+    def _count(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._count)
+
+
+def poll(client, requests):
+    """Return (statements per request, ms per request) over ``requests`` polls."""
+    per_request = []
+    with Timer() as timer:
+        for i in range(requests):
+            with StatementCounter() as counter:
+                response = client.get(SESSION_ENDPOINTS[i % len(SESSION_ENDPOINTS)])
+            assert response.status_code == 200, response.get_json()
+            per_request.append(counter.count)
+    return per_request, timer.elapsed * 1000 / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    employee_id = seed()
+    client = login(app.test_client(), 'employee@bench.test')
+    superadmin = login(app.test_client(), 'superadmin@bench.test')
+    user_cache.clear()
+    user_cache.hits = user_cache.misses = 0
+
+    counts, ms = poll(client, args.requests)
+    print(f"first request:   {counts[0]} statements (cache miss)")
+    print(f"later requests:  {sum(counts[1:])} statements over {len(counts) - 1} requests, {ms:.2f} ms/request")
+
+    superadmin.put(f'/superadmin/update-user/{employee_id}', json={'name': 'Employee (renamed)'})
+    after_bump, _ = poll(client, 2)
+    print(f"after update:    {after_bump[0]} statements, then {after_bump[1]}")
+    print(f"hit rate:        {user_cache.stats()['hit_rate']:.2%} {user_cache.stats()}")
+
+    if sum(counts[1:]) or not after_bump[0] or after_bump[1]:
+        print("FAIL: session-only endpoints should only query the database after a miss or a version bump")
+        sys.exit(1)
+    print("OK: cache hits issue no SQL")
+
+
+if __name__ == '__main__':
+    main()
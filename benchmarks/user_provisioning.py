@@ -0,0 +1,64 @@
+"""Time /superadmin/provision-users against one /superadmin/add-user per user.
+
+Seeds admins through ``seed_data.seed``. It provisions ``--users`` labour
+spread over them in one request and reports the time and SQL statements.
+It then adds ``--single`` labour one request at a time and extrapolates.
+Password hashing dominates both. The bulk path spreads it over
+``PASSWORD_HASH_WORKERS`` processes (``--workers``), so the speed-up grows
+with the number of cores. The first bulk call also pays for starting the pool.
+
+    python -m benchmarks.user_provisioning --users 300 --workers 8
+"""
+import argparse
+
+from sqlalchemy import event
+
+from benchmarks.common import app, db, login, Timer
+from app.models import User
+from seed_data import seed
+
+SUPERADMIN = 'superadmin@seed.test'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=300)
+    parser.add_argument('--single', type=int, default=20, help='users to add one request at a time')
+    parser.add_argument('--admins', type=int, default=5)
+    parser.add_argument('--workers', type=int, help='hashing processes (default PASSWORD_HASH_WORKERS)')
+    args = parser.parse_args()
+    if args.workers:
+        app.config['PASSWORD_HASH_WORKERS'] = args.workers
+
+    seed(args.admins, 0, 0, quiet=True)
+    with app.app_context():
+        admin_ids = [admin_id for (admin_id,) in db.session.query(User.id).filter_by(role='admin')]
+        engine = db.engine
+    client = login(app.test_client(), SUPERADMIN)
+    users = [{'name': f'Crew {i}', 'email': f'crew{i}@seed.test', 'password': f'crew-password-{i}',
+              'role': 'employee', 'supervisor_id': admin_ids[i % len(admin_ids)]} for i in range(args.users)]
+
+    statements = []
+    count = lambda *a: statements.append(1)
+    event.listen(engine, 'before_cursor_execute', count)
+    with Timer() as timer:
+        response = client.post('/superadmin/provision-users', json={'users': users})
+    event.remove(engine, 'before_cursor_execute', count)
+    report = response.get_json()
+    assert response.status_code == 201, report
+    print(f"bulk provisioning: {report['created']} users in {timer.elapsed:.2f}s "
+          f"({app.config['PASSWORD_HASH_WORKERS']} hashing processes), {len(statements)} SQL statements")
+
+    with Timer() as timer:
+        for i in range(args.single):
+            response = client.post('/superadmin/add-user', json={
+                'name': f'Solo {i}', 'email': f'solo{i}@seed.test', 'password': f'solo-password-{i}',
+                'role': 'employee', 'supervisor_id': admin_ids[0]})
+            assert response.status_code == 201, response.get_json()
+    per_user = timer.elapsed / args.single
+    print(f"add-user:          {args.single} users in {timer.elapsed:.2f}s; "
+          f"{args.users} users would take ~{per_user * args.users:.0f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+import argparse
+import hashlib
+import os
+import shutil
+from collections import defaultdict
+
+from sqlalchemy import inspect, text
+
+from app import app
+from app.documents import CHUNK_SIZE, acquire_document, document_file, is_stored_name
+from app.models import Document, Expense
+from extensions import db
+
+
+def _ensure_schema():
+    # Create the documents table, expenses.document_id and the document indexes
+    # on databases that predate them
+    Document.__table__.create(db.engine, checkfirst=True)
+    columns = {column['name'] for column in inspect(db.engine).get_columns('expenses')}
+    if 'document_id' not in columns:
+        with db.engine.begin() as conn:
+            conn.execute(text('ALTER TABLE expenses ADD COLUMN document_id INTEGER NULL'))
+        print("🧱 Added expenses.document_id")
+    existing = {index['name'] for index in inspect(db.engine).get_indexes('expenses')}
+    for index in Expense.__table__.indexes:
+        if index.name not in existing:
+            index.create(db.engine)
+            print(f"🧱 Added index {index.name}")
+
+
+def _digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def migrate(dry_run=False):
+    """Move legacy flat uploads into the content-addressed store, one copy per digest."""
+    with app.app_context():
+        if not dry_run:
+            _ensure_schema()
+        upload_folder = app.config['UPLOAD_FOLDER']
+
+        # Expenses per legacy filename
+        expense_ids = defaultdict(list)
+        legacy = db.session.query(Expense.id, Expense.document_path).filter(Expense.document_path.isnot(None))
+        if not dry_run:
+            legacy = legacy.filter(Expense.document_id.is_(None))
+        for expense_id, document_path in legacy:
+            filename = os.path.basename(document_path)
+            if not is_stored_name(filename):
+                expense_ids[filename].append(expense_id)
+
+        duplicates = missing = saved = 0
+        seen = set()
+        for filename, ids in sorted(expense_ids.items()):
+            path = os.path.join(upload_folder, filename)
+            if not os.path.isfile(path):
+                missing += 1
+                continue
+            digest, size = _digest(path), os.path.getsize(path)
+            if digest in seen:
+                duplicates += 1
+                saved += size
+            seen.add(digest)
+            if dry_run:
+                continue
+
+            document = acquire_document(digest, os.path.splitext(filename)[1].lower(), size, count=len(ids))
+            target = document_file(upload_folder, document.filename)
+            if not os.path.exists(target):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copy2(path, target)
+            Expense.query.filter(Expense.id.in_(ids)).update(
+                {'document_path': document.filename, 'document_id': document.id}, synchronize_session=False)
+            db.session.commit()
+            # The legacy file goes only once the expenses point at the stored copy
+            os.remove(path)
+
+        action = "Would move" if dry_run else "Moved"
+        print(f"📎 {action} {len(expense_ids) - missing} files into {len(seen)} stored documents "
+              f"({duplicates} duplicates, {saved / (1024 * 1024):.1f} MB saved)")
+        if missing:
+            print(f"⚠️  {missing} referenced files were not found in {upload_folder}")
+        unreferenced = [name for name in os.listdir(upload_folder)
+                        if os.path.isfile(os.path.join(upload_folder, name)) and name not in expense_ids]
+        if unreferenced:
+            print(f"ℹ️  {len(unreferenced)} files in the upload folder are not linked to any expense; left in place")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move uploaded receipts into the content-addressed document store.")
+    parser.add_argument('--dry-run', action='store_true', help="only report what would move and the space saved")
+    args = parser.parse_args()
+    migrate(dry_run=args.dry_run)
@@ -0,0 +1,25 @@
+import argparse
+from app import app
+from app.models import ApprovalHourHistogram, MonthlySpendRollup
+from app.rollups import rebuild_approval_histogram, rebuild_monthly_spend
+from extensions import db
+
+def rebuild(admin_id=None):
+    with app.app_context():
+        # Create the rollup tables on databases that predate them
+        MonthlySpendRollup.__table__.create(db.engine, checkfirst=True)
+        ApprovalHourHistogram.__table__.create(db.engine, checkfirst=True)
+
+        print("📈 Rebuilding monthly spend rollup...")
+        rows = rebuild_monthly_spend(admin_id)
+        print(f"✅ monthly_spend_rollup: {rows} rows")
+
+        print("🕒 Rebuilding approval hour histogram...")
+        rows = rebuild_approval_histogram(admin_id)
+        print(f"✅ approval_hour_histogram: {rows} rows")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild reporting rollups from the expenses table.")
+    parser.add_argument('--admin-id', type=int, help="only rebuild rows for this admin")
+    args = parser.parse_args()
+    rebuild(args.admin_id)
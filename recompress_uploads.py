@@ -0,0 +1,161 @@
+import argparse
+import hashlib
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from app import app
+from app.documents import INCOMING_FOLDER, acquire_document, document_file, documents, original_file
+from app.images import FORMAT_EXTENSIONS, RASTER_EXTENSIONS, recompress_file
+from app.models import Document, Expense
+from app.thumbnails import delete_thumbnails
+from extensions import db
+
+
+def _candidates(upload_folder, min_bytes):
+    # Raster files anywhere under the upload folder, skipping .incoming, .thumbnails and .originals
+    for directory, subdirectories, filenames in os.walk(upload_folder):
+        subdirectories[:] = [name for name in subdirectories if not name.startswith('.')]
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            if os.path.splitext(filename)[1].lower() in RASTER_EXTENSIONS and os.path.getsize(path) >= min_bytes:
+                yield path
+
+
+def _measure(task):
+    path, image_format, quality, max_side = task
+    before = os.path.getsize(path)
+    try:
+        data = recompress_file(path, image_format, quality, max_side)
+    except Exception:
+        return before, None
+    return before, len(data) if data else before
+
+
+def _encode(task):
+    # Worker: re-encode one stored document into the incoming folder; None if it would not shrink
+    path, incoming, image_format, quality, max_side = task
+    try:
+        data = recompress_file(path, image_format, quality, max_side)
+    except Exception:
+        return None
+    if not data:
+        return None
+    with tempfile.NamedTemporaryFile(dir=incoming, delete=False) as temp:
+        temp.write(data)
+    return temp.name, hashlib.sha256(data).hexdigest(), len(data)
+
+
+def _pool(workers):
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+def _summary(label, count, before, after):
+    saved = before - after
+    percent = saved / before * 100 if before else 0
+    print(f"🗜️  {label} {count} images: {before / (1024 * 1024):.1f} MB → {after / (1024 * 1024):.1f} MB "
+          f"({saved / (1024 * 1024):.1f} MB saved, {percent:.0f}%)")
+
+
+def report(settings, workers):
+    """Estimate the bytes recompression would save across the upload folder; writes nothing."""
+    upload_folder = app.config['UPLOAD_FOLDER']
+    paths = list(_candidates(upload_folder, settings['min_bytes']))
+    tasks = [(path, settings['format'], settings['quality'], settings['max_side']) for path in paths]
+    with _pool(workers) as pool:
+        results = list(pool.map(_measure, tasks, chunksize=4))
+    unreadable = sum(1 for _, after in results if after is None)
+    before = sum(size for size, after in results if after is not None)
+    after = sum(after for _, after in results if after is not None)
+    print(f"📂 {upload_folder}: {len(paths)} raster files of at least {settings['min_bytes'] // 1024} KB")
+    _summary("Recompressing", len(paths) - unreadable, before, after)
+    if unreadable:
+        print(f"⚠️  {unreadable} files could not be decoded and would be left as they are")
+
+
+def recompress(settings, workers):
+    """Re-encode stored raster documents and repoint their expenses at the smaller copies."""
+    with app.app_context():
+        upload_folder = app.config['UPLOAD_FOLDER']
+        keep_originals = app.config.get('RECEIPT_KEEP_ORIGINALS')
+        incoming = os.path.join(upload_folder, INCOMING_FOLDER)
+        os.makedirs(incoming, exist_ok=True)
+        rows = db.session.query(Document.id, Document.sha256, Document.extension).filter(
+            Document.extension.in_(RASTER_EXTENSIONS), Document.size >= settings['min_bytes']).all()
+        tasks = [(document_file(upload_folder, sha256 + extension), incoming,
+                  settings['format'], settings['quality'], settings['max_side']) for _, sha256, extension in rows]
+        db.session.close()
+
+        converted = skipped = before = after = 0
+        extension = FORMAT_EXTENSIONS[settings['format']]
+        with _pool(workers) as pool:
+            for (document_id, _, _), task, encoded in zip(rows, tasks, pool.map(_encode, tasks, chunksize=4)):
+                if not encoded:
+                    skipped += 1
+                    continue
+                temp_path, digest, size = encoded
+                try:
+                    old = db.session.get(Document, document_id)
+                    if old is None:
+                        continue
+                    old_filename, old_extension, old_size, references = old.filename, old.extension, old.size, old.ref_count
+                    new = acquire_document(digest, extension, size, count=references)
+                    Expense.query.filter_by(document_id=document_id).update(
+                        {'document_id': new.id}, synchronize_session=False)
+                    # Rejected expenses keep their link without holding a reference
+                    Expense.query.filter_by(document_path=old_filename).update(
+                        {'document_path': new.filename}, synchronize_session=False)
+                    # Only if no upload took a reference meanwhile
+                    removed = db.session.execute(documents.delete().where(
+                        documents.c.id == document_id, documents.c.ref_count == references)).rowcount
+                    if not removed:
+                        db.session.rollback()
+                        skipped += 1
+                        continue
+                    path = document_file(upload_folder, new.filename)
+                    if not os.path.exists(path):
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        os.replace(temp_path, path)
+                    db.session.commit()
+                finally:
+                    if os.path.exists(temp_path):
+                        os.unlink(temp_path)
+
+                # The old file goes only once nothing points at it
+                original = original_file(upload_folder, new.filename, old_extension)
+                if keep_originals and not os.path.exists(original):
+                    os.makedirs(os.path.dirname(original), exist_ok=True)
+                    os.replace(task[0], original)
+                elif os.path.exists(task[0]):
+                    os.remove(task[0])
+                delete_thumbnails(upload_folder, [old_filename])
+                converted += 1
+                before += old_size
+                after += size
+
+        _summary("Recompressed", converted, before, after)
+        if skipped:
+            print(f"ℹ️  {skipped} documents left as they are (not smaller, not decodable, or changed during the run)")
+        legacy = sum(1 for path in _candidates(upload_folder, settings['min_bytes'])
+                     if os.path.dirname(path) == upload_folder)
+        if legacy:
+            print(f"⚠️  {legacy} legacy uploads are outside the document store; run migrate_documents.py first")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Recompress large raster receipts already on disk, or report what that would save.")
+    parser.add_argument('--report', action='store_true', help="only report the bytes that would be saved")
+    parser.add_argument('--format', choices=sorted(FORMAT_EXTENSIONS),
+                        default=app.config.get('RECEIPT_RECOMPRESS_FORMAT') or 'webp')
+    parser.add_argument('--quality', type=int, default=app.config['RECEIPT_RECOMPRESS_QUALITY'])
+    parser.add_argument('--max-side', type=int, default=app.config['RECEIPT_RECOMPRESS_MAX_SIDE'])
+    parser.add_argument('--min-bytes', type=int, default=app.config['RECEIPT_RECOMPRESS_MIN_BYTES'])
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="encoding processes")
+    args = parser.parse_args()
+    settings = {'format': args.format, 'quality': args.quality, 'max_side': args.max_side, 'min_bytes': args.min_bytes}
+    if args.report:
+        report(settings, args.workers)
+    else:
+        recompress(settings, args.workers)
@@ -0,0 +1,181 @@
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from werkzeug.security import generate_password_hash
+
+from app import app
+from app.models import User, Budget, Expense, Transaction, EmployeeFund
+from app.rollups import rebuild_approval_histogram, rebuild_monthly_spend
+from extensions import db
+
+DEFAULT_PASSWORD = 'password'
+BATCH_SIZE = 5000
+
+SITE_NAMES = [f'Site {name}' for name in (
+    'Andheri', 'Baner', 'Chembur', 'Dadar', 'Electronic City', 'Fort', 'Gachibowli', 'Hadapsar',
+    'Indiranagar', 'Juhu', 'Kharadi', 'Lokhandwala', 'Malad', 'Nerul', 'Powai', 'Wakad'
+)]
+EXPENSE_TITLES = [
+    'Cement bags', 'Sand delivery', 'Steel rods', 'Bricks', 'Paint', 'Electrical fittings', 'Plumbing parts',
+    'Tile adhesive', 'Scaffolding rent', 'Tools', 'Diesel', 'Transport', 'Labour meals', 'Safety gear'
+]
+# Weighted like a live system: most reviewed, a backlog pending
+STATUS_WEIGHTS = {'approved': 60, 'pending': 25, 'rejected': 15}
+# Submissions cluster in working hours
+HOUR_WEIGHTS = [1, 1, 1, 1, 1, 2, 4, 8, 14, 16, 16, 15, 12, 14, 15, 14, 12, 9, 6, 4, 3, 2, 1, 1]
+
+
+def _bulk_insert(model, rows):
+    # executemany takes its column list from the first row, so every row carries the same keys
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.session.execute(model.__table__.insert(), rows[start:start + BATCH_SIZE])
+
+
+def _random_timestamp(rng, start, days):
+    day = start + timedelta(days=rng.randrange(days))
+    hour = rng.choices(range(24), weights=HOUR_WEIGHTS)[0]
+    return day.replace(hour=hour, minute=rng.randrange(60), second=rng.randrange(60))
+
+
+def _money(value):
+    return Decimal(value).quantize(Decimal('0.01'))
+
+
+def generate(admins, employees_per_admin, expenses_per_employee, days=365, seed=42):
+    """Build every row of a synthetic organisation in memory, with explicit ids.
+
+    Returns a dict of ``{model: rows}`` that is consistent with what the app
+    itself would have written: approved expenses have an expense transaction,
+    employee funds and admin budgets add up to their allocations and spend.
+    """
+    rng = random.Random(seed)
+    password = generate_password_hash(DEFAULT_PASSWORD)
+    now = datetime.utcnow().replace(microsecond=0)
+    start = now - timedelta(days=days)
+    statuses, status_weights = zip(*STATUS_WEIGHTS.items())
+    allocations_per_employee = max(1, expenses_per_employee // 4)
+
+    users = [{
+        'id': 1, 'name': 'Seed Superadmin', 'email': 'superadmin@seed.test', 'phone': '+910000000000',
+        'password': password, 'role': 'superadmin', 'supervisor_id': None, 'created_by': None,
+        'is_active': True, 'created_at': start, 'updated_at': start
+    }]
+    budgets, funds, expenses, transactions = [], [], [], []
+
+    for a in range(admins):
+        admin_id = len(users) + 1
+        users.append({
+            'id': admin_id, 'name': f'Supervisor {a + 1}', 'email': f'admin{a + 1}@seed.test',
+            'phone': f'+91{admin_id:010d}', 'password': password, 'role': 'admin', 'supervisor_id': None, 'created_by': 1,
+            'is_active': True, 'created_at': start, 'updated_at': start
+        })
+        admin_allocated = Decimal('0.00')
+
+        for e in range(employees_per_admin):
+            employee_id = len(users) + 1
+            users.append({
+                'id': employee_id, 'name': f'Labour {a + 1}-{e + 1}', 'email': f'employee{a + 1}_{e + 1}@seed.test',
+                'phone': f'+91{employee_id:010d}', 'password': password, 'role': 'employee',
+                'supervisor_id': admin_id, 'created_by': admin_id,
+                'is_active': rng.random() > 0.05, 'created_at': start, 'updated_at': start
+            })
+            home_sites = rng.sample(SITE_NAMES, 3)
+
+            spent = Decimal('0.00')
+            for _ in range(expenses_per_employee):
+                expense_id = len(expenses) + 1
+                created_at = _random_timestamp(rng, start, days)
+                status = rng.choices(statuses, weights=status_weights)[0]
+                reviewed_at = created_at + timedelta(minutes=rng.randint(5, 72 * 60)) if status != 'pending' else created_at
+                amount = _money(rng.lognormvariate(7.5, 0.9))
+                title = rng.choice(EXPENSE_TITLES)
+                site_name = rng.choice(home_sites)
+                expenses.append({
+                    'id': expense_id, 'employee_id': employee_id, 'admin_id': admin_id, 'title': title,
+                    'amount': amount, 'site_name': site_name, 'description': f'{title} for {site_name}',
+                    'document_path': f'receipt_{expense_id}.jpg' if rng.random() < 0.4 else None,
+                    'status': status,
+                    'rejection_reason': 'Missing receipt' if status == 'rejected' else None,
+                    'created_at': created_at, 'updated_at': reviewed_at
+                })
+                if status == 'approved':
+                    spent += amount
+                    transactions.append({
+                        'sender_id': employee_id, 'receiver_id': admin_id, 'expense_id': expense_id,
+                        'type': 'expense', 'amount': amount, 'description': title, 'site_name': site_name,
+                        'timestamp': reviewed_at, 'created_at': reviewed_at
+                    })
+
+            # Allocations cover the approved spend with some headroom
+            allocated = Decimal('0.00')
+            target = spent * Decimal(str(round(rng.uniform(1.1, 1.6), 2))) + Decimal('1000.00')
+            for i in range(allocations_per_employee):
+                amount = _money(target / allocations_per_employee)
+                allocated += amount
+                timestamp = _random_timestamp(rng, start, days)
+                transactions.append({
+                    'sender_id': admin_id, 'receiver_id': employee_id, 'expense_id': None,
+                    'type': 'allocation', 'amount': amount, 'description': 'Fund allocation',
+                    'site_name': rng.choice(home_sites), 'timestamp': timestamp, 'created_at': timestamp
+                })
+            funds.append({
+                'employee_id': employee_id, 'admin_id': admin_id, 'amount_allocated': allocated,
+                'amount_spent': spent, 'remaining_balance': allocated - spent,
+                'created_at': start, 'updated_at': now
+            })
+            admin_allocated += allocated
+
+        total_budget = _money(admin_allocated * Decimal('1.25') + Decimal('10000.00'))
+        budgets.append({
+            'admin_id': admin_id, 'total_budget': total_budget, 'total_spent': admin_allocated,
+            'remaining': total_budget - admin_allocated, 'created_at': start, 'updated_at': now
+        })
+
+    transactions.sort(key=lambda row: row['timestamp'])
+    for transaction_id, row in enumerate(transactions, start=1):
+        row['id'] = transaction_id
+    return {User: users, Budget: budgets, EmployeeFund: funds, Expense: expenses, Transaction: transactions}
+
+
+def seed(admins, employees_per_admin, expenses_per_employee, days=365, seed=42, quiet=False):
+    """Drop every table and load a generated organisation with bulk inserts."""
+    def say(message):
+        if not quiet:
+            print(message)
+
+    with app.app_context():
+        say("📦 Dropping and creating all tables...")
+        db.drop_all()
+        db.create_all()
+
+        started = time.perf_counter()
+        data = generate(admins, employees_per_admin, expenses_per_employee, days=days, seed=seed)
+        say(f"🧮 Generated rows in {time.perf_counter() - started:.1f}s")
+
+        started = time.perf_counter()
+        for model, rows in data.items():
+            _bulk_insert(model, rows)
+            say(f"   {model.__tablename__}: {len(rows)} rows")
+        db.session.commit()
+        say(f"✅ Inserted in {time.perf_counter() - started:.1f}s")
+
+        say("📈 Rebuilding reporting rollups...")
+        rebuild_monthly_spend()
+        rebuild_approval_histogram()
+        return {model.__tablename__: len(rows) for model, rows in data.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replace the database with a synthetic organisation.")
+    parser.add_argument('--admins', type=int, default=5, help="number of admins (supervisors)")
+    parser.add_argument('--employees', type=int, default=20, help="employees per admin")
+    parser.add_argument('--expenses', type=int, default=50, help="expenses per employee")
+    parser.add_argument('--days', type=int, default=365, help="spread timestamps over this many past days")
+    parser.add_argument('--seed', type=int, default=42, help="random seed, for reproducible data")
+    args = parser.parse_args()
+    seed(args.admins, args.employees, args.expenses, days=args.days, seed=args.seed)
+    print(f"\nAll users have the default password: {DEFAULT_PASSWORD}")
+    print("SuperAdmin: superadmin@seed.test, supervisors: admin<N>@seed.test, labour: employee<N>_<M>@seed.test")